@@ -7,3 +7,7 @@ class OxFinConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "fin"
     label = "ox_fin"
+
+    def ready(self):
+        # registers report invalidation on balance changes
+        from .engine.report import signals  # noqa: F401
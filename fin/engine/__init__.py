@@ -1,5 +1,17 @@
-from .amortizations import AmortizationEntryBuilder
-from .report import ReportBuilder
+from .amortizations import AmortizationBatchBuilder, AmortizationEntryBuilder
+from .report import ReportBatch, ReportBatchResult, ReportBuilder, ReportProfiler, XBRLExport, XBRLExportResult
+from .rollforward import Rollforward, RollforwardResult
 
 
-__all__ = ("AmortizationEntryBuilder", "ReportBuilder")
+__all__ = (
+    "AmortizationBatchBuilder",
+    "AmortizationEntryBuilder",
+    "ReportBatch",
+    "ReportBatchResult",
+    "ReportBuilder",
+    "ReportProfiler",
+    "Rollforward",
+    "RollforwardResult",
+    "XBRLExport",
+    "XBRLExportResult",
+)
@@ -1,13 +1,17 @@
 from __future__ import annotations
+from dataclasses import dataclass
 from datetime import date, timedelta
 from decimal import Decimal, ROUND_HALF_UP
 from typing import Iterable
 
+from django.db.models import Max, Sum
+import numpy as np
 
-from fin.models import ProrataPolicy, AmortizationSchedule, AmortizationEntry, Move, Line
+from fin.models import Book, ProrataPolicy, AmortizationSchedule, AmortizationEntry, Move, Line
+from fin.utils.periods import month_index
 
 
-__all__ = ("AmortizationEntryBuilder",)
+__all__ = ("AmortizationEntryBuilder", "AmortizationBatchBuilder")
 
 
 class AmortizationEntryBuilder:
@@ -87,7 +91,7 @@ class AmortizationEntryBuilder:
         :return a two-tuple of moves and lines
         """
         moves, lines = [], []
-        exercises = {}
+        books = {}
 
         if not description:
             description = "Amortization - {asset.description}"
@@ -96,12 +100,9 @@ class AmortizationEntryBuilder:
             if entry.move_id:
                 continue
 
-            book = entry.book
-            if book.id not in exercises:
-                exercise = entry.book.get_exercise(entry.date, create=True, open=True)
-                exercises[book.id] = exercise
-            else:
-                exercise = exercises[book.id]
+            # share book instances, and so their exercise index
+            book = books.setdefault(entry.book.id, entry.book)
+            exercise = book.get_exercise(date or entry.date, create=True, open=True)
 
             if vals := entry.create_move(description, date, exercise=exercise):
                 entry.move = vals[0]
@@ -135,9 +136,7 @@ class AmortizationEntryBuilder:
                     return degressive_amount
 
                 # Otherwise, compare whats left to linear.
-                remaining_months = (
-                    (schedule.end_date.year - period_start.year) * 12 + schedule.end_date.month - period_start.month + 1
-                )
+                remaining_months = month_index(schedule.end_date) - month_index(period_start) + 1
                 linear_amount = (remaining_value - schedule.asset.residual_value) / Decimal(
                     max(remaining_months // schedule.frequency, 1)
                 )
@@ -175,3 +174,215 @@ class AmortizationEntryBuilder:
     @staticmethod
     def _is_first_period(schedule: AmortizationSchedule, period_start: date):
         return period_start.year == schedule.start_date.year and period_start.month == schedule.start_date.month
+
+
+@dataclass
+class SchedulePlan:
+    """Periods to amortize of a schedule, as used by :py:class:`AmortizationBatchBuilder`."""
+
+    schedule: AmortizationSchedule
+    periods: list[tuple[date, date]]
+    remaining: int
+    """ Remaining value in cents. """
+    is_first: bool
+    """ No entry exists before the periods: prorata applies to the first one. """
+
+
+class AmortizationBatchBuilder:
+    """
+    Generate amortization entries of all the schedules of a book at once.
+
+    Entries are the same as generated by :py:class:`AmortizationEntryBuilder`
+    for each schedule, but:
+
+    - existing entries are cleared, and schedules loaded with their last entry
+      date and applied amount, in a few queries for the whole book;
+    - amounts are computed with NumPy for all the schedules, one period at a
+      time, in integer cents using exact rational arithmetic (rounded half up).
+
+    Schedules starting after the period end are skipped instead of raising.
+    """
+
+    def build(self, book: Book, period_end: date, clear: bool = False) -> list[AmortizationEntry]:
+        """Generate amortization entries of the book's schedules up to the provided date.
+
+        :param book: the book to amortize
+        :param period_end: end of the period.
+        :param clear: delete all previous amortization entries
+        :raises RuntimeError: entries to clear are linked to a move.
+        :raises ValueError: a schedule is invalid, or its asset amortized value is lower than residual value.
+        """
+        schedules = AmortizationSchedule.objects.book(book)
+        self.clear_entries(schedules, None if clear else period_end + timedelta(days=1))
+
+        schedules = self.get_schedules(schedules)
+        plans = [plan for schedule in schedules if (plan := self.get_plan(schedule, period_end, clear))]
+        if not plans:
+            return []
+
+        amounts, emitted = self.compute(plans)
+        return [
+            AmortizationEntry(schedule=plan.schedule, date=end, amount=Decimal(int(amount)).scaleb(-2))
+            for plan, row, mask in zip(plans, amounts, emitted)
+            for (_, end), amount, emit in zip(plan.periods, row, mask)
+            if emit
+        ]
+
+    def clear_entries(self, schedules, from_date: date | None = None):
+        """Clear entries of the schedules from the provided date (as :py:meth:`.AmortizationSchedule.clear_entries`).
+
+        :raises RuntimeError: some entries are linked to a move.
+        """
+        query = AmortizationEntry.objects.filter(schedule__in=schedules)
+        if from_date:
+            query = query.filter(date__gte=from_date)
+
+        if query.filter(move__isnull=False).exists():
+            raise RuntimeError(
+                "Some entries are linked to journal entries. Delete them or set move to null before clearing them."
+            )
+        query.delete()
+
+    def get_schedules(self, schedules) -> list[AmortizationSchedule]:
+        """Return schedules annotated with ``last_date`` and ``applied_amount`` of their entries."""
+        return list(
+            schedules.select_related("asset__book")
+            .annotate(last_date=Max("entries__date"), applied_amount=Sum("entries__amount"))
+            .order_by("pk")
+        )
+
+    def get_plan(self, schedule: AmortizationSchedule, period_end: date, clear: bool) -> SchedulePlan | None:
+        """Return the periods to amortize of an annotated schedule, or None if there is nothing to do."""
+        asset = schedule.asset
+        if clear:
+            period_start, applied_amount, is_first = schedule.start_date, Decimal("0"), True
+        elif period_end < schedule.start_date:
+            return None
+        else:
+            is_first = schedule.last_date is None
+            period_start = schedule.last_date and (schedule.last_date + timedelta(days=1)) or schedule.start_date
+            applied_amount = schedule.applied_amount or Decimal("0")
+
+        remaining = asset.initial_value - applied_amount
+        if remaining < asset.residual_value:
+            raise ValueError(f"The assets amortized value is lower than amortization residual value ({schedule}).")
+
+        periods = list(schedule.iter_periods(period_start, period_end))
+        if remaining == asset.residual_value or not periods:
+            return None
+
+        match schedule.method:
+            case schedule.Method.LINEAR:
+                pass
+            case schedule.Method.DEGRESSIVE:
+                if not schedule.rate:
+                    raise ValueError(f"Rate is not set ({schedule}).")
+            case _:
+                raise ValueError(f"Unsupported method {schedule.get_method_display()}")
+        return SchedulePlan(schedule, periods, self.to_cents(remaining), is_first)
+
+    def compute(self, plans: list[SchedulePlan]) -> tuple[np.ndarray, np.ndarray]:
+        """Compute entries amounts of the provided plans.
+
+        :return: ``(amounts, emitted)`` as 2D arrays indexed by plan and period: amounts in cents, and
+            whether an entry is generated.
+        """
+        size, steps = len(plans), max(len(plan.periods) for plan in plans)
+        schedules = [plan.schedule for plan in plans]
+
+        residual = [self.to_cents(s.asset.residual_value) for s in schedules]
+        # degressive amount is ``remaining * rate * frequency / 12``, with rate in basis points
+        deg_factor = [int((s.rate or 0) * 10000) * s.frequency for s in schedules]
+        deg_den = 12 * 10000
+
+        deg_first = np.zeros((size, steps), dtype=bool)
+        deg_divisor = np.ones((size, steps), dtype=np.int64)
+        valid = np.zeros((size, steps), dtype=bool)
+        prorata = np.ones((size, 2), dtype=np.int64)
+        for row, (schedule, plan) in enumerate(zip(schedules, plans)):
+            valid[row, : len(plan.periods)] = True
+            if plan.is_first:
+                prorata[row] = self.get_prorata(schedule, *plan.periods[0])
+            if schedule.method != schedule.Method.DEGRESSIVE:
+                continue
+
+            end_date = schedule.end_date
+            for col, (start, _) in enumerate(plan.periods):
+                deg_first[row, col] = AmortizationEntryBuilder._is_first_period(schedule, start)
+                months = month_index(end_date) - month_index(start) + 1
+                deg_divisor[row, col] = max(months // schedule.frequency, 1)
+
+        counts = [s.count_periods() for s in schedules]
+        # Fallback to Python integers when the products of fractions terms may overflow.
+        bound = (
+            2
+            * max(plan.remaining for plan in plans)
+            * max(*deg_factor, 1)
+            * max(int(deg_divisor.max()), deg_den, *counts)
+            * int(prorata.max())
+        )
+        dtype = np.int64 if bound < 2**63 else object
+        deg_divisor, prorata = deg_divisor.astype(dtype), prorata.astype(dtype)
+
+        remaining = np.array([plan.remaining for plan in plans], dtype=dtype)
+        residual = np.array(residual, dtype=dtype)
+        deg_factor = np.array(deg_factor, dtype=dtype)
+        counts = np.array(counts, dtype=dtype)
+        linear = np.array([self.to_cents(s.asset.initial_value - s.asset.residual_value) for s in schedules], dtype)
+        index = np.array([s.count_periods(end_date=plan.periods[0][0]) for s, plan in zip(schedules, plans)])
+        degressive = np.array([s.method == s.Method.DEGRESSIVE for s in schedules])
+
+        amounts = np.zeros((size, steps), dtype=dtype)
+        emitted = np.zeros((size, steps), dtype=bool)
+        active = remaining > residual
+        for col in range(steps):
+            mask = active & valid[:, col]
+            if not mask.any():
+                break
+
+            left = remaining - residual
+            # degressive: the greatest of degressive and linear over remaining periods, except on first period
+            num, den = remaining * deg_factor, np.full(size, deg_den, dtype=dtype)
+            divisor = deg_divisor[:, col]
+            use_linear = ~deg_first[:, col] & (left * den > num * divisor)
+            num, den = np.where(use_linear, left, num), np.where(use_linear, divisor, den)
+
+            num, den = np.where(degressive, num, linear), np.where(degressive, den, counts)
+            den = np.where(mask, den, 1)
+            capped = num > left * den
+            num, den = np.where(capped, left, num), np.where(capped, 1, den)
+
+            if col == 0:
+                num, den = num * prorata[:, 0], den * prorata[:, 1]
+
+            amount = (2 * num + den) // (2 * den)
+            amount = np.where(index + col + 1 == counts, left, amount)
+            amount = np.where(mask, amount, 0)
+
+            amounts[:, col], emitted[:, col] = amount, mask
+            remaining -= amount
+            active = mask & (remaining > residual)
+        return amounts, emitted
+
+    def get_prorata(self, schedule: AmortizationSchedule, start: date, end: date) -> tuple[int, int]:
+        """Return prorata factor of the first period as ``(numerator, denominator)``.
+
+        See :py:meth:`AmortizationEntryBuilder._prorata_factor`.
+        """
+        policy = schedule.asset.book.amortization_prorata if schedule.prorata is None else schedule.prorata
+        match policy:
+            case ProrataPolicy.NONE | None:
+                return 1, 1
+            case ProrataPolicy.DAILY:
+                days_year = 366 if AmortizationEntryBuilder._is_leap_year(start.year) else 365
+                return (end - start).days + 1, days_year
+            case ProrataPolicy.MONTHLY:
+                months_used = (end.year - start.year) * 12 + (end.month - start.month) + 1
+                return months_used, schedule.frequency * (12 // schedule.frequency)
+            case _:
+                label = ProrataPolicy(policy).label
+                raise ValueError(f"Invalid prorata policy: {label}")
+
+    @staticmethod
+    def to_cents(value: Decimal) -> int:
+        return int((value * 100).to_integral_value(ROUND_HALF_UP))
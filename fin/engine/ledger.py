@@ -1,14 +1,18 @@
 from __future__ import annotations
-from datetime import date
+from datetime import date, timedelta
 from decimal import Decimal
 from typing import Iterable
 
-from django.db.models import Sum
+from dateutil.relativedelta import relativedelta
+from django.db.models import Case, DateField, Min, Q, Sum, Value, When
+from django.db.models.functions import TruncMonth, TruncQuarter
+
 from fin.models.book_template import Account
-from fin.models.book import Book, Line, Move
+from fin.models.book import Book, Exercise, Line, Move, AccountBalanceSnapshot
 
 
 __all__ = (
+    "PeriodBalances",
     "LedgerFlowView",
     "LedgerStateView",
     "OpeningView",
@@ -17,6 +21,11 @@ __all__ = (
 )
 
 
+PeriodBalances = tuple[list[date], dict[int, list[Decimal]]]
+""" Period starts and per-account balances (one item per period) as returned by
+:py:meth:`BaseLedgerView.balances_by_period`. """
+
+
 class BaseLedgerView:
     """
     Shared technical layer for ledger queries.
@@ -31,24 +40,29 @@ class BaseLedgerView:
     exclude_move_types: Iterable[Move.Type] | None = None
     include_account_types: Iterable[Account.Type] | None = None
 
+    cumulative: bool = False
+    """ Accumulate balances over periods in :py:meth:`balances_by_period` (state semantics). """
+    granularities = ("month", "quarter", "exercise")
+    """ Allowed granularities of :py:meth:`balances_by_period`. """
+
     def __init__(self, book, end_date: date):
         self.book = book
         self.end_date = end_date
         self.qs = self.get_lines_queryset()
 
     def get_lines_queryset(self):
-        qs = Line.objects.filter(move__book=self.book, move__date__lte=self.end_date)
+        qs = Line.objects.filter(book=self.book, date__lte=self.end_date)
 
         if self.include_move_types:
-            qs = qs.filter(move__type__in=self.include_move_types)
+            qs = qs.filter(move_type__in=self.include_move_types)
 
         if self.exclude_move_types:
-            qs = qs.exclude(move__type__in=self.exclude_move_types)
+            qs = qs.exclude(move_type__in=self.exclude_move_types)
 
         if self.include_account_types:
             qs = qs.filter(account__type__in=self.include_account_types)
 
-        return qs.with_norm_amount().select_related("move", "account")
+        return qs.select_related("move", "account")
 
     def balances(self):
         """Return balances."""
@@ -57,6 +71,67 @@ class BaseLedgerView:
     def balance(self, account_id: int):
         return self.qs.filter(account_id=account_id).aggregate(total=Sum("norm_amount"))["total"] or Decimal("0.00")
 
+    def get_start_date(self) -> date:
+        """Return the first date covered by the view: date of its first line, or end date when empty."""
+        return self.qs.aggregate(start=Min("date"))["start"] or self.end_date
+
+    def balances_by_period(self, granularity: str = "month") -> PeriodBalances:
+        """Return account balances for each period of the view, using a single grouped query.
+
+        When :py:attr:`cumulative` is set, each value is the balance at the end of the period,
+        otherwise the movements within it.
+
+        :param granularity: one of ``"month"``, ``"quarter"`` or ``"exercise"``.
+        :return: periods start dates and balances by account id.
+        :raises ValueError: invalid granularity.
+        """
+        if granularity not in self.granularities:
+            raise ValueError(f"Invalid granularity: {granularity}")
+
+        periods, key = getattr(self, f"get_{granularity}_periods")()
+        index = {period: i for i, period in enumerate(periods)}
+        results = {}
+
+        query = self.qs.annotate(period=key).values("account_id", "period").annotate(total=Sum("norm_amount"))
+        for account_id, period, total in query.values_list("account_id", "period", "total").order_by():
+            if (i := index.get(period)) is not None:
+                row = results.setdefault(account_id, [Decimal("0.00")] * len(periods))
+                row[i] += total
+
+        if self.cumulative:
+            for row in results.values():
+                for i in range(1, len(row)):
+                    row[i] += row[i - 1]
+        return periods, results
+
+    def get_month_periods(self):
+        """Return months of the view and the related grouping expression."""
+        start, end = self.get_start_date().replace(day=1), self.end_date
+        periods = []
+        while start <= end:
+            periods.append(start)
+            start += relativedelta(months=1)
+        return periods, TruncMonth("date")
+
+    def get_quarter_periods(self):
+        """Return quarters of the view and the related grouping expression."""
+        start = self.get_start_date()
+        start, end = start.replace(month=start.month - (start.month - 1) % 3, day=1), self.end_date
+        periods = []
+        while start <= end:
+            periods.append(start)
+            start += relativedelta(months=3)
+        return periods, TruncQuarter("date")
+
+    def get_exercise_periods(self):
+        """Return exercises start dates of the view and the related grouping expression."""
+        exercises = Exercise.objects.filter(
+            book=self.book, start_date__lte=self.end_date, end_date__gte=self.get_start_date()
+        ).order_by("start_date")
+        periods = [ex.start_date for ex in exercises]
+        whens = [When(date__gte=ex.start_date, date__lte=ex.end_date, then=Value(ex.start_date)) for ex in exercises]
+        return periods, Case(*whens, default=None, output_field=DateField())
+
 
 class LedgerFlowView(BaseLedgerView):
     """Flow view: only movements within a period."""
@@ -75,7 +150,10 @@ class LedgerFlowView(BaseLedgerView):
         super().__init__(book, end_date)
 
     def get_lines_queryset(self):
-        return super().get_lines_queryset().filter(move__date__gte=self.start_date)
+        return super().get_lines_queryset().filter(date__gte=self.start_date)
+
+    def get_start_date(self) -> date:
+        return self.start_date
 
 
 class LedgerStateView(BaseLedgerView):
@@ -100,8 +178,60 @@ class LedgerStateView(BaseLedgerView):
             raise ValueError("Missing opening move")
         super().__init__(book, end_date)
 
+    cumulative = True
+
     def get_lines_queryset(self):
-        return super().get_lines_queryset().filter(move__date__gte=self.opening_move.date)
+        return super().get_lines_queryset().filter(date__gte=self.opening_move.date)
+
+    def get_start_date(self) -> date:
+        return self.opening_move.date
+
+    use_snapshots = True
+    """ Use :py:class:`~fin.models.book.AccountBalanceSnapshot` for whole months. """
+
+    def get_snapshot_period(self) -> tuple[date, date] | None:
+        """Return the first and last whole months covered by the view (if any)."""
+        start = self.opening_move.date
+        if start.day != 1:
+            start = (start.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+        end = self.end_date.replace(day=1)
+        if (self.end_date + timedelta(days=1)).day != 1:
+            end = (end - timedelta(days=1)).replace(day=1)
+
+        if start > end:
+            return None
+        return start, end
+
+    def get_snapshots_queryset(self, period: tuple[date, date]):
+        qs = AccountBalanceSnapshot.objects.filter(book=self.book, period__gte=period[0], period__lte=period[1])
+
+        if self.include_move_types:
+            qs = qs.filter(move_type__in=self.include_move_types)
+
+        if self.exclude_move_types:
+            qs = qs.exclude(move_type__in=self.exclude_move_types)
+
+        if self.include_account_types:
+            qs = qs.filter(account__type__in=self.include_account_types)
+        return qs
+
+    def balances(self):
+        """Return balances, from snapshots of whole months and lines for the remaining days."""
+        period = self.use_snapshots and self.get_snapshot_period()
+        if not period:
+            return super().balances()
+
+        snapshots = self.get_snapshots_queryset(period).values("account_id").annotate(total=Sum("amount"))
+        results = dict(snapshots.values_list("account_id", "total"))
+
+        # lines before the first month and after the last one.
+        end = (period[1] + timedelta(days=32)).replace(day=1)
+        delta = self.qs.filter(Q(date__lt=period[0]) | Q(date__gte=end))
+        delta = delta.values("account_id").annotate(total=Sum("norm_amount")).values_list("account_id", "total")
+        for account_id, total in delta:
+            results[account_id] = results.get(account_id, Decimal("0.00")) + total
+        return results
 
     def balance(self, account_id: int):
         return self.balances().get(account_id, Decimal("0.00"))
@@ -1,5 +1,21 @@
+from .batch import ReportBatch, ReportBatchResult
 from .builder import ReportBuilder
+from .export import XBRLExport, XBRLExportResult
+from .graph import ReportGraph
+from .profiler import ReportProfiler
 from .selector import Selector, SelectorParser
+from .validator import XBRLValidator
 
 
-__all__ = ("ReportBuilder", "Selector", "SelectorParser")
+__all__ = (
+    "ReportBatch",
+    "ReportBatchResult",
+    "ReportBuilder",
+    "ReportGraph",
+    "ReportProfiler",
+    "Selector",
+    "SelectorParser",
+    "XBRLExport",
+    "XBRLExportResult",
+    "XBRLValidator",
+)
@@ -0,0 +1,181 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import date
+import multiprocessing
+from time import perf_counter
+from typing import Callable, Iterable
+
+import django
+from django.db import IntegrityError, transaction
+
+from fin.models import Book, Line, Report, ReportTemplate
+from .builder import ReportBuilder
+from .graph import ReportGraph
+
+
+__all__ = ("ReportBatchResult", "ReportBatch", "build_book_reports", "save_failed_report")
+
+
+Period = tuple[date, date]
+
+
+@dataclass
+class ReportBatchResult:
+    """Result of a report build for a book and period."""
+
+    book_id: int
+    period: Period
+    report_id: int | None = None
+    """ The saved report. """
+    duration: float = 0.0
+    """ Build and save time in seconds. """
+    error: str | None = None
+    """ Error message if the build failed. """
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+    def as_dict(self) -> dict:
+        """Return result as a JSON serializable dict."""
+        return {
+            "book_id": self.book_id,
+            "start_date": self.period[0].isoformat(),
+            "end_date": self.period[1].isoformat(),
+            "report_id": self.report_id,
+            "duration": self.duration,
+            "error": self.error,
+        }
+
+
+def build_book_reports(template_id: int, book_id: int, periods: Iterable[Period]) -> list[ReportBatchResult]:
+    """Build and save reports of a book for the provided periods.
+
+    Periods are built in chronological order, each one in its own transaction,
+    using the latest built report ending before it as previous report. Errors are
+    reported in the results instead of being raised.
+
+    Failed builds are saved too (see :py:func:`save_failed_report`).
+    """
+    periods = sorted(periods)
+    try:
+        template = ReportTemplate.objects.get(pk=template_id)
+        book = Book.objects.select_related("template").get(pk=book_id)
+        builder = ReportBuilder(template, book)
+    except Exception as err:
+        results = [ReportBatchResult(book_id, period, error=f"{type(err).__name__}: {err}") for period in periods]
+        for result in results:
+            save_failed_report(template_id, result)
+        return results
+
+    results = []
+    reports = Report.objects.filter(template=template, book=book)
+    for period in periods:
+        result = ReportBatchResult(book_id, period)
+        start = perf_counter()
+        try:
+            with transaction.atomic():
+                previous = reports.filter(end_date__lt=period[0], built_at__isnull=False).order_by("-end_date").first()
+                lines = Line.objects.filter(book=book, date__gte=period[0], date__lte=period[1])
+                report, _ = builder.build(lines, period, previous=previous, save=True)
+                result.report_id = report.pk
+                reports.filter(start_date=period[0], end_date=period[1], error__isnull=False).delete()
+        except Exception as err:
+            result.error = f"{type(err).__name__}: {err}"
+        result.duration = perf_counter() - start
+        if result.error:
+            save_failed_report(template_id, result)
+        results.append(result)
+    return results
+
+
+def save_failed_report(template_id: int, result: ReportBatchResult):
+    """Save a failed build as a report without section, with its duration and error.
+
+    It replaces the previous failed reports of the period, and is replaced by
+    the next successful build. Nothing is saved if the book or template does
+    not exist.
+    """
+    try:
+        with transaction.atomic():
+            Report.objects.filter(
+                template_id=template_id,
+                book_id=result.book_id,
+                start_date=result.period[0],
+                end_date=result.period[1],
+                error__isnull=False,
+            ).delete()
+            report = Report.objects.create(
+                template_id=template_id,
+                book_id=result.book_id,
+                start_date=result.period[0],
+                end_date=result.period[1],
+                duration=result.duration,
+                error=result.error,
+            )
+    except IntegrityError:
+        return
+    result.report_id = report.pk
+
+
+class ReportBatch:
+    """Build reports of a template for many books and periods.
+
+    Books are dispatched over a process pool, each worker using its own
+    database connection and compiled report graph (cached for all the books
+    it handles). A failing book or period does not abort the others.
+    """
+
+    template: ReportTemplate
+    periods: list[Period]
+    workers: int | None
+    """ Number of worker processes. When ``0``, run in the current process. """
+
+    def __init__(self, template: ReportTemplate, periods: Iterable[Period], workers: int | None = None):
+        self.template = template
+        self.periods = list(periods)
+        self.workers = workers
+
+    def run(
+        self, book_ids: Iterable[int], callback: Callable[[list[ReportBatchResult]], None] | None = None
+    ) -> list[ReportBatchResult]:
+        """Build reports for the provided books.
+
+        :param book_ids: books to process
+        :param callback: called with each book's results as soon as they are available
+        :return: results, ordered by ``book_ids`` then period.
+        """
+        book_ids = list(book_ids)
+        # Compile the graph once: template errors are raised before dispatching books.
+        ReportGraph.get(self.template, ReportBuilder.get_selector_parser())
+
+        if self.workers == 0:
+            results = {}
+            for book_id in book_ids:
+                results[book_id] = build_book_reports(self.template.pk, book_id, self.periods)
+                callback and callback(results[book_id])
+        else:
+            results = self.run_pool(book_ids, callback)
+        return [result for book_id in book_ids for result in results[book_id]]
+
+    def run_pool(self, book_ids: list[int], callback=None) -> dict[int, list[ReportBatchResult]]:
+        """Build reports using a process pool."""
+        results = {}
+        # Spawned workers don't inherit the parent's database connections.
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(self.workers, mp_context=context, initializer=django.setup) as executor:
+            futures = {
+                executor.submit(build_book_reports, self.template.pk, book_id, self.periods): book_id
+                for book_id in book_ids
+            }
+            for future in as_completed(futures):
+                book_id = futures[future]
+                try:
+                    items = future.result()
+                except Exception as err:
+                    error = f"{type(err).__name__}: {err}"
+                    items = [ReportBatchResult(book_id, period, error=error) for period in sorted(self.periods)]
+                results[book_id] = items
+                callback and callback(items)
+        return results
@@ -1,15 +1,30 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
 from dataclasses import dataclass, field
 from datetime import date
 from decimal import Decimal, ROUND_HALF_UP
+from functools import cached_property
+from time import perf_counter
+from typing import Any, Iterable
 
-from fin.models.book import LineQuerySet, Book
+from dateutil.relativedelta import relativedelta
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Sum
+from django.utils import timezone
+
+from fin.models.book import AccountBalanceSnapshot, Book, Line, LineQuerySet
 from fin.models.report import ReportTemplate, Report, ReportSection
 
 from fin.utils.eval import get_interpreter, Interpreter
+from fin.utils.ranges import decode_ranges, encode_ranges
 
 from ..ledger import LedgerStateView, LedgerFlowView
 from .selector import Selector, LineQuery, SelectorParser
+from .hierarchy import AccountHierarchy
 from .graph import Formula, Node, ReportGraph, NodeMethod
+from .moves import MoveIndex
+from .profiler import ReportProfiler
+from .trie import AccountTrie
 
 
 __all__ = ("BuilderContext", "ReportBuilder")
@@ -25,14 +40,22 @@ class BuilderContext:
 
     previous: Report | None = None
     """ Previous report (as some values may be referring to it). """
-    previous_sections: dict[str, ReportSection] = field(default_factory=dict)
-    """ Relevant sections of the previous section's. """
+    previous_sections: dict[int, Decimal] = field(default_factory=dict)
+    """ Values of the previous report's sections by section template id. """
     interpreter: Interpreter | None = None
     """ Formula interpreter """
+    namespace: dict[str, Any] = field(default_factory=dict)
+    """ Names available to compiled formulas. """
     cache: dict[int, Decimal] = field(default_factory=dict)
     """ Result cache by node key. """
     token_cache: dict[int, Decimal] = field(default_factory=dict)
     """ Result cache by section template pk. """
+    trie: AccountTrie | None = None
+    """ Accounts totals used to resolve selectors without querying lines. """
+    move_indexes: dict[Selector.Scope, MoveIndex] = field(default_factory=dict)
+    """ Moves indexes used to resolve counterpart selectors, by scope (created on demand). """
+    token_lines: dict[int, list[int]] = field(default_factory=dict)
+    """ Ids of the lines selected by a token, by token key. """
     # section_lines: dict[int, LineQuerySet] = field(default_factory=dict)
     # """ Selected lines for a token. """
 
@@ -42,41 +65,122 @@ class ReportBuilder:
 
     selector_parser: SelectorParser
     nodes: ReportGraph
+    use_trie: bool = True
+    """ Resolve selectors from accounts totals when possible (see :py:class:`.AccountTrie`). """
+    use_move_index: bool = True
+    """ Resolve counterpart selectors from moves accounts when possible (see :py:class:`.MoveIndex`). """
+    workers: int = 0
+    """ Number of threads computing lines nodes (see :py:meth:`compute_nodes`). When ``0``, nodes are computed
+    sequentially. """
+    profiler: ReportProfiler | None = None
+    """ When set, record nodes computation timings, queries and cache hits (see :py:class:`.ReportProfiler`). """
+    series_steps = {"month": 1, "quarter": 3, "year": 12}
+    """ Allowed steps of :py:meth:`series`, as number of months. """
+    with_lines: bool = False
+    """ Store ids of the lines contributing to each section (see :py:attr:`.ReportSection.line_ranges`). """
 
-    def __init__(self, template: ReportTemplate, book: Book):
+    def __init__(self, template: ReportTemplate, book: Book, workers: int = 0):
         self.template = template
         self.book = book
-        self.selector_parser = SelectorParser(
+        self.workers = workers
+        self.nodes = ReportGraph.get(template, self.get_selector_parser())
+        self.selector_parser = self.nodes.selector_parser
+
+    @classmethod
+    def get_selector_parser(cls) -> SelectorParser:
+        """Return a new selector parser."""
+        return SelectorParser(
             single_filters=LineQuery.single_filters,
             operators=LineQuery.operators,
         )
-        self.nodes = ReportGraph(self.selector_parser)
-        self.nodes.build(template)
 
     def build(
-        self, lines: LineQuerySet, period: tuple[date, date], previous: Report | None = None
+        self,
+        lines: LineQuerySet,
+        period: tuple[date, date],
+        previous: Report | None = None,
+        save: bool = False,
     ) -> tuple[Report, dict[int, ReportSection]]:
-        out_of_range = lines.exclude(move__date__gte=period[0], move__date__lte=period[1])
+        """Build a report for the provided lines and period.
+
+        :param lines: lines of the period
+        :param period: report start and end dates
+        :param previous: previous report
+        :param save: save report and sections (see :py:meth:`save`).
+        :return: the report and sections by section template id.
+        """
+        out_of_range = lines.exclude(date__gte=period[0], date__lte=period[1])
         if out_of_range.exists():
             items = "\n".join(f"- {line}" for line in out_of_range)
             raise ValueError(f"Multiple lines are not in the period:\n{items}")
 
+        self.line_query = self.get_line_query(lines)
+        return self._build(period, previous, save)
+
+    def build_periods(
+        self,
+        periods: list[tuple[date, date]],
+        previous: Report | None = None,
+        save: bool = False,
+    ) -> list[tuple[Report, dict[int, ReportSection]]]:
+        """Build comparative reports for multiple periods (such as N, N-1, N-2) in one pass.
+
+        Accounts totals of all the periods are fetched with a single query (see
+        :py:meth:`.AccountTrie.from_periods`). Periods are built in chronological
+        order, each report being the previous one of the next: previous values
+        are taken from memory.
+
+        :param periods: reports start and end dates, that must not overlap
+        :param previous: previous report of the first period
+        :param save: save reports and sections (see :py:meth:`save`).
+        :return: the reports and sections by section template id, in chronological order.
+        :raises ValueError: periods are overlapping.
+        """
+        periods = sorted(periods)
+        for before, period in zip(periods, periods[1:]):
+            if period[0] <= before[1]:
+                raise ValueError(f"Periods are overlapping: {before} and {period}")
+
+        tries = [None] * len(periods)
+        if self.use_trie and periods:
+            view = LedgerFlowView(self.book, start_date=periods[0][0], end_date=periods[-1][1])
+            tries = AccountTrie.from_periods(view.qs, periods)
+
+        results, kwargs = [], {}
+        for period, trie in zip(periods, tries):
+            report, sections = self._build(period, previous, save, trie=trie, **kwargs)
+            results.append((report, sections))
+            previous = report
+            kwargs["previous_sections"] = {template_id: section.value for template_id, section in sections.items()}
+        return results
+
+    def _build(self, period, previous, save, **context_kwargs) -> tuple[Report, dict[int, ReportSection]]:
+        """Build report for the provided period, passing extra arguments to :py:meth:`get_context`."""
+        start = perf_counter()
         report = Report(
             template=self.template,
             book=self.book,
             previous=previous,
             start_date=period[0],
             end_date=period[1],
+            built_at=timezone.now(),
         )
 
-        self.line_query = LineQuery(lines)
-        context = self.get_context(period, previous=previous)
-        sections = {}
-        for node in self.nodes.iter():
-            result = self.compute_node(context, node)
-            section = ReportSection(report=report, template_id=node.section_id, value=result)
-            section._node = node
-            sections[node.section_id] = section
+        with self.profile_queries():
+            context = self.get_context(period, previous=previous, **context_kwargs)
+            if self.workers:
+                self.compute_nodes(context)
+
+            sections = {}
+            for node in self.nodes.iter():
+                result = self.compute_node(context, node)
+                section = self.get_section(report, node, result)
+                section._node = node
+                sections[node.section_id] = section
+
+            if self.with_lines:
+                for key, ids in self.get_lines(context).items():
+                    sections[self.nodes[key].section_id].line_ranges = encode_ranges(ids)
 
         for node in self.nodes.iter():
             section = sections[node.section_id]
@@ -84,8 +188,290 @@ class ReportBuilder:
                 # FIXME here
                 section.parent = sections.get(parent_id)
 
+        report.duration = perf_counter() - start
+        if self.profiler:
+            self.profiler.duration += report.duration
+        if save:
+            self.save(report, sections)
         return report, sections
 
+    def series(
+        self, section_codes: Iterable[str], start: date, end: date, step: str = "month"
+    ) -> tuple[list[tuple[date, date]], dict[str, list[Decimal]]]:
+        """Return values of some sections over consecutive periods (such as monthly trends).
+
+        Only the requested sections and the nodes they depend on are
+        evaluated, for all periods at once: accounts totals are fetched by a
+        single query grouped by period (see :py:meth:`.AccountTrie.from_periods`),
+        and each node is computed for every period before the nodes depending on it.
+        Values are the same as :py:meth:`build` ones for each period, except
+        for previous report sections which are zero.
+
+        :param section_codes: codes of the sections to evaluate
+        :param start: start date of the first period
+        :param end: end date of the last period
+        :param step: periods length (see :py:attr:`series_steps`).
+        :return: the periods, and the values by section code.
+        :raises KeyError: a section code is not in the template.
+        """
+        periods = self.get_series_periods(start, end, step)
+        codes = list(section_codes)
+        keys = {code: self.nodes[Selector.from_section(code)].key for code in codes}
+        closure = self.nodes.get_dependencies(keys.values())
+
+        view = LedgerFlowView(self.book, start_date=start, end_date=end)
+        tries = AccountTrie.from_periods(view.qs, periods) if self.use_trie else [None] * len(periods)
+        contexts = [self.get_context(period, trie=trie) for period, trie in zip(periods, tries)]
+
+        values, lines = {}, {}
+        for node in self.nodes.iter():
+            if node.key in closure:
+                result = self._compute_series_node(contexts, values, lines, node)
+                values[node.key] = [
+                    Decimal(value).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP) for value in result
+                ]
+        return periods, {code: values[key] for code, key in keys.items()}
+
+    def get_series_periods(self, start: date, end: date, step: str = "month") -> list[tuple[date, date]]:
+        """Return calendar aligned periods from ``start`` to ``end`` (see :py:meth:`series`)."""
+        if step not in self.series_steps:
+            raise ValueError(f"Invalid step `{step}` (allowed: {', '.join(self.series_steps)})")
+
+        months = self.series_steps[step]
+        period_start = start.replace(month=start.month - (start.month - 1) % months, day=1)
+        periods = []
+        while period_start <= end:
+            period_end = period_start + relativedelta(months=months, days=-1)
+            periods.append((max(period_start, start), min(period_end, end)))
+            period_start += relativedelta(months=months)
+        return periods
+
+    def _compute_series_node(
+        self,
+        contexts: list[BuilderContext],
+        values: dict[int, list[Decimal]],
+        lines: dict[str, list[Decimal]],
+        node: Node,
+    ) -> list[Decimal]:
+        """Return node's values for each context, using ``values`` of the nodes it depends on.
+
+        :param lines: values of the lines tokens by token key, filled on first use.
+        """
+
+        def get_values(node_key, key) -> list[Decimal]:
+            token = self.nodes[node_key].formula.selectors[key]
+            if token.is_section:
+                return values[self.nodes[token].key]
+            if token.key not in lines:
+                lines[token.key] = self.compute_series_lines(contexts, token)
+            return lines[token.key]
+
+        size = len(contexts)
+        match node.method:
+            case NodeMethod.FORMULA:
+                result = []
+                for i, context in enumerate(contexts):
+                    get_value = lambda *args, i=i: get_values(*args)[i]  # noqa: E731
+                    if not node.formula.func:
+                        context.interpreter.symtable[Formula._selector_func] = get_value
+                        result.append(self.eval_formula(context, node.formula))
+                        continue
+                    try:
+                        result.append(node.formula.func({"Decimal": Decimal, Formula._selector_func: get_value}))
+                    except Exception as err:
+                        raise RuntimeError(
+                            f"An error occured while evaluating: {node.formula.expression}\n{err}"
+                        ) from err
+                return result
+            case NodeMethod.LINES:
+                return self.compute_series_lines(contexts, self.selector_parser.parse("@" + node.code))
+            case NodeMethod.DEPENDENCIES:
+                return [
+                    sum(values[token.key][i] * self.nodes[token.key].weight for token in node.dependencies)
+                    for i in range(size)
+                ]
+        return [Decimal("0.")] * size
+
+    def compute_series_lines(self, contexts: list[BuilderContext], token: Selector) -> list[Decimal]:
+        """Return values of a lines token for each context (see :py:meth:`series`).
+
+        Tokens that can't be resolved from the accounts totals are aggregated
+        by a single query grouped by period, unless they depend on the period
+        (opening and closing filters).
+        """
+        trie = contexts[0].trie
+        prefetch = (
+            not (trie and trie.can_resolve(token))
+            and token.aggr == "sum"
+            and token.key not in contexts[0].token_cache
+            and not any(f.tag in ("opening", "closing") for f in token.filters or ())
+        )
+        if prefetch:
+            periods = [context.period for context in contexts]
+            view = LedgerFlowView(self.book, start_date=periods[0][0], end_date=periods[-1][1])
+            selected = self.get_line_query(view.qs).get_queryset(contexts[0], token, aggregate=False)
+            query = (
+                Line.objects.filter(pk__in=selected.values("pk"))
+                .annotate(period_index=AccountTrie.get_period_index(periods))
+                .values("period_index")
+                .annotate(total=Sum(AccountTrie.fields[token.scope]))
+                .order_by()
+            )
+            for context in contexts:
+                context.token_cache[token.key] = Decimal("0.00")
+            for index, total in query.values_list("period_index", "total"):
+                if index is not None:
+                    contexts[index].token_cache[token.key] = total or Decimal("0.00")
+        return [self.compute_lines(context, token) for context in contexts]
+
+    def rebuild(self, report: Report) -> tuple[Report, dict[int, ReportSection]]:
+        """Update a saved report, only recomputing sections impacted by changes since it was built.
+
+        Other sections values are reused. When the report sections don't match
+        the template anymore, all sections are recreated.
+
+        :param report: the saved report to update
+        :return: the report and sections by section template id.
+        """
+        start = perf_counter()
+        built_at = timezone.now()
+        sections = {section.template_id: section for section in report.sections.all()}
+        if not report.built_at or sections.keys() != {node.section_id for node in self.nodes.iter()}:
+            report.sections.all().delete()
+            lines = Line.objects.filter(book=self.book, date__gte=report.start_date, date__lte=report.end_date)
+            _, sections = self.build(lines, (report.start_date, report.end_date), report.previous)
+            report.built_at, report.duration, report.stale = built_at, perf_counter() - start, False
+            report.error = None
+            self.save(report, sections)
+            return report, sections
+
+        dirty = self.get_dirty_nodes(report)
+        context = self.get_context((report.start_date, report.end_date), previous=report.previous)
+        for node in self.nodes.iter():
+            if node.key not in dirty:
+                context.cache[node.key] = sections[node.section_id].value
+
+        to_update = []
+        for node in self.nodes.iter():
+            if node.key in dirty:
+                section = sections[node.section_id]
+                section.value = self.compute_node(context, node)
+                to_update.append(section)
+
+        fields = ["value"]
+        if self.with_lines:
+            known = {
+                node.key: decode_ranges(sections[node.section_id].line_ranges)
+                for node in self.nodes.iter()
+                if node.key not in dirty
+            }
+            for key, ids in self.get_lines(context, known).items():
+                if key in dirty:
+                    sections[self.nodes[key].section_id].line_ranges = encode_ranges(ids)
+            fields.append("line_ranges")
+
+        to_update and ReportSection.objects.bulk_update(to_update, fields)
+        report.built_at, report.duration, report.stale = built_at, perf_counter() - start, False
+        report.save(update_fields=["built_at", "duration", "stale"])
+        return report, sections
+
+    def is_fresh(self, report: Report) -> bool:
+        """Return True if the saved report is up to date: :py:meth:`rebuild` would not change it."""
+        if not report.built_at or report.stale:
+            return False
+        sections = set(report.sections.values_list("template_id", flat=True))
+        if sections != {node.section_id for node in self.nodes.iter()}:
+            return False
+        return not self.get_dirty_nodes(report)
+
+    def get_changed_accounts(self, report: Report) -> list[str]:
+        """Return codes of accounts whose balance changed since the report was built."""
+        query = AccountBalanceSnapshot.objects.filter(
+            book=report.book_id, period__lte=report.end_date, updated_at__gt=report.built_at
+        )
+        return list(query.values_list("account__code", flat=True).distinct())
+
+    def get_dirty_nodes(self, report: Report) -> set[int]:
+        """Return keys of nodes to recompute since the report was built.
+
+        Nodes reading changed accounts are dirty, as well as their dependents
+        (see :py:meth:`.ReportGraph.get_account_nodes`).
+        """
+        dirty = self.nodes.get_account_nodes(self.get_changed_accounts(report))
+        if report.previous and report.previous.built_at and report.previous.built_at > report.built_at:
+            previous = [node.key for node in self.nodes.iter() if node.method == NodeMethod.PREVIOUS]
+            dirty |= self.nodes.get_dependents(previous)
+        return dirty
+
+    def get_lines(self, context: BuilderContext, known: dict[int, Iterable[int]] | None = None) -> dict[int, set[int]]:
+        """Return ids of the lines contributing to each node, by node key.
+
+        Nodes get the lines of their selectors and of the sections they depend on.
+
+        :param context: the build context
+        :param known: already known lines of some nodes, that are not computed again.
+        """
+        lines = {key: set(ids) for key, ids in (known or {}).items()}
+        for node in self.nodes.iter():
+            if node.key in lines:
+                continue
+            ids = lines[node.key] = set()
+            for selector in self.nodes.get_node_selectors(node):
+                ids.update(self.get_token_lines(context, selector))
+            for token in node.dependencies:
+                ids.update(lines.get(token.key, ()))
+        return lines
+
+    def get_token_lines(self, context: BuilderContext, token: Selector) -> list[int]:
+        """Return ids of the lines selected by a token, using the queryset :py:meth:`compute_lines` aggregates."""
+        if token.key not in context.token_lines:
+            ledger_view = context.state_view if token.scope == token.Scope.STATE else context.flow_view
+            query = self.get_line_query(ledger_view.qs).get_queryset(context, token, aggregate=False)
+            context.token_lines[token.key] = list(query.values_list("id", flat=True))
+        return context.token_lines[token.key]
+
+    def get_section(self, report: Report, node: Node, value: Decimal) -> ReportSection:
+        """Return a report section for the provided node, copying section template's content."""
+        template = self.nodes.sections[node.section_id]
+        return ReportSection(
+            report=report,
+            template_id=node.section_id,
+            value=value,
+            name=template.name,
+            order=template.order,
+            code=template.code or "",
+            weight=template.weight,
+        )
+
+    def save(self, report: Report, sections: dict[int, ReportSection]):
+        """Save report and its sections, using a single insert for all sections.
+
+        :param report: the report to save
+        :param sections: the sections by section template id, as returned by :py:meth:`build`.
+        """
+        report.save()
+        items = list(sections.values())
+        parents = [section.parent for section in items]
+        for section in items:
+            section.report = report
+            section.parent = None
+
+        ReportSection.objects.bulk_create(items)
+
+        for section, parent in zip(items, parents):
+            section.parent = parent
+        if to_update := [section for section in items if section.parent]:
+            ReportSection.objects.bulk_update(to_update, ["parent"])
+
+    @cached_property
+    def hierarchy(self) -> AccountHierarchy | None:
+        """Accounts hierarchy of the book template, used to look up accounts by code prefixes."""
+        return AccountHierarchy.from_template(self.book.template_id)
+
+    def get_line_query(self, qs: LineQuerySet) -> LineQuery:
+        """Return LineQuery for the provided lines."""
+        return LineQuery(qs, hierarchy=self.hierarchy)
+
     def get_context(self, period, previous=None, **kwargs) -> BuilderContext:
         """Return the builder's context for the provided lines."""
         context = BuilderContext(
@@ -95,30 +481,39 @@ class ReportBuilder:
             state_view=LedgerFlowView(self.book, start_date=period[0], end_date=period[1]),
             **kwargs,
         )
+        context.namespace = self.get_namespace(context)
         context.interpreter = self.get_interpreter(context)
-        context.flow_query = LineQuery(context.flow_view.get_lines_queryset())
-        context.state_query = LineQuery(context.state_view.get_lines_queryset())
+        context.flow_query = self.get_line_query(context.flow_view.get_lines_queryset())
+        context.state_query = self.get_line_query(context.state_view.get_lines_queryset())
+        if self.use_trie and not context.trie:
+            context.trie = AccountTrie.from_querysets(
+                {Selector.Scope.FLOW: context.flow_view.qs, Selector.Scope.STATE: context.state_view.qs}
+            )
 
-        if previous:
-            p_sections_templates = self.template.sections.filter(previous__isnull=False)
+        if previous and "previous_sections" not in kwargs:
+            previous_ids = self.template.sections.filter(previous__isnull=False).values("previous_id")
             context.previous_sections = dict(
-                previous.sections.filter(template__in=p_sections_templates).values_list("pk", "value")
+                previous.sections.filter(template__in=previous_ids).values_list("template_id", "value")
             )
         return context
 
     def get_interpreter(self, context: BuilderContext, **eval_context) -> Interpreter:
         """Initialize formula interpreter."""
-        return get_interpreter(
-            {
-                **eval_context,
-                Formula._selector_func: lambda *args: self._eval_get_value(context, *args),
-            }
-        )
+        return get_interpreter(self.get_namespace(context, **eval_context))
+
+    def get_namespace(self, context: BuilderContext, **eval_context) -> dict[str, Any]:
+        """Return names available to formulas."""
+        return {
+            "Decimal": Decimal,
+            **eval_context,
+            Formula._selector_func: lambda *args: self._eval_get_value(context, *args),
+        }
 
     def _eval_get_value(self, context: BuilderContext, node_key: int, key: int):
         """The method being called on back-bracket expression of a formula."""
         try:
             if key in context.cache:
+                self.profiler and self.profiler.hit("cache")
                 return context.cache[key]
 
             node = self.nodes[node_key]
@@ -134,21 +529,68 @@ class ReportBuilder:
             traceback.print_exc()
             raise
 
+    def compute_nodes(self, context: BuilderContext):
+        """Compute all the nodes into context's cache, dispatching lines nodes to a thread pool.
+
+        Nodes are computed as soon as their dependencies are: lines nodes by the
+        workers, other ones in the current thread. Each worker uses its own
+        database connection, thus won't see uncommitted changes of the current
+        transaction.
+        """
+        sorter = self.nodes.get_sorter()
+        sorter.prepare()
+        pending, opened = {}, set()
+        try:
+            with ThreadPoolExecutor(self.workers, thread_name_prefix="report") as executor:
+                while sorter.is_active():
+                    for token in sorter.get_ready():
+                        node = self.nodes[token]
+                        if node.method == NodeMethod.LINES:
+                            pending[executor.submit(self._compute_node_worker, context, node, opened)] = token
+                        else:
+                            self.compute_node(context, node)
+                            sorter.done(token)
+
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                        sorter.done(pending.pop(future))
+        finally:
+            for connection in opened:
+                # Workers are done: their connections can be closed from here.
+                connection.inc_thread_sharing()
+                connection.close()
+                connection.dec_thread_sharing()
+
+    def _compute_node_worker(self, context: BuilderContext, node: Node, opened: set):
+        """Compute a node in a worker thread, registering its database connection into ``opened``."""
+        opened.add(connections[DEFAULT_DB_ALIAS])
+        with self.profile_queries():
+            return self.compute_node(context, node)
+
+    def profile_queries(self):
+        """Return context recording queries of the current thread into the profiler, if any."""
+        if self.profiler:
+            return connections[DEFAULT_DB_ALIAS].execute_wrapper(self.profiler)
+        return nullcontext()
+
     def compute_node(self, context: BuilderContext, node: Node):
         """Compute a node value, fetching from or updating the cache."""
         if node.key in context.cache:
+            self.profiler and self.profiler.hit("cache", node)
             return context.cache[node.key]
 
+        with self.profiler.node(node) if self.profiler else nullcontext():
+            result = self._compute_node(context, node)
+        result = context.cache[node.key] = Decimal(result).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+        return result
+
+    def _compute_node(self, context: BuilderContext, node: Node):
         match node.method:
             case NodeMethod.PREVIOUS:
                 result = context.previous_sections.get(node.previous_id) or Decimal("0.")
             case NodeMethod.FORMULA:
-                result = context.interpreter.eval(node.formula.expression)
-                if context.interpreter.error:
-                    section = self.nodes[node.key]
-                    raise RuntimeError(
-                        f"An error occured while evaluating: {section.expression}\n{context.interpreter.error}"
-                    )
+                result = self.eval_formula(context, node.formula)
             case NodeMethod.LINES:
                 token = self.selector_parser.parse("@" + node.code)
                 result = self.compute_lines(context, token)
@@ -159,13 +601,25 @@ class ReportBuilder:
                     breakpoint()
             case _:
                 result = Decimal("0.")
+        return result
 
-        context.cache[node.key] = Decimal(result).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+    def eval_formula(self, context: BuilderContext, formula: Formula):
+        """Evaluate formula, using the compiled expression if any, the interpreter otherwise."""
+        if formula.func:
+            try:
+                return formula.func(context.namespace)
+            except Exception as err:
+                raise RuntimeError(f"An error occured while evaluating: {formula.expression}\n{err}") from err
+
+        result = context.interpreter.eval(formula.expression)
+        if context.interpreter.error:
+            raise RuntimeError(f"An error occured while evaluating: {formula.expression}\n{context.interpreter.error}")
         return result
 
     def compute_lines(self, context: BuilderContext, token: Selector):
         """Compute lines for the provided token."""
         if token.key in context.token_cache:
+            self.profiler and self.profiler.hit("token_cache")
             return context.token_cache[token.key]
 
         if token.scope == token.Scope.STATE:
@@ -173,9 +627,17 @@ class ReportBuilder:
         else:
             ledger_view = context.flow_view
 
-        line_query = LineQuery(ledger_view.qs)
-        query = line_query.get_queryset(context, token, aggregate=False)
-        result = line_query.apply_aggregate(token, query)["total"] or Decimal("0.00")
+        if context.trie and context.trie.can_resolve(token):
+            result = context.trie.resolve(token)
+        elif self.use_move_index and MoveIndex.can_resolve(token):
+            if token.scope not in context.move_indexes:
+                field = AccountTrie.fields[token.scope]
+                context.move_indexes[token.scope] = MoveIndex.from_queryset(ledger_view.qs, field)
+            result = context.move_indexes[token.scope].resolve(token)
+        else:
+            line_query = self.get_line_query(ledger_view.qs)
+            query = line_query.get_queryset(context, token, aggregate=False)
+            result = line_query.apply_aggregate(token, query)["total"] or Decimal("0.00")
         context.token_cache[token.key] = result
         # context.section_lines[token.key] = query
         return result
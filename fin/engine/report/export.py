@@ -0,0 +1,311 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import date
+import hashlib
+import json
+import multiprocessing
+from pathlib import Path
+import tempfile
+from time import perf_counter
+from typing import BinaryIO, Callable, Iterable
+from xml.etree import ElementTree
+import zipfile
+
+import django
+from django.db import transaction
+
+from fin.models import Book, Line, Report, ReportTemplate
+from .builder import ReportBuilder
+from .graph import ReportGraph
+from .validator import get_validator
+from .xbrl import XBRLReportBuilder
+
+
+__all__ = ("XBRLExportResult", "XBRLExport", "export_book_xbrl", "validate_xbrl")
+
+
+Period = tuple[date, date]
+
+
+@dataclass
+class XBRLExportResult:
+    """Result of the XBRL export of a book's report."""
+
+    book_id: int
+    period: Period
+    filename: str | None = None
+    """ Exported file name, relative to the export directory. """
+    report_id: int | None = None
+    reused: bool = False
+    """ The saved report was fresh and has not been rebuilt. """
+    checksum: str | None = None
+    """ SHA-256 of the exported file. """
+    size: int = 0
+    build_duration: float = 0.0
+    """ Report build (or freshness check) time in seconds. """
+    render_duration: float = 0.0
+    """ XBRL rendering time in seconds. """
+    valid: bool | None = None
+    """ Validation status, None when the file has not been validated. """
+    validation_errors: list[str] = field(default_factory=list)
+    error: str | None = None
+    """ Error message if the export failed. """
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+    def as_dict(self) -> dict:
+        """Return result as a JSON serializable dict."""
+        return {
+            "book_id": self.book_id,
+            "start_date": self.period[0].isoformat(),
+            "end_date": self.period[1].isoformat(),
+            "filename": self.filename,
+            "report_id": self.report_id,
+            "reused": self.reused,
+            "checksum": self.checksum,
+            "size": self.size,
+            "build_duration": self.build_duration,
+            "render_duration": self.render_duration,
+            "valid": self.valid,
+            "validation_errors": self.validation_errors,
+            "error": self.error,
+        }
+
+
+class ChecksumWriter:
+    """Binary file-like wrapper computing SHA-256 and size of the written data."""
+
+    def __init__(self, out: BinaryIO):
+        self.out = out
+        self.hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self.hash.update(data)
+        self.size += len(data)
+        return self.out.write(data)
+
+    def flush(self):
+        self.out.flush()
+
+
+def validate_xbrl(path: Path, packages: Iterable[str] | None = None) -> list[str]:
+    """Validate an exported file, returning errors.
+
+    Check that the document is well-formed XML, then validate it against
+    the taxonomy packages when provided (see :py:class:`.XBRLValidator`).
+    """
+    try:
+        for _ in ElementTree.iterparse(path):
+            pass
+    except ElementTree.ParseError as err:
+        return [str(err)]
+    if packages:
+        return get_validator(tuple(str(package) for package in packages)).validate(path)
+    return []
+
+
+def get_report(builder: ReportBuilder, period: Period) -> tuple[Report, bool]:
+    """Return the saved report of the builder's book for the period, building or rebuilding it if required.
+
+    :return: the report, and whether it was reused as is.
+    """
+    report = (
+        Report.objects.filter(template=builder.template, book=builder.book, start_date=period[0], end_date=period[1])
+        .select_related("previous")
+        .order_by("-built_at", "-pk")
+        .first()
+    )
+    if report is not None:
+        if builder.is_fresh(report):
+            return report, True
+        return builder.rebuild(report)[0], False
+
+    previous = (
+        Report.objects.filter(
+            template=builder.template, book=builder.book, end_date__lt=period[0], built_at__isnull=False
+        )
+        .order_by("-end_date")
+        .first()
+    )
+    lines = Line.objects.filter(book=builder.book, date__gte=period[0], date__lte=period[1])
+    return builder.build(lines, period, previous=previous, save=True)[0], False
+
+
+def export_book_xbrl(
+    template_id: int,
+    book_id: int,
+    period: Period,
+    directory: str,
+    entity: str | None = None,
+    packages: tuple[str, ...] | None = None,
+) -> XBRLExportResult:
+    """Export the XBRL instance of a book's report into ``directory``.
+
+    The saved report is reused when fresh (see :py:meth:`.ReportBuilder.is_fresh`),
+    otherwise it is rebuilt (or built) and saved. Errors are reported in the
+    result instead of being raised.
+
+    :param entity: XBRL entity identifier, defaults to the book id.
+    :param packages: taxonomy packages to validate the file against.
+    """
+    result = XBRLExportResult(book_id, period)
+    try:
+        start = perf_counter()
+        with transaction.atomic():
+            template = ReportTemplate.objects.get(pk=template_id)
+            book = Book.objects.select_related("template").get(pk=book_id)
+            report, result.reused = get_report(ReportBuilder(template, book), period)
+            result.report_id = report.pk
+        result.build_duration = perf_counter() - start
+
+        start = perf_counter()
+        result.filename = f"book-{book_id}-{period[0].isoformat()}-{period[1].isoformat()}.xbrl"
+        path = Path(directory) / result.filename
+        with open(path, "wb") as stream:
+            out = ChecksumWriter(stream)
+            XBRLReportBuilder(entity or str(book_id)).write(report, out)
+        result.checksum, result.size = out.hash.hexdigest(), out.size
+        result.render_duration = perf_counter() - start
+
+        result.validation_errors = validate_xbrl(path, packages)
+        result.valid = not result.validation_errors
+    except Exception as err:
+        result.error = f"{type(err).__name__}: {err}"
+    return result
+
+
+class XBRLExport:
+    """Export XBRL instances of a report template for many books and a filing period.
+
+    Books are dispatched over a process pool, as for :py:class:`.ReportBatch`.
+    Files are written into a directory, or a zip archive when the output path
+    ends with ``.zip``, along with a ``manifest.json`` file listing the results.
+    """
+
+    manifest_name = "manifest.json"
+
+    template: ReportTemplate
+    period: Period
+    entities: dict[int, str]
+    """ XBRL entity identifiers by book id. """
+    packages: tuple[str, ...]
+    """ Taxonomy packages to validate files against. """
+    workers: int | None
+    """ Number of worker processes. When ``0``, run in the current process. """
+
+    def __init__(
+        self,
+        template: ReportTemplate,
+        period: Period,
+        entities: dict[int, str] | None = None,
+        packages: Iterable[Path] | None = None,
+        workers: int | None = None,
+    ):
+        self.template = template
+        self.period = period
+        self.entities = entities or {}
+        self.packages = tuple(str(package) for package in packages or ())
+        self.workers = workers
+
+    def run(
+        self,
+        book_ids: Iterable[int],
+        output: Path,
+        callback: Callable[[XBRLExportResult], None] | None = None,
+    ) -> list[XBRLExportResult]:
+        """Export the XBRL instances of the provided books.
+
+        :param book_ids: books to process
+        :param output: output directory, or zip file
+        :param callback: called with each book's result as soon as it is available
+        :return: results, ordered by ``book_ids``.
+        :raises ValueError: the template has no XBRL schema, or taxonomy packages are missing.
+        """
+        if self.template.xbrl is None:
+            raise ValueError(f"Report template {self.template.name} can't be exported to XBRL.")
+
+        book_ids = list(book_ids)
+        # Compile the graph once: template errors are raised before dispatching books.
+        ReportGraph.get(self.template, ReportBuilder.get_selector_parser())
+        # Same for missing taxonomy packages
+        self.packages and get_validator(self.packages)
+
+        output = Path(output)
+        if output.suffix != ".zip":
+            output.mkdir(parents=True, exist_ok=True)
+            results = self.export(book_ids, output, callback)
+            self.write_manifest(results, output / self.manifest_name)
+            return results
+
+        with tempfile.TemporaryDirectory() as directory:
+            results = self.export(book_ids, Path(directory), callback)
+            self.write_zip(results, Path(directory), output)
+        return results
+
+    def export(self, book_ids: list[int], directory: Path, callback=None) -> list[XBRLExportResult]:
+        """Export books' files into the directory."""
+        if self.workers == 0:
+            results = {}
+            for book_id in book_ids:
+                results[book_id] = self.export_book(book_id, directory)
+                callback and callback(results[book_id])
+        else:
+            results = self.export_pool(book_ids, directory, callback)
+        return [results[book_id] for book_id in book_ids]
+
+    def export_book(self, book_id: int, directory: Path) -> XBRLExportResult:
+        return export_book_xbrl(
+            self.template.pk, book_id, self.period, str(directory), self.entities.get(book_id), self.packages
+        )
+
+    def export_pool(self, book_ids: list[int], directory: Path, callback=None) -> dict[int, XBRLExportResult]:
+        """Export books using a process pool."""
+        results = {}
+        # Spawned workers don't inherit the parent's database connections.
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(self.workers, mp_context=context, initializer=django.setup) as executor:
+            futures = {
+                executor.submit(
+                    export_book_xbrl,
+                    self.template.pk,
+                    book_id,
+                    self.period,
+                    str(directory),
+                    self.entities.get(book_id),
+                    self.packages,
+                ): book_id
+                for book_id in book_ids
+            }
+            for future in as_completed(futures):
+                book_id = futures[future]
+                try:
+                    result = future.result()
+                except Exception as err:
+                    result = XBRLExportResult(book_id, self.period, error=f"{type(err).__name__}: {err}")
+                results[book_id] = result
+                callback and callback(result)
+        return results
+
+    def get_manifest(self, results: list[XBRLExportResult]) -> dict:
+        """Return manifest content."""
+        return {
+            "template": self.template.name,
+            "start_date": self.period[0].isoformat(),
+            "end_date": self.period[1].isoformat(),
+            "files": [result.as_dict() for result in results],
+        }
+
+    def write_manifest(self, results: list[XBRLExportResult], path: Path):
+        path.write_text(json.dumps(self.get_manifest(results), indent=2))
+
+    def write_zip(self, results: list[XBRLExportResult], directory: Path, path: Path):
+        """Write exported files and manifest into a zip archive."""
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for result in results:
+                if result.filename and (directory / result.filename).exists():
+                    archive.write(directory / result.filename, result.filename)
+            archive.writestr(self.manifest_name, json.dumps(self.get_manifest(results), indent=2))
@@ -3,11 +3,14 @@ from dataclasses import dataclass, field
 from decimal import Decimal
 from enum import Enum
 from graphlib import TopologicalSorter
+import hashlib
 import re
-from typing import Generator
+import threading
+from typing import Generator, Iterable
 
 
-from fin.models import ReportTemplate
+from fin.models import ReportTemplate, ReportSectionTemplate
+from fin.utils.eval import CompileError, CompiledExpression, compile_expression
 from .selector import Selector, SelectorFormatError, SelectorParser
 
 
@@ -19,9 +22,13 @@ class Formula:
     """ The compiled python expression to evaluate. """
     selectors: dict[str, Selector]
     """ The list of extracted selectors. """
+    func: CompiledExpression | None = field(default=None, compare=False)
+    """ Compiled expression, None when it must be evaluated by the interpreter. """
 
     _selector_re = re.compile(r"`([^`]+)`")
     _selector_func = "get_value"
+    _functions = frozenset(("Decimal", _selector_func))
+    """ Functions that compiled formulas can call, formulas calling others are evaluated by asteval. """
 
     @classmethod
     def compile(cls, parser: SelectorParser, parent: Selector, expr: str) -> Formula:
@@ -54,9 +61,15 @@ class Formula:
         if wrongs:
             raise SelectorFormatError(f"Multiple selectors are not correct: {(', ').join(wrongs)}")
 
+        try:
+            func = compile_expression(new_expr, cls._functions)
+        except CompileError:
+            func = None
+
         return Formula(
             expression=new_expr,
             selectors=selectors,
+            func=func,
         )
 
 
@@ -106,43 +119,200 @@ class ReportGraph:
     """
     Dependency and execution graph based on provided sections.
 
+    Compiled graphs are cached process-wide by template (see :py:meth:`get`).
+
     .. important::
 
         Only sections with a code will be added to the graph.
     """
 
     items: dict[int, Node] = field(default_factory=dict)
+    order: list[int]
+    """ Node keys in topological order. """
+    sections: dict[int, ReportSectionTemplate]
+    """ Section templates by id. """
+    dependents: dict[int, set[int]]
+    """ Keys of nodes depending directly on a node, by node key. """
+    account_index: dict[str, frozenset[int]]
+    """ Keys of the nodes depending on an account code prefix (see :py:meth:`get_account_index`). """
+    account_any: frozenset[int]
+    """ Keys of the nodes depending on any account. """
+    fingerprint: str = ""
+    """ Fingerprint of the template sections the graph has been built from. """
+
+    _cache: dict[int, ReportGraph] = {}
+    """ Compiled graphs by template id. """
+    _cache_lock = threading.Lock()
+
+    move_filters = {"counterpart"}
+    """ Selector filters whose selection depends on the other accounts of the moves. """
+
+    fingerprint_fields = ("id", "parent_id", "name", "order", "code", "weight", "formula", "previous_id")
+    """ Section fields used to compute the fingerprint: the graph content, and the fields
+    copied from :py:attr:`sections` to the report sections. """
 
     def __init__(self, selector_parser):
         self.selector_parser = selector_parser
+        self.order = []
+        self.sections = {}
+        self.dependents = {}
+        self.account_index, self.account_any = {}, frozenset()
 
-    def build(self, template: ReportTemplate):
-        """Initialize the graph."""
-        items = {}
+    @classmethod
+    def get(cls, template: ReportTemplate, selector_parser: SelectorParser) -> ReportGraph:
+        """Return the compiled graph for this template, from cache when it is up to date.
 
+        :param template: the report template
+        :param selector_parser: parser used when the graph must be built.
+        """
+        sections = list(template.sections.all().order_by("order"))
+        fingerprint = cls.get_fingerprint(sections)
+
+        graph = cls._cache.get(template.pk)
+        if graph is None or graph.fingerprint != fingerprint:
+            graph = cls(selector_parser)
+            graph.build(template, sections)
+            with cls._cache_lock:
+                cls._cache[template.pk] = graph
+        return graph
+
+    @classmethod
+    def invalidate(cls, template_id: int | None = None):
+        """Remove template's graph from cache, or all of them if no template is provided."""
+        with cls._cache_lock:
+            if template_id is None:
+                cls._cache.clear()
+            else:
+                cls._cache.pop(template_id, None)
+
+    @classmethod
+    def get_fingerprint(cls, sections: Iterable[ReportSectionTemplate]) -> str:
+        """Return a fingerprint of the provided sections content."""
+        digest = hashlib.blake2b(digest_size=16)
+        for section in sections:
+            digest.update(repr(tuple(getattr(section, f) for f in cls.fingerprint_fields)).encode())
+        return digest.hexdigest()
+
+    def build(self, template: ReportTemplate, sections: list[ReportSectionTemplate] | None = None):
+        """Initialize the graph.
+
+        :param template: report template
+        :param sections: the template sections ordered by ``order`` (fetched when not provided).
+        """
+        if sections is None:
+            sections = list(template.sections.all().order_by("order"))
+
+        children = {}
+        for section in sections:
+            children.setdefault(section.parent_id, []).append(section.code)
+
+        items = {}
         # run over all sections of a report
-        for section in template.sections.all().order_by("order"):
-            if node := self.get_section_node(section):
+        for section in sections:
+            if node := self.get_section_node(section, children.get(section.id, [])):
                 items[node.key] = node
 
         self.items = items
+        self.sections = {section.id: section for section in sections}
+        self.order = self.get_order()
+        self.dependents = self.get_dependents_map()
+        self.account_index, self.account_any = self.get_account_index()
+        self.fingerprint = self.get_fingerprint(sections)
         return items
 
-    def iter(self) -> Generator[Node, None]:
-        """Iter over graph in topological order."""
+    def get_sorter(self) -> TopologicalSorter:
+        """Return a topological sorter of the node tokens (not prepared yet)."""
         sorter = TopologicalSorter()
-
         for node in self.items.values():
             sorter.add(node.token, *node.dependencies)
+        return sorter
 
-        for token in sorter.static_order():
+    def get_order(self) -> list[int]:
+        """Return section node keys in topological order."""
+        order = []
+        for token in self.get_sorter().static_order():
             if token.is_section:
-                try:
-                    yield self.items[token.key]
-                except KeyError:
+                if token.key not in self.items:
                     raise KeyError(f"Node not found for token {token}")
+                order.append(token.key)
+        return order
+
+    def get_dependents(self, keys: Iterable[int]) -> set[int]:
+        """Return the provided node keys and the keys of all nodes depending on them."""
+        result, todo = set(keys), list(keys)
+        while todo:
+            for key in self.dependents.get(todo.pop(), ()):
+                if key not in result:
+                    result.add(key)
+                    todo.append(key)
+        return result
+
+    def get_dependencies(self, keys: Iterable[int]) -> set[int]:
+        """Return the provided node keys and the keys of all nodes they depend on."""
+        result, todo = set(keys), list(keys)
+        while todo:
+            for token in self.items[todo.pop()].dependencies:
+                if token.key not in result:
+                    result.add(token.key)
+                    todo.append(token.key)
+        return result
+
+    def get_dependents_map(self) -> dict[int, set[int]]:
+        """Return nodes depending directly on each node, by node key."""
+        dependents = {}
+        for node in self.items.values():
+            for token in node.dependencies:
+                dependents.setdefault(token.key, set()).add(node.key)
+        return dependents
+
+    def get_node_selectors(self, node: Node) -> list[Selector]:
+        """Return lines selectors read by the node itself (not by its dependencies)."""
+        match node.method:
+            case NodeMethod.LINES:
+                return [self.selector_parser.parse("@" + node.code)]
+            case NodeMethod.FORMULA:
+                return [selector for selector in node.formula.selectors.values() if selector.is_lines]
+        return []
+
+    def get_account_index(self) -> tuple[dict[str, frozenset[int]], frozenset[int]]:
+        """Return the reverse index of account code prefixes to nodes reading them.
+
+        Dependents of the nodes are included (the index is transitively closed).
+
+        :return: a tuple of the index and the nodes reading any account (as counterpart selectors).
+        """
+        direct, any_account = {}, set()
+        for node in self.items.values():
+            for selector in self.get_node_selectors(node):
+                if any(f.tag in self.move_filters for f in selector.filters or ()):
+                    any_account.add(node.key)
+                    continue
+                for prefix in selector.code.as_list():
+                    direct.setdefault(prefix, set()).add(node.key)
+
+        index = {prefix: frozenset(self.get_dependents(keys)) for prefix, keys in direct.items()}
+        return index, frozenset(self.get_dependents(any_account))
+
+    def get_account_nodes(self, codes: Iterable[str]) -> set[int]:
+        """Return keys of the nodes whose values depend on the provided account codes."""
+        keys = set()
+        for code in codes:
+            keys.update(self.account_any)
+            for i in range(1, len(code) + 1):
+                keys.update(self.account_index.get(code[:i], ()))
+        return keys
 
-    def get_section_node(self, section):
+    def iter(self) -> Generator[Node, None]:
+        """Iter over graph in topological order."""
+        for key in self.order:
+            yield self.items[key]
+
+    def get_section_node(self, section, children: list[str] | None = None):
+        """Return node for the provided section.
+
+        :param section: the section template
+        :param children: children codes (fetched from db when not provided).
+        """
         token = Selector.from_section(section.code)
 
         kw = {}
@@ -154,7 +324,7 @@ class ReportGraph:
             formula = Formula.compile(self.selector_parser, token, section.formula)
             deps = set(token for token in formula.selectors.values() if token.is_section)
             kw.update({"formula": formula, "dependencies": deps})
-        elif children := section.children.all().values_list("code", flat=True):
+        elif children := (section.children.all().values_list("code", flat=True) if children is None else children):
             method = NodeMethod.DEPENDENCIES
             kw["dependencies"] = set(Selector.from_section(code) for code in children)
         elif isinstance(token.code.value, str):
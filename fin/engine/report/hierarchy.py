@@ -0,0 +1,81 @@
+from __future__ import annotations
+from bisect import bisect_left
+from typing import Iterable
+
+from django.db.models import Q
+
+from fin.models import Account
+
+
+__all__ = ("AccountHierarchy",)
+
+
+class AccountHierarchy:
+    """
+    Accounts codes of a book template, sorted by position (see
+    :py:meth:`.AccountQuerySet.update_hierarchy`).
+
+    Accounts whose code starts with a prefix have consecutive positions: code
+    prefixes (as single, list or range selectors) are compiled into a few
+    positions ranges, merging the adjacent ones, instead of one ``startswith``
+    lookup per prefix.
+    """
+
+    template_id: int
+    codes: list[str]
+    """ Accounts codes, by position. """
+
+    def __init__(self, template_id: int, codes: list[str]):
+        self.template_id = template_id
+        self.codes = codes
+
+    @classmethod
+    def from_template(cls, template_id: int) -> AccountHierarchy | None:
+        """Return hierarchy of a template, or None if it has not been computed yet or is outdated.
+
+        Positions must be contiguous and follow codes order: this is not the case when
+        accounts have been changed without updating the hierarchy (e.g. by a queryset update).
+        """
+        items = list(
+            Account.objects.filter(template_id=template_id, code__isnull=False)
+            .order_by("position")
+            .values_list("position", "code")
+        )
+        if any(position != i for i, (position, _) in enumerate(items)):
+            return None
+        codes = [code for _, code in items]
+        if codes != sorted(codes):
+            return None
+        return cls(template_id, codes)
+
+    def get_range(self, prefix: str) -> tuple[int, int] | None:
+        """Return first and last positions of the accounts starting with ``prefix``."""
+        start = bisect_left(self.codes, prefix)
+        end = bisect_left(self.codes, prefix[:-1] + chr(ord(prefix[-1]) + 1), start) if prefix else len(self.codes)
+        return (start, end - 1) if start < end else None
+
+    def get_ranges(self, prefixes: Iterable[str]) -> list[tuple[int, int]]:
+        """Return sorted and merged positions ranges of the accounts starting with any of ``prefixes``."""
+        ranges = []
+        for start, end in sorted(r for prefix in set(prefixes) if (r := self.get_range(prefix))):
+            if ranges and start <= ranges[-1][1] + 1:
+                ranges[-1] = (ranges[-1][0], max(end, ranges[-1][1]))
+            else:
+                ranges.append((start, end))
+        return ranges
+
+    def get_q(self, prefixes: Iterable[str], prefix: str = "account__") -> Q:
+        """Return Q object selecting accounts starting with any of ``prefixes`` (none if no account matches).
+
+        :param prefixes: account code prefixes
+        :param prefix: lookup prefix of the account fields.
+        """
+        q = Q()
+        for start, end in self.get_ranges(prefixes):
+            if start == end:
+                q |= Q(**{f"{prefix}position": start})
+            else:
+                q |= Q(**{f"{prefix}position__range": (start, end)})
+        if not q:
+            return Q(pk__in=[])
+        return Q(**{f"{prefix}template_id": self.template_id}) & q
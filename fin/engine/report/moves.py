@@ -0,0 +1,116 @@
+from __future__ import annotations
+from decimal import Decimal
+
+from django.db.models import Sum
+
+from fin.models.book import LineQuerySet
+from .selector import FilterToken, Selector
+
+
+__all__ = ("MoveIndex",)
+
+
+class MoveIndex:
+    """
+    Index of the accounts touched by each move, used to resolve ``counterpart``
+    selectors in memory.
+
+    Each account holds the set of the moves having lines on it. Selecting
+    the moves touching (or not) some accounts is then a union of sets (or
+    its difference with all the moves).
+
+    Lines totals are kept by account, move and side, so that the selected
+    lines are summed without querying the database.
+    """
+
+    filters = {"debit": (True,), "credit": (False,)}
+    """ Resolvable filters other than counterparts, as the sides they select. """
+    move_filters = {"counterpart"}
+    """ Resolvable filters selecting moves. """
+
+    def __init__(self):
+        self.moves: set[int] = set()
+        """ Ids of all the moves. """
+        self.accounts: dict[str, set[int]] = {}
+        """ Ids of the moves having lines on an account, by account code. """
+        self.totals: dict[str, list[tuple[int, bool, Decimal]]] = {}
+        """ Totals by account code, as ``(move_id, is_debit, total)``. """
+
+    @classmethod
+    def from_queryset(cls, qs: LineQuerySet, field: str) -> MoveIndex:
+        """Create index from lines queryset, summing ``field`` in a single query."""
+        index = cls()
+        query = qs.values("move_id", "account__code", "is_debit").annotate(total=Sum(field)).order_by()
+        for move_id, code, is_debit, total in query.values_list("move_id", "account__code", "is_debit", "total"):
+            index.add(move_id, code, is_debit, total or Decimal("0.00"))
+        return index
+
+    def add(self, move_id: int, code: str, is_debit: bool, amount: Decimal):
+        """Add total of an account's lines in a move."""
+        self.moves.add(move_id)
+        self.accounts.setdefault(code, set()).add(move_id)
+        self.totals.setdefault(code, []).append((move_id, is_debit, amount))
+
+    def get_codes(self, op: str, value: str) -> list[str]:
+        """Return codes of the accounts matching operator and value (as in :py:meth:`.LineQuery.apply_operator`).
+
+        As for the database lookup, ``:`` matches codes starting with any of
+        the comma separated prefixes, and ``!:`` those starting with all of them.
+        """
+        match op:
+            case ":":
+                prefixes = tuple(value.split(","))
+                return [code for code in self.accounts if code.startswith(prefixes)]
+            case "!:":
+                prefixes = value.split(",")
+                return [code for code in self.accounts if all(code.startswith(prefix) for prefix in prefixes)]
+            case "=" | "!=":
+                return [value] if value in self.accounts else []
+        raise ValueError(f"Invalid operator `{op}`")
+
+    def get_moves(self, token: FilterToken) -> set[int]:
+        """Return ids of the moves selected by a counterpart filter."""
+        moves = set().union(*(self.accounts[code] for code in self.get_codes(token.op, token.value)))
+        if token.op[0] == "!":
+            return self.moves - moves
+        return moves
+
+    @classmethod
+    def can_resolve(cls, selector: Selector) -> bool:
+        """Return True if the selector can be resolved using the index."""
+        return (
+            selector.is_lines
+            and selector.aggr == "sum"
+            and all(
+                (f.tag in cls.move_filters and f.op) or (not f.op and f.tag in cls.filters)
+                for f in selector.filters or ()
+            )
+        )
+
+    def resolve(self, selector: Selector) -> Decimal:
+        """Return selector's value.
+
+        :raises ValueError: the selector can't be resolved (see :py:meth:`can_resolve`).
+        """
+        if not self.can_resolve(selector):
+            raise ValueError(f"Selector can't be resolved from moves index: {selector}")
+
+        sides, moves = {True, False}, None
+        for f in selector.filters or ():
+            if f.tag in self.move_filters:
+                selected = self.get_moves(f)
+                moves = selected if moves is None else moves & selected
+            else:
+                sides.intersection_update(self.filters[f.tag])
+
+        prefixes = tuple(selector.code.as_list())
+        return sum(
+            (
+                amount
+                for code, items in self.totals.items()
+                if code.startswith(prefixes)
+                for move_id, is_debit, amount in items
+                if is_debit in sides and (moves is None or move_id in moves)
+            ),
+            Decimal("0.00"),
+        )
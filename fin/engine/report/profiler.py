@@ -0,0 +1,151 @@
+from __future__ import annotations
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+import threading
+from time import perf_counter
+
+from .graph import Node
+
+
+__all__ = ("QueryProfile", "NodeProfile", "ReportProfiler")
+
+
+@dataclass
+class QueryProfile:
+    """An executed SQL query."""
+
+    sql: str
+    params: str
+    duration: float
+    """ Execution time in seconds. """
+
+    def as_dict(self) -> dict:
+        return {"sql": self.sql, "params": self.params, "duration": self.duration}
+
+
+@dataclass
+class NodeProfile:
+    """Instrumentation data of a graph node computation."""
+
+    code: str
+    method: str
+    section_id: int | None = None
+    duration: float = 0.0
+    """ Wall time in seconds, including dependencies computed meanwhile. """
+    queries: list[QueryProfile] = field(default_factory=list)
+    cache_hits: int = 0
+    """ Values read from :py:attr:`.BuilderContext.cache`. """
+    token_cache_hits: int = 0
+    """ Values read from :py:attr:`.BuilderContext.token_cache`. """
+
+    @property
+    def query_count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def query_time(self) -> float:
+        return sum(query.duration for query in self.queries)
+
+    def as_dict(self) -> dict:
+        return {
+            "code": self.code,
+            "method": self.method,
+            "section_id": self.section_id,
+            "duration": self.duration,
+            "query_count": self.query_count,
+            "query_time": self.query_time,
+            "cache_hits": self.cache_hits,
+            "token_cache_hits": self.token_cache_hits,
+            "queries": [query.as_dict() for query in self.queries],
+        }
+
+
+class ReportProfiler:
+    """
+    Record per node wall time, SQL queries and cache hits of a report build.
+
+    The profiler is set on :py:attr:`.ReportBuilder.profiler`. It is also used
+    as database execute wrapper (see ``connection.execute_wrapper()``): queries
+    are attributed to the node being computed in the thread, or to the build
+    itself (such as accounts totals).
+    """
+
+    sort_keys = ("order", "code", "duration", "query_count", "query_time")
+    """ Allowed keys for :py:meth:`get_nodes` sorting. """
+
+    def __init__(self):
+        self.nodes: dict[int, NodeProfile] = {}
+        """ Nodes profiles by node key, in computation order. """
+        self.queries: list[QueryProfile] = []
+        """ Queries executed outside of nodes computation. """
+        self.duration = 0.0
+        self._local = threading.local()
+
+    @property
+    def _stack(self) -> list[NodeProfile]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def get_profile(self, node: Node) -> NodeProfile:
+        """Return profile of a node, creating it if required."""
+        if node.key not in self.nodes:
+            self.nodes[node.key] = NodeProfile(
+                code=node.code or "", method=node.method.name, section_id=node.section_id
+            )
+        return self.nodes[node.key]
+
+    @contextmanager
+    def node(self, node: Node):
+        """Profile node computation in this context."""
+        profile = self.get_profile(node)
+        self._stack.append(profile)
+        start = perf_counter()
+        try:
+            yield profile
+        finally:
+            profile.duration += perf_counter() - start
+            self._stack.pop()
+
+    def hit(self, cache: str, node: Node | None = None):
+        """Count a cache hit for the node being computed (or ``node`` when none is).
+
+        :param cache: either ``"cache"`` or ``"token_cache"``.
+        """
+        if self._stack:
+            profile = self._stack[-1]
+        elif node:
+            profile = self.get_profile(node)
+        else:
+            return
+        attr = f"{cache}_hits"
+        setattr(profile, attr, getattr(profile, attr) + 1)
+
+    def __call__(self, execute, sql, params, many, context):
+        """Execute wrapper recording queries."""
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            query = QueryProfile(sql=sql, params=str(params), duration=perf_counter() - start)
+            (self._stack[-1].queries if self._stack else self.queries).append(query)
+
+    def get_nodes(self, sort: str = "order", reverse: bool = False) -> list[NodeProfile]:
+        """Return nodes profiles sorted by the provided key (see :py:attr:`sort_keys`)."""
+        if sort not in self.sort_keys:
+            raise ValueError(f"Invalid sort key `{sort}` (allowed: {', '.join(self.sort_keys)})")
+
+        nodes = list(self.nodes.values())
+        if sort != "order":
+            nodes.sort(key=lambda profile: getattr(profile, sort))
+        return nodes[::-1] if reverse else nodes
+
+    def as_dict(self) -> dict:
+        """Return profile as JSON serializable dict."""
+        return {
+            "duration": self.duration,
+            "query_count": len(self.queries) + sum(node.query_count for node in self.nodes.values()),
+            "queries": [query.as_dict() for query in self.queries],
+            # sorted by code, so that dumps of different builds can be compared
+            "nodes": [node.as_dict() for node in self.get_nodes("code")],
+        }
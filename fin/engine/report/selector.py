@@ -10,6 +10,7 @@ from django.db.models import Sum, Max, Min, Q
 
 from fin.models.book_template import Account
 from fin.models.book import LineQuerySet
+from .hierarchy import AccountHierarchy
 
 
 __all__ = ("CodeToken", "FilterToken", "Selector", "SelectorFormatError", "SelectorParser", "LineQuery")
@@ -296,8 +297,9 @@ class LineQuery:
     aggregates = {"sum": Sum, "max": Max, "min": Min}
     """ Aggregation functions. """
 
-    def __init__(self, qs: LineQuerySet):
+    def __init__(self, qs: LineQuerySet, hierarchy: AccountHierarchy | None = None):
         self.qs = qs
+        self.hierarchy = hierarchy
 
     def get_queryset(self, context, selector: Selector, aggregate: bool = True):
         """Return queryset constructor on the selector.
@@ -307,9 +309,6 @@ class LineQuery:
         assert selector.is_lines
 
         qs = self.qs.distinct()
-        if selector.scope == Selector.Scope.STATE:
-            qs = qs.with_norm_amount()
-
         qs = self.apply_code(selector.code, qs)
         qs = self.apply_filters(context, selector.filters, qs)
         if aggregate:
@@ -331,9 +330,9 @@ class LineQuery:
     def apply_code(self, code: CodeToken, qs: LineQuerySet):
         """Apply scope."""
         match code.kind:
-            case "single":
+            case "single" if not self.hierarchy:
                 return qs.filter(account__code__startswith=code.value)
-            case "list" | "range":
+            case "single" | "list" | "range":
                 q = self.get_code_q(code.as_list())
                 return qs.filter(q)
 
@@ -363,11 +362,18 @@ class LineQuery:
         return qs.filter(q)
 
     def get_code_q(self, value: str | list[str], op=operator.or_, lookup="account__code"):
-        """Return Q object for code lookup, using "startswith" and "endswith" lookups."""
+        """Return Q object for code lookup, using "startswith" and "endswith" lookups.
+
+        When the accounts hierarchy is provided, prefixes alternatives are
+        looked up as accounts positions ranges instead.
+        """
         q = Q()
         if isinstance(value, str):
             value = value.split(",")
 
+        if self.hierarchy and op is operator.or_ and lookup == "account__code":
+            return self.hierarchy.get_q(value)
+
         for code in value:
             # THIS wont work, example 21*9 => what about accounts like 21091
             # if "*" in code:
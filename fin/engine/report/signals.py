@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+from django.dispatch import receiver
+
+from fin.models import AccountBalanceSnapshot, Report
+from fin.models.book import balances_changed
+
+
+__all__ = ("mark_reports_stale",)
+
+
+@receiver(balances_changed, sender=AccountBalanceSnapshot)
+def mark_reports_stale(sender, book_id: int, start_date, **kwargs):
+    """Flag saved reports of the book ending from the changed balances as stale.
+
+    Sections to recompute are only resolved when the report is rebuilt
+    (see :py:meth:`.ReportBuilder.get_dirty_nodes`).
+    """
+    Report.objects.filter(book_id=book_id, end_date__gte=start_date, stale=False).update(stale=True)
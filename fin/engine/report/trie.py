@@ -0,0 +1,134 @@
+from __future__ import annotations
+from datetime import date
+from decimal import Decimal
+
+from django.db.models import Case, IntegerField, Sum, Value, When
+
+from fin.models.book import LineQuerySet
+from .selector import CodeToken, Selector
+
+
+__all__ = ("AccountTrie",)
+
+
+class AccountTrie:
+    """
+    Account code prefix trie holding account totals.
+
+    Each node holds the totals of all accounts whose code starts with
+    the node's prefix, for both selector scopes (flow and state) and
+    both sides (debit and credit). Resolving a prefix is then a lookup
+    proportional to its length.
+
+    Only selectors that can be computed from accounts totals are resolved
+    (see :py:meth:`can_resolve`): the other ones (such as ``counterpart``
+    or asset filters) must be computed from lines.
+    """
+
+    class Node:
+        __slots__ = ("children", "totals")
+
+        def __init__(self):
+            self.children: dict[str, AccountTrie.Node] = {}
+            self.totals: dict[tuple[Selector.Scope, bool], Decimal] = {}
+
+    fields = {Selector.Scope.FLOW: "amount", Selector.Scope.STATE: "norm_amount"}
+    """ Line field summed for each scope (as in :py:meth:`.LineQuery.apply_aggregate`). """
+    filters = {"debit": (True,), "credit": (False,)}
+    """ Resolvable filters, as the sides they select. """
+
+    def __init__(self):
+        self.root = self.Node()
+
+    @classmethod
+    def from_querysets(cls, querysets: dict[Selector.Scope, LineQuerySet]) -> AccountTrie:
+        """Create trie from lines querysets by scope, using one aggregate query per scope."""
+        trie = cls()
+        for scope, qs in querysets.items():
+            query = qs.values("account__code", "is_debit").annotate(total=Sum(cls.fields[scope])).order_by()
+            for code, is_debit, total in query.values_list("account__code", "is_debit", "total"):
+                trie.add(code, scope, is_debit, total or Decimal("0.00"))
+        return trie
+
+    @classmethod
+    def from_periods(cls, qs: LineQuerySet, periods: list[tuple[date, date]]) -> list[AccountTrie]:
+        """Create one trie per period from lines queryset, in a single query grouped by period.
+
+        Lines out of the periods are ignored. Periods must not overlap.
+
+        :param qs: lines of all the periods
+        :param periods: periods start and end dates
+        :return: the tries, ordered as ``periods``.
+        """
+        tries = [cls() for _ in periods]
+        if not periods:
+            return tries
+
+        aggregates = {scope.name.lower(): Sum(field) for scope, field in cls.fields.items()}
+        query = (
+            qs.annotate(period_index=cls.get_period_index(periods))
+            .filter(period_index__isnull=False)
+            .values("period_index", "account__code", "is_debit")
+            .annotate(**aggregates)
+            .order_by()
+        )
+        for row in query:
+            trie = tries[row["period_index"]]
+            for scope in cls.fields:
+                trie.add(row["account__code"], scope, row["is_debit"], row[scope.name.lower()] or Decimal("0.00"))
+        return tries
+
+    @staticmethod
+    def get_period_index(periods: list[tuple[date, date]]) -> Case:
+        """Return expression annotating lines with the index of their period (None when out of the periods)."""
+        whens = [When(date__gte=start, date__lte=end, then=Value(i)) for i, (start, end) in enumerate(periods)]
+        return Case(*whens, default=None, output_field=IntegerField())
+
+    def add(self, code: str, scope: Selector.Scope, is_debit: bool, amount: Decimal):
+        """Add an account total for the provided scope and side."""
+        key = (scope, is_debit)
+        node = self.root
+        node.totals[key] = node.totals.get(key, Decimal("0.00")) + amount
+        for char in code:
+            node = node.children.setdefault(char, self.Node())
+            node.totals[key] = node.totals.get(key, Decimal("0.00")) + amount
+
+    def get(self, prefix: str, scope: Selector.Scope, sides=(True, False)) -> Decimal:
+        """Return total for accounts starting with ``prefix``."""
+        node = self.root
+        for char in prefix:
+            if not (node := node.children.get(char)):
+                return Decimal("0.00")
+        return sum((node.totals.get((scope, side), Decimal("0.00")) for side in sides), Decimal("0.00"))
+
+    def can_resolve(self, selector: Selector) -> bool:
+        """Return True if the selector can be resolved using the trie."""
+        return (
+            selector.is_lines
+            and selector.aggr == "sum"
+            and all(not f.op and f.tag in self.filters for f in selector.filters or ())
+        )
+
+    def resolve(self, selector: Selector) -> Decimal:
+        """Return selector's value.
+
+        :raises ValueError: the selector can't be resolved (see :py:meth:`can_resolve`).
+        """
+        if not self.can_resolve(selector):
+            raise ValueError(f"Selector can't be resolved from accounts totals: {selector}")
+
+        sides = {True, False}
+        for f in selector.filters or ():
+            sides.intersection_update(self.filters[f.tag])
+
+        return sum(
+            (self.get(prefix, selector.scope, sides) for prefix in self.get_prefixes(selector.code)), Decimal("0.00")
+        )
+
+    def get_prefixes(self, code: CodeToken) -> list[str]:
+        """Return code prefixes, removing those covered by a shorter one (so accounts are counted once)."""
+        prefixes = []
+        for prefix in sorted(set(code.as_list())):
+            if not prefixes or not prefix.startswith(prefixes[-1]):
+                prefixes.append(prefix)
+        return prefixes
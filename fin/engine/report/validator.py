@@ -0,0 +1,229 @@
+from __future__ import annotations
+from functools import cache
+import logging
+from pathlib import Path
+from typing import Iterable
+from urllib.parse import urljoin
+from xml.etree import ElementTree
+
+from django.conf import settings
+
+
+__all__ = ("XBRLValidator", "SharedDTS", "get_validator", "get_schema_refs")
+
+
+SCHEMA_REF_TAG = "{http://www.xbrl.org/2003/linkbase}schemaRef"
+XLINK_HREF = "{http://www.w3.org/1999/xlink}href"
+
+
+def get_schema_refs(path: Path) -> tuple[str, ...]:
+    """Return urls of the schemas referenced by an instance document.
+
+    Only the start of the document is read, as schema references are the
+    first elements of an XBRL instance.
+    """
+    refs = []
+    for _, element in ElementTree.iterparse(path, events=("start",)):
+        if element.tag == SCHEMA_REF_TAG:
+            refs.append(urljoin(str(path), element.get(XLINK_HREF, "")))
+        elif refs:
+            break
+    return tuple(refs)
+
+
+def pop_errors(controller) -> list[str]:
+    """Return errors logged by an Arelle controller (as ``code: message``), and clear its log."""
+    records = controller.logHandler.logRecordBuffer
+    errors = [
+        f"{getattr(record, 'messageCode', '')}: {record.getMessage()}"
+        for record in records
+        if record.levelno >= logging.ERROR
+    ]
+    records.clear()
+    return errors
+
+
+class SharedDTS:
+    """
+    Taxonomy (DTS) loaded once, into which instance documents are validated in turn.
+
+    Arelle keeps a DTS and its instance in the same model. The DTS is loaded and
+    validated from the schema references only once. Each instance document is
+    then loaded into the model, validated, and dropped by restoring the state of
+    the model from before its loading (documents, base sets, role types, facts,
+    contexts...). Taxonomy documents are flagged to skip the DTS checks already
+    run, whose errors are reported for every document (as Arelle would).
+    """
+
+    restored = ("baseSets", "roleTypes", "arcroleTypes", "namespaceDocs")
+    """ DTS indexes (of lists) extended by instance documents discovery. """
+
+    errors: list[str]
+    """ Errors of the DTS, reported for every document. """
+
+    def __init__(self, controller, schema_refs: tuple[str, ...]):
+        from arelle import ModelDocument, ModelXbrl, Validate
+
+        self.controller = controller
+        self.model = ModelXbrl.load(controller.modelManager, schema_refs[0])
+        self.entry = self.model.modelDocument
+        if self.entry is None:
+            self.errors = pop_errors(controller)
+            return
+
+        for url in schema_refs[1:]:
+            ModelDocument.load(self.model, url, isDiscovered=True)
+
+        model = self.model
+        self.state = {name: {key: list(items) for key, items in getattr(model, name).items()} for name in self.restored}
+        self.url_docs = dict(model.urlDocs)
+        self.unloadable_docs = dict(model.urlUnloadableDocs)
+        self.objects_count = len(model.modelObjects)
+
+        Validate.validate(model)
+        self.errors = pop_errors(controller)
+        for document in model.urlDocs.values():
+            document.skipDTS = True
+        self.reset()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.entry is not None
+
+    def validate(self, path: Path) -> list[str]:
+        """Validate an instance document against the DTS, returning errors."""
+        from arelle import ModelDocument, ModelXbrl, Validate
+
+        model = self.model
+        try:
+            document = ModelDocument.load(model, str(path), isEntry=True)
+            if document is None:
+                return self.errors + [f"Document can't be loaded: {path}"] + pop_errors(self.controller)
+            model.modelDocument = document
+            ModelXbrl.loadSchemalocatedSchemas(model)
+            Validate.validate(model)
+            return self.errors + pop_errors(self.controller)
+        except Exception as err:
+            return self.errors + pop_errors(self.controller) + [f"exception: {type(err).__name__}: {err}"]
+        finally:
+            self.reset()
+
+    def reset(self):
+        """Restore the model to the DTS only, dropping the instance document."""
+        model = self.model
+        model.urlDocs.clear()
+        model.urlDocs.update(self.url_docs)
+        model.urlUnloadableDocs.clear()
+        model.urlUnloadableDocs.update(self.unloadable_docs)
+        for name, state in self.state.items():
+            index = getattr(model, name)
+            index.clear()
+            index.update({key: list(items) for key, items in state.items()})
+        del model.modelObjects[self.objects_count :]
+
+        # relationship sets and facts indexes are computed on demand
+        model.relationshipSets.clear()
+        for name in [name for name in vars(model) if name.startswith("_factsBy") or name == "_nonNilFactsInInstance"]:
+            delattr(model, name)
+        model.facts, model.factsInInstance, model.undefinedFacts = [], set(), []
+        model.contexts, model.units = {}, {}
+        model._contextsInUseMarked = model._unitsInUseMarked = False
+        model.modelDocument = self.entry
+
+
+class XBRLValidator:
+    """
+    Validate XBRL instance documents with Arelle, without network access.
+
+    Taxonomy files are resolved from local taxonomy packages (remapping their
+    published urls, such as ``http://www.nbb.be/...``), and from Arelle's web
+    cache for the remaining ones. The web cache is stored in ``cache_dir`` and
+    kept across runs.
+
+    The DTS of each set of schema references is loaded once and shared by the
+    documents referencing it (see :py:class:`SharedDTS`): only the first
+    document pays for the taxonomy loading. Use :py:func:`get_validator` to
+    share them between the documents validated by a process.
+
+    Arelle is imported when the controller is first used, so that it is only
+    required when validating.
+    """
+
+    packages: list[Path]
+    """ Taxonomy packages (zip files). """
+    cache_dir: Path
+    """ Arelle's web cache directory. """
+    share_dts: bool
+    """ Share loaded DTS between documents, otherwise load it for each document. """
+    dts: dict[tuple[str, ...], SharedDTS]
+    """ Loaded DTS by schema references. """
+
+    def __init__(self, packages: Iterable[Path], cache_dir: Path | None = None, share_dts: bool = True):
+        self.packages = [Path(package) for package in packages]
+        if missing := [str(package) for package in self.packages if not package.exists()]:
+            raise ValueError(f"Taxonomy packages not found: {', '.join(missing)}")
+        self.cache_dir = Path(cache_dir or settings.XBRL_CACHE_ROOT)
+        self.share_dts = share_dts
+        self.dts = {}
+        self._controller = None
+
+    @property
+    def controller(self):
+        """Arelle controller, working offline with the taxonomy packages."""
+        if self._controller is None:
+            self._controller = self.get_controller()
+        return self._controller
+
+    def get_controller(self):
+        """Return a new Arelle controller.
+
+        :raises ImportError: Arelle is not installed.
+        """
+        from arelle import Cntlr, PackageManager
+        from arelle.ModelFormulaObject import FormulaOptions
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        controller = Cntlr.Cntlr(logFileName="logToBuffer")
+        controller.webCache.workOffline = True
+        controller.webCache.cacheDir = str(self.cache_dir)
+        controller.modelManager.formulaOptions = FormulaOptions()
+
+        PackageManager.init(controller, loadPackagesConfig=False)
+        for package in self.packages:
+            if not PackageManager.addPackage(controller, str(package)):
+                raise ValueError(f"Invalid taxonomy package: {package}")
+        PackageManager.rebuildRemappings(controller)
+        return controller
+
+    def get_dts(self, schema_refs: tuple[str, ...]) -> SharedDTS:
+        """Return the DTS of the provided schema references, loading it if required."""
+        if schema_refs not in self.dts:
+            self.dts[schema_refs] = SharedDTS(self.controller, schema_refs)
+        return self.dts[schema_refs]
+
+    def validate(self, path: Path) -> list[str]:
+        """Validate an instance document, returning errors (as ``code: message``)."""
+        pop_errors(self.controller)
+        if self.share_dts and (schema_refs := get_schema_refs(path)):
+            dts = self.get_dts(schema_refs)
+            if dts.is_loaded:
+                return dts.validate(path)
+        return self.validate_document(path)
+
+    def validate_document(self, path: Path) -> list[str]:
+        """Validate an instance document, loading its whole DTS."""
+        controller = self.controller
+        model = controller.modelManager.load(str(path))
+        try:
+            if model is None or model.modelDocument is None:
+                return [f"Document can't be loaded: {path}"] + pop_errors(controller)
+            controller.modelManager.validate()
+            return pop_errors(controller)
+        finally:
+            model and controller.modelManager.close(model)
+
+
+@cache
+def get_validator(packages: tuple[str, ...], cache_dir: str | None = None) -> XBRLValidator:
+    """Return the validator of this process for the provided taxonomy packages."""
+    return XBRLValidator(packages, cache_dir)
@@ -1,9 +1,139 @@
-from typing import Iterable
+from __future__ import annotations
+from decimal import Decimal
+import hashlib
+import io
+from typing import BinaryIO, Iterable
+from xml.sax.saxutils import XMLGenerator
 
-from django.template.loader import render_to_string
+from fin.models import Report, ReportSection
+from fin.schemas.xbrl import XBRLContext, XBRLFact, XBRLInstance, XBRLPeriod, XBRLSchema, XBRLUnit
 
-from ..models import Report, ReportSection, ReportTemplate
-from ..schemas.xbrl import XBRLFact, XBRLContext, XBRLUnit, XBRLInstance
+
+__all__ = ("XBRLWriter", "XBRLReportBuilder")
+
+
+class XBRLWriter:
+    """
+    Write an XBRL instance document incrementally to a binary file-like object.
+
+    Contexts, units and facts can be written in any order (XBRL allows them
+    to be interleaved). Output only depends on the written items and their
+    order: no timestamp, attributes in a fixed order.
+
+    Usage:
+
+    .. code-block:: python
+
+        writer = XBRLWriter(out)
+        writer.start(schema)
+        writer.write_context(context, schema.entity_scheme)
+        writer.write_unit(unit)
+        writer.write_fact(fact)
+        writer.end()
+    """
+
+    namespaces = {
+        "": "http://www.xbrl.org/2003/instance",
+        "xbrli": "http://www.xbrl.org/2003/instance",
+        "link": "http://www.xbrl.org/2003/linkbase",
+        "xlink": "http://www.w3.org/1999/xlink",
+        "xbrldi": "http://xbrl.org/2006/xbrldi",
+        "xsi": "http://www.w3.org/2001/XMLSchema-instance",
+        "iso4217": "http://www.xbrl.org/2003/iso4217",
+    }
+    """ Namespaces always declared on the root element. """
+
+    def __init__(self, out: BinaryIO, encoding: str = "utf-8"):
+        self.out = out
+        self.xml = XMLGenerator(out, encoding, short_empty_elements=True)
+
+    def start(self, schema: XBRLSchema):
+        """Start document, writing root element and schema reference."""
+        namespaces = {**self.namespaces, **schema.namespaces}
+        attrs = {("xmlns:" + prefix if prefix else "xmlns"): uri for prefix, uri in namespaces.items()}
+
+        self.xml.startDocument()
+        self.xml.startElement("xbrl", attrs)
+        self.newline()
+        self.element(
+            "link:schemaRef",
+            {
+                "xlink:type": schema.schema_ref.type,
+                "xlink:arcrole": schema.schema_ref.arcrole,
+                "xlink:href": schema.schema_ref.href,
+            },
+            depth=1,
+        )
+
+    def end(self):
+        """End document."""
+        self.xml.endElement("xbrl")
+        self.newline()
+        self.xml.endDocument()
+
+    def write_context(self, context: XBRLContext, entity_scheme: str):
+        """Write a context, whose period dates must be set."""
+        self.start_element("context", {"id": context.id}, depth=1)
+        self.start_element("entity", depth=2)
+        self.element("identifier", {"scheme": entity_scheme}, context.entity, depth=3)
+        self.end_element("entity", depth=2)
+
+        self.start_element("period", depth=2)
+        if context.period.type == "instant":
+            self.element("instant", text=context.period.instant.isoformat(), depth=3)
+        else:
+            self.element("startDate", text=context.period.start_date.isoformat(), depth=3)
+            self.element("endDate", text=context.period.end_date.isoformat(), depth=3)
+        self.end_element("period", depth=2)
+
+        if context.dimensions:
+            self.start_element("scenario", depth=2)
+            for dimension, member in sorted(context.dimensions.items()):
+                self.element("xbrldi:explicitMember", {"dimension": dimension}, member, depth=3)
+            self.end_element("scenario", depth=2)
+        self.end_element("context", depth=1)
+
+    def write_unit(self, unit: XBRLUnit):
+        """Write a unit."""
+        self.start_element("unit", {"id": unit.id}, depth=1)
+        self.element("measure", text=unit.measure, depth=2)
+        self.end_element("unit", depth=1)
+
+    def write_fact(self, fact: XBRLFact):
+        """Write a fact, as nil when it has no value."""
+        attrs = {"contextRef": fact.context_id}
+        if fact.unit:
+            attrs["unitRef"] = fact.unit
+        if fact.value is None:
+            attrs["xsi:nil"] = "true"
+            self.element(fact.concept, attrs, depth=1)
+        else:
+            if fact.decimals is not None:
+                attrs["decimals"] = str(fact.decimals)
+            self.element(fact.concept, attrs, format(Decimal(fact.value), "f"), depth=1)
+
+    # ---- Low level
+    def start_element(self, name: str, attrs: dict[str, str] | None = None, depth: int = 0):
+        self.xml.ignorableWhitespace("  " * depth)
+        self.xml.startElement(name, attrs or {})
+        self.newline()
+
+    def end_element(self, name: str, depth: int = 0):
+        self.xml.ignorableWhitespace("  " * depth)
+        self.xml.endElement(name)
+        self.newline()
+
+    def element(self, name: str, attrs: dict[str, str] | None = None, text: str | None = None, depth: int = 0):
+        """Write an element with optional text content (empty element otherwise)."""
+        self.xml.ignorableWhitespace("  " * depth)
+        self.xml.startElement(name, attrs or {})
+        if text is not None:
+            self.xml.characters(str(text))
+        self.xml.endElement(name)
+        self.newline()
+
+    def newline(self):
+        self.xml.ignorableWhitespace("\n")
 
 
 class XBRLReportBuilder:
@@ -13,101 +143,174 @@ class XBRLReportBuilder:
     On the method going over the provided sections, we don't recurse in their
     inner children. Instead we assume that all sections are provided as
     input.
-    """
 
-    template_name = "ox/fin/xbrl/base.xbrl"
+    Facts take their concept, unit and dimensions from their section template
+    XBRL fact, and their period from the template XBRL schema context they
+    reference: the context period offset selects the report (``0``) or one of
+    its previous ones (``-1``, ``-2``...). Facts whose period report does not
+    exist are skipped.
+
+    Contexts are resolved per fact (adding fact's dimensions), and deduplicated
+    by hash: identical contexts share the same id.
+    """
 
     def __init__(self, entity: str):
         self.entity = entity
 
-    def render(self, instance: XBRLInstance, **kwargs) -> str:
-        """Render XBRLInstance using django template into string."""
-        kwargs["instance"] = instance
-        return render_to_string(self.template_name, kwargs)
+    def write(self, report: Report, out: BinaryIO, sections: Iterable[ReportSection] | None = None):
+        """Stream report's XBRL instance document into ``out``.
+
+        Contexts and units are written just before the first fact using them,
+        in a single pass over sections.
+
+        :param report: the report to export
+        :param out: binary file-like object
+        :param sections: sections to export, defaults to all report sections.
+        :raises ValueError: the report template has no XBRL schema, or invalid facts.
+        """
+        schema = self.get_schema(report)
+        units = {unit.id: unit for unit in schema.units}
+        written_units, written_contexts = set(), set()
+
+        writer = XBRLWriter(out)
+        writer.start(schema)
+        for fact, context in self.iter_facts(report, self.get_sections(report, sections)):
+            if context.id not in written_contexts:
+                writer.write_context(context, schema.entity_scheme)
+                written_contexts.add(context.id)
+            if fact.unit and fact.unit not in written_units:
+                if fact.unit not in units:
+                    raise ValueError(f"Fact unit {fact.unit} not declared in report template")
+                writer.write_unit(units[fact.unit])
+                written_units.add(fact.unit)
+            writer.write_fact(fact)
+        writer.end()
+
+    def render(self, report: Report, sections: Iterable[ReportSection] | None = None) -> str:
+        """Return report's XBRL instance document as string (see :py:meth:`write`)."""
+        out = io.BytesIO()
+        self.write(report, out, sections)
+        return out.getvalue().decode("utf-8")
 
     def get_instance(self, report: Report, sections: Iterable[ReportSection] | None = None) -> XBRLInstance:
         """Return XBRLInstance from provided report."""
-        schema = report.template.xbrl
-        if schema is None:
-            raise ValueError("This report can't be exported to an XBRL.")
+        schema = self.get_schema(report)
+        facts, contexts = [], {}
+        for fact, context in self.iter_facts(report, self.get_sections(report, sections)):
+            facts.append(fact)
+            contexts.setdefault(context.id, context)
 
-        sections = sections or report.sections.all()
-        facts = self.get_facts(sections)
         return XBRLInstance(
             schema_ref=schema.schema_ref,
             namespaces=schema.namespaces,
             entity_scheme=schema.entity_scheme,
             facts=facts,
-            contexts=self.get_contexts(report, schema.contexts, facts),
-            units=self.get_units(report.template, facts),
+            contexts=list(contexts.values()),
+            units=self.get_units(schema, facts),
         )
 
-    def get_facts(self, report: Report, sections: Iterable[ReportSection]) -> list[XBRLFact]:
-        """Yield XBRLFact for all sections."""
-        return [self.get_fact(section) for section in sections]
-
-    def get_fact(self, report: Report, section: ReportSection) -> XBRLFact | None:
-        """Return XBRLFact for the provided section."""
-        if xbrl := section.template.xbrl:
-            if section.template.previous_id:
-                period_report, offset = report.previous, -1
-            else:
-                period_report, offset = report, 0
-
-            if period_report is None:
-                return
-
-            if xbrl.period_type == "instant":
-                kw = {"date": report.end_date}
-            elif xbrl.period_type == "duration":
-                kw = {"start_date": report.start_date, "end_date": report.end_date}
-
-            return XBRLFact(
-                concept=xbrl.concept,
-                value=section.value,
-                unit=xbrl.unit,
-                period_type=xbrl.period_type,
-                period_offset=offset,
-                dimensions=xbrl.dimensions or {} ** kw,
-            )
+    def get_schema(self, report: Report) -> XBRLSchema:
+        """Return report template's XBRL schema.
 
-    def get_contexts(self, report: Report, contexts: list[XBRLContext], facts: Iterable[XBRLFact]) -> list[XBRLContext]:
+        :raises ValueError: the template has no schema.
         """
-        Return only XBRLContext used for this report and mutate inplace their period according report's info.
+        if (schema := report.template.xbrl) is None:
+            raise ValueError("This report can't be exported to an XBRL.")
+        return schema
+
+    def get_sections(self, report: Report, sections: Iterable[ReportSection] | None = None) -> Iterable[ReportSection]:
+        """Return sections to export, in a stable order."""
+        if sections is None:
+            sections = report.sections.select_related("template").order_by("template_id", "id")
+        return sections
+
+    def get_reports(self, report: Report) -> dict[int, Report]:
+        """Return report and its previous ones by period offset."""
+        reports, offset = {}, 0
+        while report:
+            reports[offset] = report
+            report, offset = report.previous, offset - 1
+        return reports
 
-        :yield ValueError: some facts are referencing a context that is not provided using ``contexts``.
+    def iter_facts(self, report: Report, sections: Iterable[ReportSection]):
+        """Yield ``(fact, context)`` for sections having an XBRL fact, contexts being deduplicated.
+
+        :raises ValueError: a fact references a context not declared in the schema.
         """
-        contexts = {c.id for c in contexts}
-        missings = [fact.concept for fact in facts if fact.context_id not in contexts]
-        if missings:
-            raise ValueError(f"Some fact are referencing non-declared context: {', '. join(missings)}.")
-
-        c_report, c_offset, reports = report, 0, {}
-        while c_report:
-            key = (c_report.id, c_offset)
-            reports[key] = c_report
-
-            c_report = c_report.previous
-            c_offset -= 1
-
-        results = []
-        for context in contexts.values():
-            if context.period.type == "instant":
-                context.period.instant = report.end_date
-            else:
-                context.period.start_date = report.start_date
-                context.period.end_date = report.end_date
-            results.append(context)
-        return results
-
-    def get_units(self, template: ReportTemplate, facts: Iterable[XBRLFact]) -> list[XBRLUnit]:
-        """Return XBRLUnit from report template and check facts units.
-
-        :yield ValueError: fact unit has not been declared in template's XBRL schema.
+        schema = self.get_schema(report)
+        declared = {context.id: context for context in schema.contexts}
+        reports = self.get_reports(report)
+        contexts = {}
+
+        for section in sections:
+            if not section.template or not (xbrl := section.template.xbrl):
+                continue
+            if xbrl.context_id not in declared:
+                raise ValueError(f"Fact {xbrl.concept} is referencing non-declared context: {xbrl.context_id}.")
+
+            declared_context = declared[xbrl.context_id]
+            if (period_report := reports.get(declared_context.period.offset)) is None:
+                continue
+
+            context = self.get_context(period_report, declared_context, xbrl.dimensions)
+            context = contexts.setdefault(self.get_context_hash(context), context)
+            yield self.get_fact(section, xbrl, context), context
+
+    def get_fact(self, section: ReportSection, xbrl: XBRLFact, context: XBRLContext) -> XBRLFact:
+        """Return XBRLFact for the provided section."""
+        return XBRLFact(
+            concept=xbrl.concept,
+            context_id=context.id,
+            value=section.value,
+            unit=xbrl.unit,
+            decimals=xbrl.decimals,
+            dimensions=context.dimensions,
+            period=context.period,
+        )
+
+    def get_context(self, report: Report, context: XBRLContext, dimensions: dict[str, str]) -> XBRLContext:
+        """Return a new context for the report period, including fact's dimensions.
+
+        Context id is the declared one, suffixed by a hash when dimensions are added.
         """
-        units = {u.id: u for u in template.xbrl.units}
+        if context.period.type == "instant":
+            period = XBRLPeriod(type="instant", instant=report.end_date, offset=context.period.offset)
+        else:
+            period = XBRLPeriod(
+                type="duration", start_date=report.start_date, end_date=report.end_date, offset=context.period.offset
+            )
 
+        all_dimensions = {**context.dimensions, **dimensions}
+        result = XBRLContext(
+            id=context.id, period=period, entity=context.entity or self.entity, dimensions=all_dimensions
+        )
+        if all_dimensions != context.dimensions:
+            result.id = f"{context.id}-{self.get_context_hash(result)[:12]}"
+        return result
+
+    def get_context_hash(self, context: XBRLContext) -> str:
+        """Return hash of a context content (its id excluded)."""
+        period = context.period
+        items = (
+            context.entity,
+            period.type,
+            period.instant,
+            period.start_date,
+            period.end_date,
+            sorted(context.dimensions.items()),
+        )
+        return hashlib.blake2b(repr(items).encode(), digest_size=16).hexdigest()
+
+    def get_units(self, schema: XBRLSchema, facts: Iterable[XBRLFact]) -> list[XBRLUnit]:
+        """Return XBRLUnit used by facts.
+
+        :raises ValueError: fact unit has not been declared in template's XBRL schema.
+        """
+        units = {u.id: u for u in schema.units}
+        used = {}
         for fact in facts:
-            if fact.unit not in units:
+            if fact.unit and fact.unit not in units:
                 raise ValueError(f"Fact unit {fact.unit} not declared in report template")
-        return template.xbrl.units
+            if fact.unit:
+                used.setdefault(fact.unit, units[fact.unit])
+        return list(used.values())
@@ -0,0 +1,125 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import timedelta
+import multiprocessing
+from time import perf_counter
+from typing import Callable, Iterable
+
+import django
+from django.db import transaction
+
+from fin.models import Book, Exercise
+
+
+__all__ = ("RollforwardResult", "Rollforward", "rollforward_book")
+
+
+@dataclass
+class RollforwardResult:
+    """Result of a book rollforward."""
+
+    book_id: int
+    closing_id: int | None = None
+    """ Closing move of the exercise. """
+    opening_id: int | None = None
+    """ Opening move of the next exercise. """
+    duration: float = 0.0
+    """ Processing time in seconds. """
+    error: str | None = None
+    """ Error message if the rollforward failed. """
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+
+def rollforward_book(book_id: int, year: int) -> RollforwardResult:
+    """Close the exercise of a book ending in ``year`` and open the next one.
+
+    Everything is done in a single transaction: on failure, nothing is saved
+    and the error is reported in the result instead of being raised.
+
+    Already closed exercises (or opened next exercise) are kept as is, so
+    that a failed run can be restarted.
+    """
+    result = RollforwardResult(book_id)
+    start = perf_counter()
+    try:
+        with transaction.atomic():
+            book = Book.objects.select_related("template").get(pk=book_id)
+            exercise = book.exercises.filter(end_date__year=year).order_by("end_date").last()
+            if not exercise:
+                raise ValueError(f"No exercise ending in {year}")
+
+            if exercise.state == Exercise.State.CLOSED:
+                closing = exercise.moves.closing().first()
+            else:
+                closing = exercise.close()
+
+            next_exercise = book.get_exercise(exercise.end_date + timedelta(days=1), create=True)
+            if next_exercise.state == Exercise.State.DRAFT:
+                opening = next_exercise.open()
+            else:
+                opening = next_exercise.opening_move
+
+            result.closing_id = closing and closing.pk
+            result.opening_id = opening and opening.pk
+    except Exception as err:
+        result.error = f"{type(err).__name__}: {err}"
+    result.duration = perf_counter() - start
+    return result
+
+
+class Rollforward:
+    """Close exercise of a year and open the next one for many books in parallel.
+
+    Books are dispatched over a process pool, each worker using its own
+    database connection. A failing book does not abort the others.
+    """
+
+    year: int
+    """ Close exercises ending in this year. """
+    workers: int | None
+    """ Number of worker processes. When ``0``, run in the current process. """
+
+    def __init__(self, year: int, workers: int | None = None):
+        self.year = year
+        self.workers = workers
+
+    def run(
+        self, book_ids: Iterable[int], callback: Callable[[RollforwardResult], None] | None = None
+    ) -> list[RollforwardResult]:
+        """Rollforward the provided books.
+
+        :param book_ids: books to process
+        :param callback: called with each result as soon as it is available
+        :return: results, ordered as ``book_ids``.
+        """
+        book_ids = list(book_ids)
+        if self.workers == 0:
+            results = {}
+            for book_id in book_ids:
+                results[book_id] = rollforward_book(book_id, self.year)
+                callback and callback(results[book_id])
+        else:
+            results = self.run_pool(book_ids, callback)
+        return [results[book_id] for book_id in book_ids]
+
+    def run_pool(self, book_ids: list[int], callback=None) -> dict[int, RollforwardResult]:
+        """Run rollforward using a process pool."""
+        results = {}
+        # Spawned workers don't inherit the parent's database connections: each
+        # one sets Django up and opens its own.
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(self.workers, mp_context=context, initializer=django.setup) as executor:
+            futures = {executor.submit(rollforward_book, book_id, self.year): book_id for book_id in book_ids}
+            for future in as_completed(futures):
+                book_id = futures[future]
+                try:
+                    result = future.result()
+                except Exception as err:
+                    result = RollforwardResult(book_id, error=f"{type(err).__name__}: {err}")
+                results[book_id] = result
+                callback and callback(result)
+        return results
@@ -240,12 +240,12 @@ class BookSheetLoader(BaseLoader):
         if not values.get("date"):
             return None
 
-        # TODO: optimize
         date = values["date"]
         if self._last_exercise and self._last_exercise.contains(date):
             exercise = self._last_exercise
         else:
             exercise = self.book.get_exercise(date, create=True)
+            exercise.refresh_state()
             if exercise.is_locked:
                 raise ValueError(f"Exercise {exercise} is closed: you can't add new moves there.")
             self._last_exercise = exercise
@@ -81,6 +81,7 @@ class BookTemplateLoader(BaseLoader):
         # accounts related fields
         updated_accounts, update_fields = self.assign_many_related(accounts, accounts_in_db, lambda a: a._set_accounts)
         Account.objects.bulk_update(updated_accounts, update_fields)
+        Account.objects.update_hierarchy(template)
 
     def clear(self, template, **_):
         if template.pk:
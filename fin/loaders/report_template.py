@@ -3,6 +3,7 @@ from decimal import Decimal
 from typing import Generator
 
 
+from ..engine.report.graph import ReportGraph
 from ..models import ReportSectionTemplate, ReportTemplate
 from ..schemas.loaders import ReportSectionSchema, ReportTemplateSchema
 from .base import BaseLoader, ModelItemsMap
@@ -134,6 +135,8 @@ class ReportTemplateLoader(BaseLoader):
         if to_update:
             ReportSectionTemplate.objects.bulk_update(to_update, ["previous"])
 
+        ReportGraph.invalidate(template.pk)
+
     def resolve_previous(self, sections: list[ReportSectionTemplate]) -> Generator[ReportSectionTemplate, None]:
         """
         Resolve and set ``previous`` on sections when applicable.
@@ -161,3 +164,4 @@ class ReportTemplateLoader(BaseLoader):
     def clear(self, template, **_):
         if template.pk:
             template.sections.all().delete()
+            ReportGraph.invalidate(template.pk)
@@ -1,12 +1,15 @@
 from datetime import timedelta, date
 from decimal import Decimal
+import json
 from pathlib import Path
 
 from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.db import transaction
+from django.db.models import Count
 
 from rich import print, align
+from rich.progress import Progress
 from rich.table import Table
 
 from fin import models, engine, loaders
@@ -23,6 +26,11 @@ def as_date(val):
     return date(*val)
 
 
+def as_entity(val):
+    book, entity = val.split("=", 1)
+    return int(book), entity.strip()
+
+
 def create_table(title, columns, title_style="b yellow", expand=True):
     t = Table(title=title, title_style=title_style, expand=expand)
     for col in columns:
@@ -89,6 +97,26 @@ class Command(BaseCommand):
             help="Provide a description for generated journal entry, as a format string with `{asset}` and `{date}`",
         )
 
+        group = subparsers.add_parser("close", help="Close exercises of one or more books")
+        group.set_defaults(func=self.handle_close)
+        group.add_argument(
+            "--book", "-b", type=int, action="append", dest="books", help="Select the books (by id), default to all."
+        )
+        group.add_argument("--year", "-y", type=int, required=True, help="Close exercises ending in this year")
+        group.add_argument("--force", "-f", action="store_true", help="Recreate existing closing moves.")
+
+        group = subparsers.add_parser(
+            "rollforward", help="Close exercises ending in a year and open the next ones, for many books in parallel"
+        )
+        group.set_defaults(func=self.handle_rollforward)
+        group.add_argument(
+            "--book", "-b", type=int, action="append", dest="books", help="Select the books (by id), default to all."
+        )
+        group.add_argument("--year", "-y", type=int, required=True, help="Close exercises ending in this year")
+        group.add_argument(
+            "--workers", "-w", type=int, help="Number of worker processes (0 to run in the current process)."
+        )
+
         group = subparsers.add_parser("entries", help="Print ledger book's entries")
         group.set_defaults(func=self.handle_moves)
         group.add_argument("--book", "-b", type=int, required=True, help="Select the book (by id)")
@@ -147,6 +175,78 @@ class Command(BaseCommand):
         group.add_argument("--year", "-y", type=int, help="Annual report year.")
         group.add_argument("--start", type=as_date, help="Report period start date.")
         group.add_argument("--end", type=as_date, help="Report period end date.")
+        group.add_argument(
+            "--profile", action="store_true", help="Print nodes computation timings, queries and cache hits."
+        )
+        group.add_argument(
+            "--sort",
+            choices=engine.ReportProfiler.sort_keys,
+            default="duration",
+            help="Sort profiled nodes by this key (descending, except for order and code).",
+        )
+        group.add_argument("--profile-output", type=Path, help="Write profile (including SQL) to this JSON file.")
+
+        group = subparsers.add_parser(
+            "report-batch",
+            help=(
+                "Generate and save reports for many ledger books and periods in parallel.\n"
+                "You must provide periods, either using `--year` arguments or `--start` and `--end` one."
+            ),
+        )
+        group.set_defaults(func=self.handle_report_batch)
+        group.add_argument("--template", "-t", type=int, required=True, help="Report template ID")
+        group.add_argument(
+            "--book", "-b", type=int, action="append", dest="books", help="Select the books (by id), default to all."
+        )
+        group.add_argument("--year", "-y", type=int, action="append", dest="years", help="Annual report year.")
+        group.add_argument("--start", type=as_date, help="Report period start date.")
+        group.add_argument("--end", type=as_date, help="Report period end date.")
+        group.add_argument(
+            "--workers", "-w", type=int, help="Number of worker processes (0 to run in the current process)."
+        )
+        group.add_argument("--output", "-o", type=Path, help="Write results (timings and errors) to this JSON file.")
+
+        group = subparsers.add_parser(
+            "xbrl-export",
+            help=(
+                "Export XBRL instances of a report template for many ledger books, in parallel.\n"
+                "Saved reports are reused when up to date, otherwise they are built.\n"
+                "You must provide a period, either using `--year` argument or `--start` and `--end` one."
+            ),
+        )
+        group.set_defaults(func=self.handle_xbrl_export)
+        group.add_argument("--template", "-t", type=int, required=True, help="Report template ID")
+        group.add_argument(
+            "--book", "-b", type=int, action="append", dest="books", help="Select the books (by id), default to all."
+        )
+        group.add_argument("--year", "-y", type=int, help="Annual report year.")
+        group.add_argument("--start", type=as_date, help="Report period start date.")
+        group.add_argument("--end", type=as_date, help="Report period end date.")
+        group.add_argument(
+            "--entity",
+            "-e",
+            type=as_entity,
+            action="append",
+            dest="entities",
+            help="XBRL entity identifier of a book, as `BOOK_ID=IDENTIFIER` (default to the book id).",
+        )
+        group.add_argument(
+            "--taxonomy",
+            type=Path,
+            action="append",
+            dest="packages",
+            help="Validate files against this taxonomy package (default to settings.XBRL_TAXONOMY_PACKAGES).",
+        )
+        group.add_argument(
+            "--workers", "-w", type=int, help="Number of worker processes (0 to run in the current process)."
+        )
+        group.add_argument(
+            "--output",
+            "-o",
+            type=Path,
+            required=True,
+            help="Output directory, or zip file if it ends with `.zip`. A manifest.json file is added.",
+        )
 
     def print(self, level, *args, **kwargs):
         if level <= self.verbosity:
@@ -302,17 +402,13 @@ class Command(BaseCommand):
         print(
             f"Book [yellow]{self.book.title}[/yellow] has {len(assets)} assets to amortize up to [yellow]{period_end}[/yellow]"
         )
-        entries = []
+        entries = engine.AmortizationBatchBuilder().build(self.book, period_end, clear=clear)
 
+        counts = {}
+        for entry in entries:
+            counts[entry.schedule.asset_id] = counts.get(entry.schedule.asset_id, 0) + 1
         for asset in assets:
-            print(f"- Asset [cyan]{asset.reference}[/cyan]...", flush=True, end=" ")
-            items = []
-            for schedule in asset.amortizations.all():
-                items.extend(builder.build(schedule, period_end, clear=clear))
-
-            print(f"{len(items)} amortization.s")
-
-            entries.extend(items)
+            print(f"- Asset [cyan]{asset.reference}[/cyan]... {counts.get(asset.pk, 0)} amortization.s")
 
         moves, lines = None, None
         if apply:
@@ -328,6 +424,71 @@ class Command(BaseCommand):
             print("")
             self.summary(self.book, lines, details=True, title="Amortizations - Journal Entries")
 
+    # ---- close
+    def handle_close(self, year, books=None, force=False, **kwargs):
+        """Close exercises."""
+        queryset = models.Exercise.objects.filter(end_date__year=year).select_related("book")
+        if books:
+            queryset = queryset.filter(book_id__in=books)
+
+        # exercises that can't be closed (already closed, draft...) would abort the others
+        exercises, skipped = {}, []
+        for exercise in queryset:
+            if exercise.validate_next_state(models.Exercise.State.CLOSING, no_exc=True):
+                exercises[exercise.pk] = exercise
+            else:
+                skipped.append(exercise)
+
+        closings = exercises and models.Exercise.objects.filter(pk__in=exercises).close(force=force)
+        moves = models.Move.objects.filter(pk__in=[move.pk for move in (closings or {}).values()])
+        counts = dict(moves.annotate(lines_count=Count("lines")).values_list("pk", "lines_count"))
+
+        t = create_table(f"Closing {year}", [("Book", "cyan"), "Exercise", ("Closing", "yellow"), "Lines"])
+        for exercise_id, move in (closings or {}).items():
+            exercise = exercises[exercise_id]
+            t.add_row(
+                exercise.book.title,
+                f"{exercise.start_date} → {exercise.end_date}",
+                str(move.pk),
+                str(counts.get(move.pk, 0)),
+            )
+        for exercise in skipped:
+            t.add_row(
+                exercise.book.title,
+                f"{exercise.start_date} → {exercise.end_date}",
+                f"[red]skipped: {exercise.get_state_display()}[/red]",
+                "",
+            )
+        print(t)
+
+    # ---- rollforward
+    def handle_rollforward(self, year, books=None, workers=None, **kwargs):
+        """Close and open exercises of many books."""
+        if not books:
+            books = list(models.Book.objects.order_by("pk").values_list("pk", flat=True))
+        titles = dict(models.Book.objects.filter(pk__in=books).values_list("pk", "title"))
+
+        rollforward = engine.Rollforward(year, workers=workers)
+        with Progress() as progress:
+            task = progress.add_task(f"Rollforward {year}", total=len(books))
+            results = rollforward.run(books, callback=lambda r: progress.advance(task))
+
+        t = create_table(
+            f"Rollforward {year} → {year + 1}", [("Book", "cyan"), "Closing", "Opening", "Duration", "Status"]
+        )
+        for result in results:
+            t.add_row(
+                titles.get(result.book_id, str(result.book_id)),
+                str(result.closing_id or ""),
+                str(result.opening_id or ""),
+                f"{result.duration:.2f}s",
+                "[green]OK[/green]" if result.success else f"[red]{result.error}[/red]",
+            )
+        print(t)
+
+        failed = sum(not r.success for r in results)
+        print(f"{len(results) - failed} book.s succeeded, {failed} failed.")
+
     # ---- entries
     def handle_moves(self, year=None, account=None, **kwargs):
         moves = self.get_moves(period=year)
@@ -600,7 +761,9 @@ class Command(BaseCommand):
         self.print_report(results["template"], results["sections"])
 
     # ---- report
-    def handle_report(self, template, year=None, start=None, end=None, **kwargs):
+    def handle_report(
+        self, template, year=None, start=None, end=None, profile=False, sort="duration", profile_output=None, **kwargs
+    ):
         if not year:
             if not start or not end:
                 raise ValueError("You must provide a period, either using --year or --start and --end.")
@@ -612,10 +775,138 @@ class Command(BaseCommand):
         lines = self.get_lines(period=period)
 
         builder = engine.ReportBuilder(template, self.book)
+        if profile or profile_output:
+            builder.profiler = engine.ReportProfiler()
         report, results = builder.build(lines, period=period)
         sections = template.sections.filter(parent__isnull=True).order_by("order")
         self.print_report(template, sections, results)
 
+        if profile:
+            self.print_profile(builder.profiler, sort)
+        if profile_output:
+            data = {
+                "template": template.name,
+                "book": self.book.pk,
+                "period": [period[0].isoformat(), period[1].isoformat()],
+                **builder.profiler.as_dict(),
+            }
+            profile_output.write_text(json.dumps(data, indent=2))
+            print(f"Profile written to [yellow]{profile_output}[/yellow]")
+
+    def print_profile(self, profiler, sort="duration"):
+        columns = [("Code", "cyan"), "Method", "Time", "Queries", "SQL time", "Cache hits", "Token cache hits"]
+        t = create_table("Report build profile", columns)
+        for node in profiler.get_nodes(sort, reverse=sort not in ("order", "code")):
+            t.add_row(
+                node.code,
+                node.method,
+                f"{node.duration * 1000:.2f}ms",
+                str(node.query_count),
+                f"{node.query_time * 1000:.2f}ms",
+                str(node.cache_hits),
+                str(node.token_cache_hits),
+            )
+        print(t)
+        print(
+            f"Built in {profiler.duration:.3f}s, "
+            f"{profiler.as_dict()['query_count']} queries ({len(profiler.queries)} outside of nodes)."
+        )
+
+    # ---- report-batch
+    def handle_report_batch(
+        self, template, books=None, years=None, start=None, end=None, workers=None, output=None, **kwargs
+    ):
+        periods = [(date(year, 1, 1), date(year, 12, 31)) for year in years or ()]
+        if start and end:
+            periods.append((start, end))
+        if not periods:
+            raise ValueError("You must provide periods, either using --year or --start and --end.")
+
+        if not books:
+            books = list(models.Book.objects.order_by("pk").values_list("pk", flat=True))
+        titles = dict(models.Book.objects.filter(pk__in=books).values_list("pk", "title"))
+
+        template = models.ReportTemplate.objects.get(pk=template)
+        batch = engine.ReportBatch(template, periods, workers=workers)
+        with Progress() as progress:
+            task = progress.add_task(f"Reports {template.name}", total=len(books))
+            results = batch.run(books, callback=lambda r: progress.advance(task))
+
+        t = create_table(f"Reports {template.title}", [("Book", "cyan"), "Period", "Report", "Duration", "Status"])
+        for result in results:
+            t.add_row(
+                titles.get(result.book_id, str(result.book_id)),
+                f"{result.period[0]} → {result.period[1]}",
+                str(result.report_id or ""),
+                f"{result.duration:.2f}s",
+                "[green]OK[/green]" if result.success else f"[red]{result.error}[/red]",
+            )
+        print(t)
+
+        failed = sum(not r.success for r in results)
+        print(f"{len(results) - failed} report.s succeeded, {failed} failed.")
+        if failed:
+            print("Failed builds are saved as reports without section, with their error.")
+        if output:
+            output.write_text(json.dumps([r.as_dict() for r in results], indent=2))
+            print(f"Results written to [yellow]{output}[/yellow]")
+
+    # ---- xbrl-export
+    def handle_xbrl_export(
+        self,
+        template,
+        output,
+        books=None,
+        year=None,
+        start=None,
+        end=None,
+        entities=None,
+        packages=None,
+        workers=None,
+        **kwargs,
+    ):
+        if not year:
+            if not start or not end:
+                raise ValueError("You must provide a period, either using --year or --start and --end.")
+            period = (start, end)
+        else:
+            period = (date(year, 1, 1), date(year, 12, 31))
+
+        if not books:
+            books = list(models.Book.objects.order_by("pk").values_list("pk", flat=True))
+        titles = dict(models.Book.objects.filter(pk__in=books).values_list("pk", "title"))
+
+        template = models.ReportTemplate.objects.get(pk=template)
+        packages = packages or settings.XBRL_TAXONOMY_PACKAGES
+        export = engine.XBRLExport(template, period, entities=dict(entities or ()), packages=packages, workers=workers)
+        with Progress() as progress:
+            task = progress.add_task(f"XBRL {template.name}", total=len(books))
+            results = export.run(books, output, callback=lambda r: progress.advance(task))
+
+        columns = [("Book", "cyan"), "File", "Report", "Build", "Render", "Checksum", "Status"]
+        t = create_table(f"XBRL {template.title} {period[0]} → {period[1]}", columns)
+        for result in results:
+            if not result.success:
+                status = f"[red]{result.error}[/red]"
+            elif not result.valid:
+                status = f"[red]Invalid: {'; '.join(result.validation_errors)}[/red]"
+            else:
+                status = "[green]OK[/green]"
+            t.add_row(
+                titles.get(result.book_id, str(result.book_id)),
+                result.filename or "",
+                f"{result.report_id or ''}{' (reused)' if result.reused else ''}",
+                f"{result.build_duration:.2f}s",
+                f"{result.render_duration:.2f}s",
+                (result.checksum or "")[:12],
+                status,
+            )
+        print(t)
+
+        failed = sum(not (r.success and r.valid) for r in results)
+        print(f"{len(results) - failed} file.s exported, {failed} failed.")
+        print(f"Files written to [yellow]{output}[/yellow]")
+
     _report_tags = {
         0: "b",
         1: "b yellow",
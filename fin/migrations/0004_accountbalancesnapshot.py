@@ -0,0 +1,118 @@
+# Generated by Django 5.2 on 2026-10-17 09:12
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Case, F, Sum, Value, When
+from django.db.models.functions import TruncMonth
+
+
+def init_snapshots(apps, schema_editor):
+    """Compute balance snapshots of existing books, one book at a time."""
+    Book = apps.get_model("ox_fin", "Book")
+    Move = apps.get_model("ox_fin", "Move")
+    Line = apps.get_model("ox_fin", "Line")
+    AccountBalanceSnapshot = apps.get_model("ox_fin", "AccountBalanceSnapshot")
+
+    # Move.type may not be part of the migration state yet: moves are then normal ones (Move.Type.NORMAL)
+    if any(f.name == "type" for f in Move._meta.get_fields()):
+        move_type = F("move__type")
+    else:
+        move_type = Value(0, output_field=models.PositiveSmallIntegerField())
+
+    # Move.Type.OPENING, Move.Type.CLOSING and Account.Type.VIEW
+    norm_amount = Case(
+        When(move_type__in=(0x01, 0x02), then=F("amount")),
+        When(account__type__in=[0x01], then=Value(0)),
+        When(is_debit=F("account__is_debit"), then=F("amount")),
+        default=-F("amount"),
+        output_field=models.DecimalField(),
+    )
+
+    for book_id in Book.objects.values_list("id", flat=True):
+        query = (
+            Line.objects.filter(move__book_id=book_id)
+            .annotate(move_type=move_type)
+            .annotate(norm_amount=norm_amount, period=TruncMonth("move__date"))
+            .values_list("account_id", "period", "move_type")
+            .annotate(total=Sum("norm_amount"))
+            .order_by()
+        )
+        AccountBalanceSnapshot.objects.bulk_create(
+            (
+                AccountBalanceSnapshot(
+                    book_id=book_id,
+                    account_id=account_id,
+                    period=period,
+                    move_type=move_type,
+                    amount=total or Decimal("0.00"),
+                )
+                for account_id, period, move_type, total in query
+            ),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ox_fin", "0003_alter_amortizationschedule_asset_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AccountBalanceSnapshot",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("period", models.DateField(help_text="First day of the month.", verbose_name="Period")),
+                (
+                    "move_type",
+                    models.PositiveSmallIntegerField(
+                        choices=[
+                            (0, "Movement"),
+                            (1, "Opening"),
+                            (2, "Closing"),
+                            (3, "Adjustment"),
+                            (4, "Equity Adjustment"),
+                        ],
+                        verbose_name="Move Type",
+                    ),
+                ),
+                (
+                    "amount",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0.00"), max_digits=14, verbose_name="Amount"
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True, verbose_name="Updated at")),
+                (
+                    "account",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="ox_fin.account",
+                        verbose_name="Account",
+                    ),
+                ),
+                (
+                    "book",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="snapshots",
+                        to="ox_fin.book",
+                        verbose_name="Book",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Account Balance Snapshot",
+                "verbose_name_plural": "Account Balance Snapshots",
+                "indexes": [models.Index(fields=["book", "period"], name="ox_fin_acco_book_id_589de1_idx")],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("book", "account", "period", "move_type"), name="unique_book_account_period_type"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(init_snapshots, migrations.RunPython.noop),
+    ]
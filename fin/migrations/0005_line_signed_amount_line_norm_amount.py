@@ -0,0 +1,67 @@
+# Generated by Django 5.2 on 2026-10-17 10:41
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def init_norm_amount(apps, schema_editor, batch_size=2000):
+    """Compute normalized amount of existing lines by batch."""
+    Move = apps.get_model("ox_fin", "Move")
+    Line = apps.get_model("ox_fin", "Line")
+    # Move.type may not be part of the migration state yet: moves are then normal ones (Move.Type.NORMAL)
+    has_type = any(f.name == "type" for f in Move._meta.get_fields())
+
+    query = Line.objects.select_related("move", "account").order_by("pk")
+    last_pk = 0
+    while batch := list(query.filter(pk__gt=last_pk)[:batch_size]):
+        for line in batch:
+            # Move.Type.OPENING, Move.Type.CLOSING and Account.Type.VIEW
+            if has_type and line.move.type in (0x01, 0x02):
+                line.norm_amount = line.amount
+            elif line.account.type == 0x01:
+                line.norm_amount = Decimal("0.00")
+            elif line.is_debit == line.account.is_debit:
+                line.norm_amount = line.amount
+            else:
+                line.norm_amount = -line.amount
+        Line.objects.bulk_update(batch, ["norm_amount"])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ox_fin", "0004_accountbalancesnapshot"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="line",
+            name="signed_amount",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=models.Case(
+                    models.When(is_debit=True, then=models.F("amount")), default=models.F("amount") * models.Value(-1)
+                ),
+                help_text="Amount as positive for debit, negative for credit.",
+                output_field=models.DecimalField(decimal_places=2, max_digits=12),
+                verbose_name="Signed Amount",
+            ),
+        ),
+        migrations.AddField(
+            model_name="line",
+            name="norm_amount",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=Decimal("0.00"),
+                editable=False,
+                help_text="Amount signed based on account's side (debit or credit) and move type.",
+                max_digits=12,
+                verbose_name="Normalized Amount",
+            ),
+        ),
+        migrations.RunPython(init_norm_amount, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="line",
+            index=models.Index(fields=["account", "norm_amount"], name="ox_fin_line_account_1a5497_idx"),
+        ),
+    ]
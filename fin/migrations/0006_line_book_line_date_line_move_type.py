@@ -0,0 +1,82 @@
+# Generated by Django 5.2 on 2026-10-17 11:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def init_move_fields(apps, schema_editor):
+    """Copy book, date and type of moves on their lines."""
+    Move = apps.get_model("ox_fin", "Move")
+    Line = apps.get_model("ox_fin", "Line")
+
+    moves = Move.objects.filter(pk=OuterRef("move_id"))
+    fields = {
+        "book_id": Subquery(moves.values("book_id")[:1]),
+        "date": Subquery(moves.values("date")[:1]),
+    }
+    # Move.type may not be part of the migration state yet
+    if any(f.name == "type" for f in Move._meta.get_fields()):
+        fields["move_type"] = Subquery(moves.values("type")[:1])
+    Line.objects.update(**fields)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ox_fin", "0005_line_signed_amount_line_norm_amount"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="line",
+            name="book",
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="lines",
+                to="ox_fin.book",
+                verbose_name="Book",
+            ),
+        ),
+        migrations.AddField(
+            model_name="line",
+            name="date",
+            field=models.DateField(editable=False, null=True, verbose_name="Date"),
+        ),
+        migrations.AddField(
+            model_name="line",
+            name="move_type",
+            field=models.PositiveSmallIntegerField(
+                choices=[(0, "Movement"), (1, "Opening"), (2, "Closing"), (3, "Adjustment"), (4, "Equity Adjustment")],
+                default=0,
+                editable=False,
+                verbose_name="Move Type",
+            ),
+        ),
+        migrations.RunPython(init_move_fields, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="line",
+            name="book",
+            field=models.ForeignKey(
+                editable=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="lines",
+                to="ox_fin.book",
+                verbose_name="Book",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="line",
+            name="date",
+            field=models.DateField(editable=False, verbose_name="Date"),
+        ),
+        migrations.AddIndex(
+            model_name="line",
+            index=models.Index(fields=["book", "account", "date"], name="ox_fin_line_book_id_298b68_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="line",
+            index=models.Index(fields=["book", "move_type", "date"], name="ox_fin_line_book_id_402f4c_idx"),
+        ),
+    ]
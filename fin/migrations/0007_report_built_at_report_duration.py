@@ -0,0 +1,22 @@
+# Generated by Django 5.2 on 2026-10-17 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ox_fin", "0006_line_book_line_date_line_move_type"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="report",
+            name="built_at",
+            field=models.DateTimeField(blank=True, null=True, verbose_name="Built at"),
+        ),
+        migrations.AddField(
+            model_name="report",
+            name="duration",
+            field=models.FloatField(blank=True, help_text="In seconds.", null=True, verbose_name="Build duration"),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-17 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ox_fin", "0007_report_built_at_report_duration"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="report",
+            name="stale",
+            field=models.BooleanField(
+                default=False, help_text="Book lines changed since the report was built.", verbose_name="Stale"
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2 on 2026-10-17 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ox_fin", "0008_report_stale"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reportsection",
+            name="line_ranges",
+            field=models.JSONField(
+                blank=True,
+                default=list,
+                help_text="Ids of the contributing lines, as inclusive ranges.",
+                verbose_name="Lines",
+            ),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2 on 2026-10-17 16:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def init_hierarchy(apps, schema_editor):
+    """Compute accounts hierarchy of existing book templates (as ``AccountQuerySet.update_hierarchy``)."""
+    Account = apps.get_model("ox_fin", "Account")
+    BookTemplate = apps.get_model("ox_fin", "BookTemplate")
+
+    for template_id in BookTemplate.objects.values_list("id", flat=True):
+        accounts = sorted(
+            Account.objects.filter(template_id=template_id, code__isnull=False), key=lambda account: account.code
+        )
+        by_code = {}
+        for position, account in enumerate(accounts):
+            prefixes = (account.code[:i] for i in range(len(account.code) - 1, 0, -1))
+            account.position = position
+            account.parent = next((by_code[prefix] for prefix in prefixes if prefix in by_code), None)
+            by_code[account.code] = account
+        Account.objects.bulk_update(accounts, ["position", "parent"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ox_fin", "0009_reportsection_line_ranges"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="account",
+            name="parent",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="Account with the longest code prefixing this one.",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="children",
+                to="ox_fin.account",
+                verbose_name="Parent",
+            ),
+        ),
+        migrations.AddField(
+            model_name="account",
+            name="position",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="Rank of the code among the template's accounts, in lexicographic order.",
+                null=True,
+                verbose_name="Position",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="account",
+            index=models.Index(fields=["template", "position"], name="ox_fin_acco_templat_95a2bd_idx"),
+        ),
+        migrations.RunPython(init_hierarchy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2 on 2026-10-17 20:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ox_fin", "0010_account_parent_account_position"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="report",
+            name="error",
+            field=models.TextField(
+                blank=True,
+                help_text="Error of the failed build: the report has no section.",
+                null=True,
+                verbose_name="Build error",
+            ),
+        ),
+    ]
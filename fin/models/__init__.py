@@ -1,5 +1,5 @@
 from .assets import FixedAsset, AmortizationSchedule, AmortizationEntry
-from .book import Book, Exercise, Move, Line
+from .book import Book, Exercise, Move, Line, AccountBalanceSnapshot
 from .book_template import BookTemplate, Journal, Account
 from .enums import ProrataPolicy, Period
 from .report import ReportTemplate, ReportSectionTemplate, Report, ReportSection
@@ -17,6 +17,7 @@ __all__ = (
     "Exercise",
     "Move",
     "Line",
+    "AccountBalanceSnapshot",
     # report
     "ReportTemplate",
     "ReportSectionTemplate",
@@ -1,12 +1,11 @@
 from __future__ import annotations
 from decimal import Decimal
-from datetime import date, timedelta
+from datetime import date
 
-from dateutil.relativedelta import relativedelta
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
-
+from ..utils.periods import count_periods, iter_periods, nth_period, period_end, period_index
 from .enums import ProrataPolicy
 from .book_template import Account
 from .book import Book, Move, Line
@@ -15,39 +14,6 @@ from .book import Book, Move, Line
 __all__ = ("FixedAsset", "AmortizationSchedule", "AmortizationEntry")
 
 
-def iter_periods(frequency, start_date, end_date):
-    """Iterate over start-end periods."""
-    start = start_date
-    while start <= end_date:
-        end = period_end(frequency, start)
-        if end > end_date:
-            break
-
-        yield start, end
-        start = end + timedelta(days=1)
-
-
-def count_periods(frequency, start_date, end_date):
-    """Count periods between start and end."""
-    return sum(1 for _ in iter_periods(frequency, start_date, end_date))
-
-
-def period_end(frequency: int, date: date) -> date:
-    """Return the end of a period based on provided frequency and date."""
-    match frequency:
-        case 12:
-            return date.replace(month=12, day=31)
-        case 1:
-            return (date + relativedelta(months=1, day=1)) - relativedelta(days=1)
-        case 3:
-            quarter = (date.month - 1) // 3 + 1
-            end_month = quarter * 3
-            return date.replace(month=end_month, day=1) + relativedelta(months=1, days=-1)
-        case _:
-            # Support custom frequencies (in months)
-            return (date + relativedelta(months=frequency, day=1)) - relativedelta(days=1)
-
-
 class FixedAsset(models.Model):
     """A fixed asset that is ammortized."""
 
@@ -179,6 +145,14 @@ class AmortizationSchedule(models.Model):
         end_date = end_date or self.end_date
         return count_periods(self.frequency, start_date, end_date)
 
+    def get_period(self, n: int) -> tuple[date, date]:
+        """Return start and end of the ``n``-th period (0-based) of the schedule."""
+        return nth_period(self.frequency, self.start_date, n)
+
+    def get_period_index(self, date: date) -> int:
+        """Return index of the schedule period containing the provided date."""
+        return period_index(self.frequency, self.start_date, date)
+
     def iter_periods(self, start_date=None, end_date=None):
         start_date = min(start_date or self.start_date, self.end_date)
         end_date = min(end_date or self.end_date, self.end_date)
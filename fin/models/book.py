@@ -1,4 +1,5 @@
 from __future__ import annotations
+from bisect import bisect_right
 from datetime import date
 from decimal import Decimal
 from functools import cached_property
@@ -9,7 +10,9 @@ from dateutil.relativedelta import relativedelta
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models, transaction
-from django.db.models import F, Value, Case, When, Sum, ExpressionWrapper
+from django.db.models import F, Value, Case, When, Sum, ExpressionWrapper, OuterRef, Subquery
+from django.db.models.functions import TruncMonth
+from django.dispatch import Signal
 from django.utils.translation import gettext_lazy as _, gettext as __
 from django.utils.text import slugify
 
@@ -19,7 +22,38 @@ from .enums import ProrataPolicy, Period
 from .book_template import BookTemplate, Journal, Account
 
 
-__all__ = ("Book", "MoveQuerySet", "Move", "Line")
+__all__ = ("ExerciseIndex", "Book", "MoveQuerySet", "Move", "Line", "AccountBalanceSnapshot", "balances_changed")
+
+
+SnapshotKey = tuple[int, int, date, int]
+""" Snapshot key as ``(book_id, account_id, period, move_type)``. """
+
+balances_changed = Signal()
+""" Sent by :py:meth:`AccountBalanceSnapshotQuerySet.refresh` for each book whose balances changed,
+with ``book_id``, ``account_ids`` and ``start_date`` (first day of the earliest changed month). """
+
+
+class ExerciseIndex:
+    """Exercises of a book sorted by start date, looked up by date using bisect.
+
+    Exercises are assumed not to overlap (as generated by the book). Their
+    state may be changed by queryset updates, so code posting moves must
+    check it from the database (see :py:meth:`Exercise.refresh_state`).
+    """
+
+    def __init__(self, exercises: Iterable[Exercise] = ()):
+        self.exercises = sorted(exercises, key=lambda e: e.start_date)
+        self.starts = [e.start_date for e in self.exercises]
+
+    def get(self, date: date) -> Exercise | None:
+        """Return exercise containing the provided date, if any."""
+        index = bisect_right(self.starts, date) - 1
+        if index >= 0 and self.exercises[index].contains(date):
+            return self.exercises[index]
+        return None
+
+    def __len__(self):
+        return len(self.exercises)
 
 
 class Book(Titled, Described):
@@ -71,18 +105,34 @@ class Book(Titled, Described):
         if date is None:
             date = date.today()
 
-        if exercise := self.exercises.date(date).select_related("book").first():
+        if exercise := self.exercise_index.get(date):
             return exercise
 
         if not create:
             raise ValueError(f"No exercise found for date {date} in book {self.id}")
 
-        exercise = self._create_exercise_for_date(date)
-        if open:
+        exercise, created = self._create_exercise_for_date(date)
+        if created and open:
             exercise.open()
         return exercise
 
-    def _create_exercise_for_date(self, date):
+    @cached_property
+    def exercise_index(self) -> ExerciseIndex:
+        """Index of the book's exercises used by :py:meth:`get_exercise`.
+
+        It is shared by all users of this book instance, and cleared when one
+        of its exercise is saved or deleted (see :py:meth:`clear_exercise_index`).
+        """
+        exercises = list(self.exercises.all())
+        for exercise in exercises:
+            exercise.book = self
+        return ExerciseIndex(exercises)
+
+    def clear_exercise_index(self):
+        """Clear exercise index, which will be reloaded on next lookup."""
+        self.__dict__.pop("exercise_index", None)
+
+    def _create_exercise_for_date(self, date) -> tuple[Exercise, bool]:
         """
         Internal helper responsible for generating missing Exercises.
 
@@ -90,10 +140,17 @@ class Book(Titled, Described):
         - period length
         - fiscal alignment rules
         - start/end boundaries
+
+        It relies on the ``unique_book_start_end`` constraint, so concurrent
+        creation of the same exercise returns the existing one.
         """
         start_date = Period.get_start(date, self.exercise_start, self.exercise_period)
         end_date = start_date + relativedelta(months=self.exercise_period) - relativedelta(days=1)
-        return Exercise.objects.create(book=self, start_date=start_date, end_date=end_date)
+        exercise, created = Exercise.objects.get_or_create(book=self, start_date=start_date, end_date=end_date)
+        if not created:
+            # created by another process or book instance
+            self.clear_exercise_index()
+        return exercise, created
 
     def save(self, *args, **kwargs):
         if not self.path:
@@ -111,6 +168,108 @@ class ExerciseQuerySet(models.QuerySet):
         """Filter exercises that contains the provided date"""
         return self.filter(start_date__lte=date, end_date__gte=date)
 
+    close_batch_size = 500
+    """ Maximum number of books of a closing balances query. """
+
+    def get_closing_balances(self, exercises: Iterable[Exercise]) -> Iterable[tuple[int, int, Decimal]]:
+        """Yield P&L balances of the provided exercises, as ``(exercise_id, account_id, total)``.
+
+        Exercises are grouped by period, so that a single aggregate query computes
+        the balances of the books sharing it (by batches of :py:attr:`close_batch_size`).
+        """
+        from fin.engine.ledger import ProfitAndLossView
+
+        periods = {}
+        for e in exercises:
+            periods.setdefault((e.start_date, e.end_date), {})[e.book_id] = e.pk
+
+        for (start_date, end_date), books in periods.items():
+            book_ids = list(books)
+            for i in range(0, len(book_ids), self.close_batch_size):
+                balances = (
+                    Line.objects.filter(
+                        book_id__in=book_ids[i : i + self.close_batch_size],
+                        date__gte=start_date,
+                        date__lte=end_date,
+                        move_type__in=ProfitAndLossView.include_move_types,
+                        account__type__in=ProfitAndLossView.include_account_types,
+                    )
+                    .values("book_id", "account_id")
+                    .annotate(total=Sum("norm_amount"))
+                    .values_list("book_id", "account_id", "total")
+                    .order_by()
+                )
+                for book_id, account_id, total in balances:
+                    yield books[book_id], account_id, total
+
+    def close(self, force: bool = False) -> dict[int, Move]:
+        """Close all exercises of the queryset, which may belong to different books.
+
+        P&L balances are computed with an aggregate query per exercise period
+        (see :py:meth:`get_closing_balances`), then closing moves and lines are
+        bulk created. Results are transferred to the retained earnings account
+        of each book template.
+
+        Exercises already having a closing move keep it, unless ``force`` is set.
+
+        :param force: recreate existing closing moves;
+        :return: closing moves by exercise id.
+        :raises ValidationError: an exercise can not be closed.
+        :raises ValueError: a book template has no retained earnings account.
+        """
+        exercises = list(self.select_related("book__template"))
+        for exercise in exercises:
+            exercise.validate_next_state(Exercise.State.CLOSING)
+            if not exercise.book.template.retained_earnings_account_id:
+                raise ValueError("The book template does not defined a retained earning account")
+
+        Exercise.objects.filter(pk__in=[e.pk for e in exercises]).update(state=Exercise.State.CLOSING)
+        closings = {move.exercise_id: move for move in Move.objects.closing().filter(exercise__in=exercises)}
+        if not force:
+            exercises = [e for e in exercises if e.pk not in closings]
+        if not exercises:
+            return closings
+
+        with transaction.atomic():
+            Move.objects.filter(pk__in=[closings.pop(e.pk).pk for e in exercises if e.pk in closings]).delete()
+
+            balances = list(self.get_closing_balances(exercises))
+
+            moves = Move.objects.bulk_create(
+                Move(
+                    book_id=e.book_id,
+                    exercise=e,
+                    type=Move.Type.CLOSING,
+                    date=e.end_date,
+                    description=__("Closing {exercise}").format(exercise=e),
+                )
+                for e in exercises
+            )
+            moves = {move.exercise_id: move for move in moves}
+            profits = dict.fromkeys(moves, Decimal("0.00"))
+            lines = []
+
+            for exercise_id, account_id, balance in balances:
+                profits[exercise_id] += balance
+                if balance != 0:
+                    amount = -balance
+                    lines.append(
+                        Line(move=moves[exercise_id], account_id=account_id, amount=amount, is_debit=amount >= 0)
+                    )
+
+            # ---- Transfer result to retained earnings
+            for e in exercises:
+                profit = profits[e.pk]
+                retained_earnings = e.book.template.retained_earnings_account_id
+                lines.append(Line(move=moves[e.pk], account_id=retained_earnings, amount=-profit, is_debit=profit < 0))
+
+            Line.objects.bulk_create(lines)
+
+            # ---- Finalize exercises state
+            Exercise.objects.filter(pk__in=moves).update(state=Exercise.State.CLOSED)
+            closings.update(moves)
+        return closings
+
 
 class Exercise(models.Model):
     """Accounting period (fiscal year or sub-period)."""
@@ -163,6 +322,21 @@ class Exercise(models.Model):
     def is_locked(self):
         return self.state in (Exercise.State.CLOSED, Exercise.State.CLOSING, Exercise.State.FINALIZED)
 
+    def refresh_state(self) -> Exercise.State:
+        """Reload state from the database (it may have been updated by a queryset), and return it."""
+        self.refresh_from_db(fields=["state"])
+        return self.state
+
+    def save(self, *args, **kwargs):
+        if Exercise.book.is_cached(self):
+            self.book.clear_exercise_index()
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        if Exercise.book.is_cached(self):
+            self.book.clear_exercise_index()
+        return super().delete(*args, **kwargs)
+
     def open(self, force: bool = False) -> Move:
         """Create the opening move for the exercise, and return it.
 
@@ -220,62 +394,12 @@ class Exercise(models.Model):
             - compute final P&L
             - creates the closing move
             - transfers results to retained earning
-        """
-        from fin.engine.ledger import ProfitAndLossView
-
-        self.validate_next_state(Exercise.State.CLOSING)
-        self.state = Exercise.State.CLOSING
-        self.save(update_fields=["state"])
-
-        template = self.book.template
-        if not template.retained_earnings_account:
-            raise ValueError("The book template does not defined a retained earning account")
-
-        closing = self.moves.closing().first()
-        if closing and not force:
-            return closing
-
-        with transaction.atomic():
-            if closing:
-                closing.delete()
-
-            ledger = ProfitAndLossView(self.book, self.end_date, self.start_date)
-            balances = ledger.balances()
-
-            # ---- Compute result (P&L only)
-            profit = Decimal("0.00")
-            for account_id, balance in balances.items():
-                account = Account.objects.get(pk=account_id)
-                if account.type in (Account.Type.REVENUE, Account.Type.EXPENSE):
-                    profit += balance
-
-            closing = Move.objects.create(
-                book=self.book,
-                exercise=self,
-                type=Move.Type.CLOSING,
-                date=self.end_date,
-                description=__("Closing {exercise}").format(exercise=self),
-            )
-            lines = []
-
-            for account_id, balance in balances.items():
-                # FIXME: optimize it
-                account = Account.objects.get(pk=account_id)
-                if account.type in (Account.Type.REVENUE, Account.Type.EXPENSE):
-                    if balance != 0:
-                        amount = -balance
-                        lines.append(Line(move=closing, account_id=account_id, amount=amount, is_debit=(amount >= 0)))
-
-            # ---- Transfer result to retained earnings
-            retained_earnings = template.retained_earnings_account
-            lines.append(Line(move=closing, account=retained_earnings, amount=-profit, is_debit=(profit < 0)))
-
-            Line.objects.bulk_create(lines)
 
-            # ---- Finalize self state
-            self.state = Exercise.State.CLOSED
-            self.save(update_fields=["state"])
-            return closing
+        See :py:meth:`ExerciseQuerySet.close`.
+        """
+        closing = Exercise.objects.filter(pk=self.pk).close(force=force)[self.pk]
+        self.refresh_from_db(fields=["state"])
+        return closing
 
     def reopen(self):
         """
@@ -385,15 +509,17 @@ class MoveQuerySet(models.QuerySet):
     def non_closing(self):
         return self.exclude(type=Move.Type.CLOSING)
 
+    def delete(self):
+        """Delete moves, refreshing balance snapshots of their lines."""
+        keys = Line.objects.filter(move__in=self).snapshot_keys()
+        result = super().delete()
+        AccountBalanceSnapshot.objects.refresh(keys)
+        return result
+
     def with_balance(self):
         """Annotate objects with ``balance`` and ``is_balance``."""
         return self.annotate(
-            balance=Sum(
-                Case(
-                    When(lines__is_debit=True, then=F("lines__amount")),
-                    When(lines__is_debit=False, then=F("lines__amount") * -1),
-                )
-            ),
+            balance=Sum("lines__signed_amount"),
             is_balanced=ExpressionWrapper(
                 Case(When(balance=0, then=Value(True)), default=Value(False)), output_field=models.BooleanField()
             ),
@@ -506,6 +632,28 @@ class Move(models.Model):
     #    self.validate()
     #    return super().save(*args, **kwargs)
 
+    def save(self, *args, **kwargs):
+        keys = set()
+        if self.pk:
+            # date or type changes move lines to other balance snapshots
+            prev = Move.objects.filter(pk=self.pk).values_list("book_id", "date", "type").first()
+            if prev and prev != (self.book_id, self.date, self.type):
+                keys = self.lines.all().snapshot_keys()
+
+        super().save(*args, **kwargs)
+        if keys:
+            self.lines.all().update(book_id=self.book_id, date=self.date, move_type=self.type)
+            if prev[2] != self.type:
+                self.lines.all().update_norm_amount()
+            keys |= self.lines.all().snapshot_keys()
+            AccountBalanceSnapshot.objects.refresh(keys)
+
+    def delete(self, *args, **kwargs):
+        keys = self.lines.all().snapshot_keys()
+        result = super().delete(*args, **kwargs)
+        AccountBalanceSnapshot.objects.refresh(keys)
+        return result
+
     def __str__(self):
         return f"{self.date.strftime('%Y-%m-%d')} - {self.full_reference}"
 
@@ -513,37 +661,89 @@ class Move(models.Model):
 class LineQuerySet(models.QuerySet):
     def movements(self):
         """Only return lines that are movements (normal and adjustment moves)."""
-        return self.filter(move__type__in=(Move.Type.NORMAL, Move.Type.ADJUSTMENT))
+        return self.filter(move_type__in=(Move.Type.NORMAL, Move.Type.ADJUSTMENT))
 
     def with_norm_amount(self):
-        """Annotate with ``norm_amount``, which is the right amount based on
-        account and line type (debit/credit)."""
-        if hasattr(self.query, "annotations") and "norm_amount" in self.query.annotations:
-            return self
+        """Kept for compatibility: ``norm_amount`` is now a column of :py:class:`Line`."""
+        return self
 
-        return self.annotate(
-            norm_amount=Case(
-                When(
-                    move__type__in=(Move.Type.OPENING, Move.Type.CLOSING),
-                    then=F("amount"),
-                ),
-                When(account__type__in=[Account.Type.VIEW], then=Value(0)),
-                When(is_debit=F("account__is_debit"), then=F("amount")),
-                default=-F("amount"),
-                output_field=models.DecimalField(),
-            )
+    def select_norm_related(self):
+        """Fetch account, as required to compute normalized amounts."""
+        return self.select_related("account")
+
+    def sync_move(self) -> int:
+        """Copy book, date and type of moves on their lines.
+
+        This must be called when moves are changed without :py:meth:`Move.save`
+        (as ``update()``), the balance snapshots must then be rebuilt too.
+        """
+        moves = Move.objects.filter(pk=OuterRef("move_id"))
+        return self.update(
+            book_id=Subquery(moves.values("book_id")[:1]),
+            date=Subquery(moves.values("date")[:1]),
+            move_type=Subquery(moves.values("type")[:1]),
         )
 
+    def update_norm_amount(self, batch_size: int = 2000) -> int:
+        """Recompute ``norm_amount`` of the lines by batch, and return the number of updated lines.
+
+        This must be called when account type or move type changes outside of
+        :py:meth:`Move.save`.
+        """
+        count, last_pk = 0, 0
+        query = self.select_norm_related().order_by("pk")
+        while batch := list(query.filter(pk__gt=last_pk)[:batch_size]):
+            for line in batch:
+                line.update_norm_amount()
+            Line.objects.bulk_update(batch, ["norm_amount"])
+            count, last_pk = count + len(batch), batch[-1].pk
+        return count
+
+    def snapshot_keys(self) -> set[SnapshotKey]:
+        """Return the keys of balance snapshots the lines contribute to."""
+        qs = self.annotate(period=TruncMonth("date")).values_list("book_id", "account_id", "period", "move_type")
+        return set(qs.order_by().distinct())
+
     def bulk_create(self, objs, **kwargs):
+        objs = list(objs)
+        # avoid a query per line to get its account and move.
+        missings = {obj.account_id for obj in objs if not Line.account.is_cached(obj)}
+        accounts = missings and Account.objects.in_bulk(missings)
+        missings = {obj.move_id for obj in objs if not Line.move.is_cached(obj)}
+        moves = missings and Move.objects.in_bulk(missings)
+
         for obj in objs:
+            if accounts and obj.account_id in accounts:
+                obj.account = accounts[obj.account_id]
+            if moves and obj.move_id in moves:
+                obj.move = moves[obj.move_id]
             obj.ensure_debit()
-        return super().bulk_create(objs, **kwargs)
+            obj.sync_move()
+            obj.update_norm_amount()
+        objs = super().bulk_create(objs, **kwargs)
+        AccountBalanceSnapshot.objects.refresh(obj.snapshot_key for obj in objs)
+        return objs
+
+    def delete(self):
+        keys = self.snapshot_keys()
+        result = super().delete()
+        AccountBalanceSnapshot.objects.refresh(keys)
+        return result
 
 
 class Line(models.Model):
-    """A debit or credit in the :py:class:`Move`."""
+    """A debit or credit in the :py:class:`Move`.
+
+    Book, date and type of the move are copied on the line (see
+    :py:meth:`sync_move`), so ledger queries don't need to join moves.
+    """
 
     move = models.ForeignKey(Move, models.CASCADE, related_name="lines", db_index=True)
+    book = models.ForeignKey(Book, models.PROTECT, related_name="lines", editable=False, verbose_name=_("Book"))
+    date = models.DateField(_("Date"), editable=False)
+    move_type = models.PositiveSmallIntegerField(
+        _("Move Type"), choices=Move.Type.choices, default=Move.Type.NORMAL, editable=False
+    )
     account = models.ForeignKey(Account, models.PROTECT, verbose_name=_("Account"))
     amount = models.DecimalField(_("Amount"), max_digits=12, decimal_places=2)
     is_debit = models.BooleanField(_("Is Debit"))
@@ -555,13 +755,33 @@ class Line(models.Model):
         db_persist=True,
         verbose_name=_("Is Credit"),
     )
+    signed_amount = models.GeneratedField(
+        expression=Case(When(is_debit=True, then=F("amount")), default=-F("amount")),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        db_persist=True,
+        verbose_name=_("Signed Amount"),
+        help_text=_("Amount as positive for debit, negative for credit."),
+    )
+    norm_amount = models.DecimalField(
+        _("Normalized Amount"),
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal("0.00"),
+        editable=False,
+        help_text=_("Amount signed based on account's side (debit or credit) and move type."),
+    )
 
     objects = LineQuerySet.as_manager()
 
     class Meta:
         verbose_name = _("Journal Entry Line")
         verbose_name_plural = _("Journal Entry Lines")
-        indexes = [models.Index(fields=["move", "account"])]
+        indexes = [
+            models.Index(fields=["move", "account"]),
+            models.Index(fields=["account", "norm_amount"]),
+            models.Index(fields=["book", "account", "date"]),
+            models.Index(fields=["book", "move_type", "date"]),
+        ]
 
     @property
     def debit(self):
@@ -581,12 +801,25 @@ class Line(models.Model):
         self.amount = value
         self.is_debit = False
 
-    @cached_property
-    def norm_amount(self):
-        """Normalized amount depending on account's type."""
-        if self.is_debit == self.account.is_debit:
-            return self.amount
-        return -self.amount
+    def sync_move(self):
+        """Copy denormalized values from the move."""
+        self.book_id = self.move.book_id
+        self.date = self.move.date
+        self.move_type = self.move.type
+
+    def update_norm_amount(self):
+        """Set :py:attr:`norm_amount` based on move type and account's side.
+
+        Opening and closing moves are snapshots, their amount is taken as is.
+        """
+        if self.move_type in (Move.Type.OPENING, Move.Type.CLOSING):
+            self.norm_amount = self.amount
+        elif self.account.type == Account.Type.VIEW:
+            self.norm_amount = Decimal("0.00")
+        elif self.is_debit == Account.Type.get_is_debit(self.account.type):
+            self.norm_amount = self.amount
+        else:
+            self.norm_amount = -self.amount
 
     def clean(self):
         self.ensure_debit()
@@ -599,9 +832,131 @@ class Line(models.Model):
             self.is_debit = not (self.is_debit if self.is_debit is not None else self.account.is_debit)
             self.amount = -self.amount
 
+    @property
+    def snapshot_key(self) -> SnapshotKey:
+        """Key of the balance snapshot this line contributes to."""
+        return (self.book_id, self.account_id, self.date.replace(day=1), self.move_type)
+
     def save(self, *args, **kwargs):
         self.ensure_debit()
+        self.sync_move()
+        self.update_norm_amount()
+        keys = {self.snapshot_key}
+        if self.pk:
+            keys |= Line.objects.filter(pk=self.pk).snapshot_keys()
         super().save(*args, **kwargs)
+        AccountBalanceSnapshot.objects.refresh(keys)
+
+    def delete(self, *args, **kwargs):
+        key = self.snapshot_key
+        result = super().delete(*args, **kwargs)
+        AccountBalanceSnapshot.objects.refresh([key])
+        return result
 
     def __str__(self):
         return f"{self.move} - {self.account.code}={self.amount}"
+
+
+class AccountBalanceSnapshotQuerySet(models.QuerySet):
+    def book(self, book):
+        return self.filter(book=book)
+
+    def refresh(self, keys: Iterable[SnapshotKey]):
+        """Recompute snapshots for the provided keys from the book lines.
+
+        Snapshots without lines anymore are kept with a zero amount, so
+        their update date still tells when the bucket last changed.
+
+        The :py:data:`balances_changed` signal is then sent for each book.
+        """
+        keys = set(keys)
+        if not keys:
+            return
+
+        by_book = {}
+        for book_id, account_id, period, move_type in keys:
+            by_book.setdefault(book_id, []).append((account_id, period))
+
+        totals = dict.fromkeys(keys, Decimal("0.00"))
+        for book_id, items in by_book.items():
+            accounts = {account_id for account_id, _ in items}
+            periods = [period for _, period in items]
+            lines = Line.objects.filter(
+                book_id=book_id,
+                account_id__in=accounts,
+                date__gte=min(periods),
+                date__lt=max(periods) + relativedelta(months=1),
+            )
+            query = (
+                lines.annotate(period=TruncMonth("date"))
+                .values_list("account_id", "period", "move_type")
+                .annotate(total=Sum("norm_amount"))
+                .order_by()
+            )
+            for account_id, period, move_type, total in query:
+                key = (book_id, account_id, period, move_type)
+                if key in totals:
+                    totals[key] = total or Decimal("0.00")
+
+        objs = [
+            AccountBalanceSnapshot(
+                book_id=book_id, account_id=account_id, period=period, move_type=move_type, amount=total
+            )
+            for (book_id, account_id, period, move_type), total in totals.items()
+        ]
+        self.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=["book", "account", "period", "move_type"],
+            update_fields=["amount", "updated_at"],
+        )
+        for book_id, items in by_book.items():
+            balances_changed.send(
+                AccountBalanceSnapshot,
+                book_id=book_id,
+                account_ids={account_id for account_id, _ in items},
+                start_date=min(period for _, period in items),
+            )
+
+    def rebuild(self, book: Book):
+        """Drop and recompute all the snapshots of a book.
+
+        This is required when lines are changed without going through
+        :py:class:`Line` or :py:class:`LineQuerySet` methods (as ``update()``), or
+        when an account type changes.
+        """
+        with transaction.atomic():
+            self.filter(book=book).delete()
+            self.refresh(Line.objects.filter(book=book).snapshot_keys())
+
+
+class AccountBalanceSnapshot(models.Model):
+    """
+    Normalized balance of an account for a book, month and move type.
+
+    Snapshots are maintained when lines are saved, bulk created or deleted
+    (including through their move). Ledger views sum them for whole months
+    instead of scanning all the lines since the last opening.
+    """
+
+    book = models.ForeignKey(Book, models.CASCADE, related_name="snapshots", verbose_name=_("Book"))
+    account = models.ForeignKey(Account, models.CASCADE, related_name="+", verbose_name=_("Account"))
+    period = models.DateField(_("Period"), help_text=_("First day of the month."))
+    move_type = models.PositiveSmallIntegerField(_("Move Type"), choices=Move.Type.choices)
+    amount = models.DecimalField(_("Amount"), max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    updated_at = models.DateTimeField(_("Updated at"), auto_now=True)
+
+    objects = AccountBalanceSnapshotQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _("Account Balance Snapshot")
+        verbose_name_plural = _("Account Balance Snapshots")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["book", "account", "period", "move_type"], name="unique_book_account_period_type"
+            )
+        ]
+        indexes = [models.Index(fields=["book", "period"])]
+
+    def __str__(self):
+        return f"{self.account_id} [{self.period:%Y-%m}] = {self.amount}"
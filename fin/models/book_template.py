@@ -72,8 +72,32 @@ class BookTemplate(Titled, Named, Described):
         return self.name
 
 
+class AccountQuerySet(models.QuerySet):
+    def update_hierarchy(self, template: BookTemplate | int):
+        """Update accounts hierarchy of a book template.
+
+        Accounts :py:attr:`~Account.position` is set to the rank of their code
+        in lexicographic order, and :py:attr:`~Account.parent` to the account
+        with the longest code prefixing theirs.
+        """
+        # sorted in python, as database collation may differ
+        accounts = sorted(self.filter(template=template, code__isnull=False), key=lambda account: account.code)
+        by_code = {}
+        for position, account in enumerate(accounts):
+            prefixes = (account.code[:i] for i in range(len(account.code) - 1, 0, -1))
+            account.position = position
+            account.parent = next((by_code[prefix] for prefix in prefixes if prefix in by_code), None)
+            by_code[account.code] = account
+        self.bulk_update(accounts, ["position", "parent"])
+
+
 class Account(LongNamed):
-    """A ledger account."""
+    """A ledger account.
+
+    Accounts of a template are organized as a hierarchy of codes
+    (:py:attr:`parent` and :py:attr:`position`), updated by
+    :py:meth:`AccountQuerySet.update_hierarchy`.
+    """
 
     class Type(models.IntegerChoices):
         """Account type."""
@@ -95,11 +119,24 @@ class Account(LongNamed):
 
         @classmethod
         def debit_types(cls):
-            return [v for v in cls.values if v & 0x10]
+            return [v for v in cls.values if cls.get_is_debit(v)]
 
         @classmethod
         def credit_types(cls):
-            return [v for v in cls.values if v & 0x20]
+            return [v for v in cls.values if cls.get_is_debit(v) is False]
+
+        @classmethod
+        def get_is_debit(cls, value: int) -> bool | None:
+            """Return account side for the provided type.
+
+            This is the definition :py:attr:`Account.is_debit` is generated from
+            (through :py:meth:`debit_types` and :py:meth:`credit_types`).
+            """
+            if value & 0x10:
+                return True
+            if value & 0x20:
+                return False
+            return None
 
         @classmethod
         def from_str(cls, value: str):
@@ -112,6 +149,21 @@ class Account(LongNamed):
     code = models.CharField(_("Code"), max_length=10, null=True, blank=True)
     short = models.CharField(_("Abbreviation"), max_length=10, blank=True, null=True)
     type = models.PositiveIntegerField(_("Type"), choices=Type.choices, default=Type.OTHER)
+    parent = models.ForeignKey(
+        "self",
+        models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="children",
+        verbose_name=_("Parent"),
+        help_text=_("Account with the longest code prefixing this one."),
+    )
+    position = models.PositiveIntegerField(
+        _("Position"),
+        null=True,
+        blank=True,
+        help_text=_("Rank of the code among the template's accounts, in lexicographic order."),
+    )
     is_debit = models.GeneratedField(
         expression=Case(
             When(type__in=Type.debit_types(), then=Value(True)),
@@ -157,15 +209,62 @@ class Account(LongNamed):
         verbose_name=_("Losses on asset Account"),
     )
 
+    objects = AccountQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("Account")
         verbose_name_plural = _("Accounts")
+        indexes = [models.Index(fields=["template", "position"])]
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         if isinstance(self.type, str):
             self.type = self.Type.from_str(self.type)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def get_changed(self, *fields: str) -> set[str]:
+        """Return which of the provided fields changed since the account was loaded (all of them when created)."""
+        loaded = getattr(self, "_loaded_values", None)
+        if self._state.adding or loaded is None:
+            return set(fields)
+        return {field for field in fields if field in loaded and loaded[field] != getattr(self, field)}
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        changed = self.get_changed("code", "type")
+        super().save(*args, **kwargs)
+        self._loaded_values = {field.attname: getattr(self, field.attname) for field in self._meta.concrete_fields}
+        if "code" in changed:
+            Account.objects.update_hierarchy(self.template_id)
+            self.refresh_from_db(fields=["position", "parent"])
+        if "type" in changed and not adding:
+            self.refresh_from_db(fields=["is_debit"])
+            self.update_lines()
+
+    def update_lines(self):
+        """Recompute normalized amounts of the account's lines and their balance snapshots.
+
+        This must be called when the account type changes outside of :py:meth:`save`.
+        """
+        from .book import AccountBalanceSnapshot, Line
+
+        lines = Line.objects.filter(account=self)
+        keys = lines.snapshot_keys()
+        if keys:
+            lines.update_norm_amount()
+            AccountBalanceSnapshot.objects.refresh(keys)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        if self.code is not None:
+            Account.objects.update_hierarchy(self.template_id)
+        return result
+
     @property
     def long_code(self):
         """Code padded to 6 numbers."""
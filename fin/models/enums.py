@@ -4,6 +4,8 @@ from datetime import date
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
+from ..utils.periods import align_month, month_index, month_start
+
 
 __all__ = (
     "ProrataPolicy",
@@ -38,14 +40,5 @@ class Period(models.IntegerChoices):
         :returns: Start date of the corresponding Exercise period.
         """
 
-        # Convert to absolute month index
-        absolute_month = target_date.year * 12 + (target_date.month - 1)
-        anchor = target_date.year * 12 + (anchor_month - 1)
-
-        diff = absolute_month - anchor
-        bucket = diff // period_months
-        start_index = anchor + bucket * period_months
-
-        start_year = start_index // 12
-        start_month = (start_index % 12) + 1
-        return date(start_year, start_month, 1)
+        anchor = target_date.year * 12 + anchor_month - 1
+        return month_start(align_month(month_index(target_date), period_months, anchor))
@@ -3,11 +3,13 @@ from decimal import Decimal
 from functools import cached_property
 import re
 
+from django.core.paginator import Page, Paginator
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
 
 from ..schemas.xbrl import XBRLFact, XBRLSchema
+from ..utils.ranges import IdRanges
 from .book import Book, Line
 from .utils import Described, Titled, Named, LongNamed, PydanticJSONField
 
@@ -114,6 +116,14 @@ class Report(models.Model):
     book = models.ForeignKey(Book, models.PROTECT, verbose_name=_("Ledger Book"))
     start_date = models.DateField(_("Start Date"))
     end_date = models.DateField(_("End Date"))
+    built_at = models.DateTimeField(_("Built at"), null=True, blank=True)
+    duration = models.FloatField(_("Build duration"), null=True, blank=True, help_text=_("In seconds."))
+    stale = models.BooleanField(
+        _("Stale"), default=False, help_text=_("Book lines changed since the report was built.")
+    )
+    error = models.TextField(
+        _("Build error"), blank=True, null=True, help_text=_("Error of the failed build: the report has no section.")
+    )
 
     def __str__(self):
         return f"Report {self.book.name} - {self.year}"
@@ -122,12 +132,34 @@ class Report(models.Model):
 # Note: we do a copy of the section template content to keep data consistent
 # if the section template is deleted.
 class ReportSection(BaseReportSection):
-    """A Report section result."""
+    """A Report section result.
+
+    Lines contributing to the section are stored as ranges of ids in
+    :py:attr:`line_ranges` (see :py:attr:`.ReportBuilder.with_lines`), and
+    listed using :py:meth:`get_lines_page`.
+    """
 
     report = models.ForeignKey(Report, models.CASCADE, related_name="sections", verbose_name=_("Report"))
     template = models.ForeignKey(ReportSectionTemplate, models.SET_NULL, null=True, verbose_name=_("Section"))
     value = models.DecimalField(_("Value"), max_digits=12, decimal_places=2)
     lines = models.ManyToManyField(Line, verbose_name=_("Book Lines"))
+    line_ranges = models.JSONField(
+        _("Lines"), default=list, blank=True, help_text=_("Ids of the contributing lines, as inclusive ranges.")
+    )
 
     def __str__(self):
         return f"Report Section {self.code}={self.value}"
+
+    @property
+    def line_ids(self) -> IdRanges:
+        """Ids of the contributing lines."""
+        return IdRanges(self.line_ranges)
+
+    def get_lines_page(self, number: int = 1, per_page: int = 100) -> Page:
+        """Return a page of the contributing lines, ordered by id.
+
+        :raises django.core.paginator.InvalidPage: invalid page number.
+        """
+        page = Paginator(self.line_ids, per_page).page(number)
+        page.object_list = list(Line.objects.filter(id__in=page.object_list).order_by("id"))
+        return page
@@ -45,7 +45,7 @@ class XBRLContext(BaseModel):
 
     id: str
     period: XBRLPeriod
-    entity: str = None
+    entity: Optional[str] = None
     dimensions: dict[str, str] = Field(default_factory=dict)
 
 
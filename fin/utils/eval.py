@@ -1,8 +1,14 @@
+from __future__ import annotations
+import ast
 from decimal import Decimal
+from functools import lru_cache
+import operator
+from typing import Any, Callable, Mapping
+
 from asteval import Interpreter
 
 
-__all__ = ("get_interpreter", "Interpreter")
+__all__ = ("get_interpreter", "Interpreter", "CompileError", "compile_expression", "CompiledExpression")
 
 
 def get_interpreter(context) -> Interpreter:
@@ -11,3 +17,70 @@ def get_interpreter(context) -> Interpreter:
     ae.symtable["Decimal"] = Decimal
     ae.symtable.update(context)
     return ae
+
+
+CompiledExpression = Callable[[Mapping[str, Any]], Any]
+""" Compiled expression, called with the namespace used to resolve names. """
+
+
+class CompileError(ValueError):
+    """The expression is not supported by :py:func:`compile_expression`."""
+
+    pass
+
+
+_binary_ops = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+}
+_unary_ops = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+
+@lru_cache(maxsize=1024)
+def compile_expression(expr: str, functions: frozenset[str] = frozenset()) -> CompiledExpression:
+    """Compile an arithmetic expression into a tree of closures.
+
+    Supported grammar is restricted to numbers, names, calls of one of
+    ``functions`` with positional arguments, unary ``+ -`` and binary
+    ``+ - * / // %`` operators. Names are resolved from the namespace provided
+    when calling the result, which must provide ``functions``.
+
+    Expressions are cached by value.
+
+    :param expr: the python expression to compile
+    :param functions: names of the functions that can be called.
+    :return: a function taking the namespace as argument.
+    :raises CompileError: the expression is not supported (use asteval instead).
+    """
+    try:
+        tree = ast.parse(expr.strip(), mode="eval")
+    except SyntaxError as err:
+        raise CompileError(f"Invalid expression: {expr}") from err
+    return _compile_node(tree.body, functions)
+
+
+def _compile_node(node: ast.AST, functions: frozenset[str]) -> CompiledExpression:
+    match node:
+        case ast.Constant(value=bool()):
+            raise CompileError("Boolean values are not supported")
+        case ast.Constant(value=int() | float() as value):
+            return lambda ns: value
+        case ast.Name(id=name):
+            return lambda ns: ns[name]
+        case ast.UnaryOp(op=op, operand=operand) if type(op) in _unary_ops:
+            func, operand = _unary_ops[type(op)], _compile_node(operand, functions)
+            return lambda ns: func(operand(ns))
+        case ast.BinOp(left=left, op=op, right=right) if type(op) in _binary_ops:
+            func, left, right = _binary_ops[type(op)], _compile_node(left, functions), _compile_node(right, functions)
+            return lambda ns: func(left(ns), right(ns))
+        case ast.Call(func=ast.Name(id=name), args=args, keywords=[]) if name in functions:
+            args = tuple(_compile_node(arg, functions) for arg in args)
+            return lambda ns: ns[name](*(arg(ns) for arg in args))
+    raise CompileError(f"Unsupported expression: {ast.dump(node)}")
@@ -0,0 +1,98 @@
+from __future__ import annotations
+from calendar import monthrange
+from datetime import date
+from typing import Iterator
+
+
+__all__ = (
+    "month_index",
+    "month_start",
+    "month_end",
+    "align_month",
+    "period_end",
+    "nth_period",
+    "period_index",
+    "count_periods",
+    "iter_periods",
+)
+
+
+aligned_frequencies = (3, 12)
+""" Frequencies whose periods are aligned on calendar quarters and years. """
+
+
+def month_index(value: date) -> int:
+    """Return absolute month index of a date (``year * 12 + month - 1``)."""
+    return value.year * 12 + value.month - 1
+
+
+def month_start(index: int) -> date:
+    """Return first day of a month by absolute index."""
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_end(index: int) -> date:
+    """Return last day of a month by absolute index."""
+    year, month = index // 12, index % 12 + 1
+    return date(year, month, monthrange(year, month)[1])
+
+
+def align_month(index: int, months: int, anchor: int = 0) -> int:
+    """Return index of the first month of the ``months`` long bucket containing month ``index``.
+
+    :param index: absolute month index
+    :param months: bucket size in months
+    :param anchor: month index (or month of the year, 0-based) at which buckets start.
+    """
+    return index - (index - anchor) % months
+
+
+def _first_end(frequency: int, start_date: date) -> int:
+    """Return month index of the end of the first period starting at ``start_date``."""
+    index = month_index(start_date)
+    if frequency in aligned_frequencies:
+        index = align_month(index, frequency)
+    return index + frequency - 1
+
+
+def period_end(frequency: int, date: date) -> date:
+    """Return the end of a period based on provided frequency and date.
+
+    Annual and quarterly periods end with the calendar year and quarter,
+    other ones ``frequency`` months after the start of ``date``'s month.
+    """
+    return month_end(_first_end(frequency, date))
+
+
+def nth_period(frequency: int, start_date: date, n: int) -> tuple[date, date]:
+    """Return start and end of the ``n``-th period (0-based) starting at ``start_date``.
+
+    Periods after the first one start on the first day of a month.
+    """
+    end = _first_end(frequency, start_date) + n * frequency
+    start = start_date if n == 0 else month_start(end - frequency + 1)
+    return start, month_end(end)
+
+
+def period_index(frequency: int, start_date: date, date: date) -> int:
+    """Return index of the period containing ``date``.
+
+    :raises ValueError: date is before ``start_date``.
+    """
+    if date < start_date:
+        raise ValueError(f"Date {date} is before periods start {start_date}")
+    return max(-(-(month_index(date) - _first_end(frequency, start_date)) // frequency), 0)
+
+
+def count_periods(frequency: int, start_date: date, end_date: date) -> int:
+    """Count periods starting at ``start_date`` and ending before or at ``end_date``."""
+    last = month_index(end_date)
+    if end_date != month_end(last):
+        last -= 1
+    return max((last - _first_end(frequency, start_date)) // frequency + 1, 0)
+
+
+def iter_periods(frequency: int, start_date: date, end_date: date) -> Iterator[tuple[date, date]]:
+    """Iterate over start-end periods, until ``end_date``."""
+    for n in range(count_periods(frequency, start_date, end_date)):
+        yield nth_period(frequency, start_date, n)
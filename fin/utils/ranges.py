@@ -0,0 +1,75 @@
+from __future__ import annotations
+from bisect import bisect_right
+from collections.abc import Sequence
+from itertools import accumulate
+from typing import Iterable
+
+
+__all__ = ("IdRanges", "encode_ranges", "decode_ranges")
+
+
+Range = list[int]
+""" Inclusive ``[start, end]`` range of ids (a list, as stored in JSON). """
+
+
+def encode_ranges(ids: Iterable[int]) -> list[Range]:
+    """Encode ids as a sorted list of inclusive ranges, merging consecutive ids.
+
+    Duplicates are removed.
+    """
+    ranges = []
+    for id in sorted(set(ids)):
+        if ranges and ranges[-1][1] == id - 1:
+            ranges[-1][1] = id
+        else:
+            ranges.append([id, id])
+    return ranges
+
+
+def decode_ranges(ranges: Iterable[Range]) -> list[int]:
+    """Return ids of the ranges."""
+    return [id for start, end in ranges for id in range(start, end + 1)]
+
+
+class IdRanges(Sequence):
+    """
+    Sequence of ids stored as ranges (see :py:func:`encode_ranges`).
+
+    Length and item access don't decode the ranges: a slice of ids is found
+    by bisecting over the ranges sizes, so it can be used with Django's
+    ``Paginator``.
+    """
+
+    def __init__(self, ranges: list[Range]):
+        self.ranges = ranges
+        self.offsets = [0, *accumulate(end - start + 1 for start, end in ranges)]
+        """ Index of the first id of each range (and total count as last item). """
+
+    def __len__(self):
+        return self.offsets[-1]
+
+    def __getitem__(self, index: int | slice) -> int | list[int]:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return self.get_slice(start, stop)
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Id index out of range")
+        pos = bisect_right(self.offsets, index) - 1
+        return self.ranges[pos][0] + index - self.offsets[pos]
+
+    def get_slice(self, start: int, stop: int) -> list[int]:
+        """Return ids from index ``start`` to ``stop`` (excluded)."""
+        ids = []
+        pos = bisect_right(self.offsets, start) - 1
+        while start < stop and pos < len(self.ranges):
+            first, last = self.ranges[pos]
+            begin = first + start - self.offsets[pos]
+            end = min(last, first + stop - 1 - self.offsets[pos])
+            ids.extend(range(begin, end + 1))
+            start, pos = self.offsets[pos + 1], pos + 1
+        return ids
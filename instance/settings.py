@@ -133,3 +133,8 @@ REST_FRAMEWORK = {
 
 
 BOOKS_ROOT = MEDIA_ROOT / "books"
+
+# Taxonomy packages (zip files) used to validate XBRL exports offline
+XBRL_TAXONOMY_PACKAGES = []
+# Arelle's web cache directory, read instead of the network
+XBRL_CACHE_ROOT = BASE_DIR / "cache" / "xbrl"
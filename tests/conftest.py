@@ -6,6 +6,7 @@ import pytest
 
 from fin import models
 from fin.models import Account, Journal, Move, Line
+from fin.schemas.xbrl import XBRLContext, XBRLFact, XBRLPeriod, XBRLSchema, XBRLUnit
 
 
 TEST_MEDIA_ROOT = Path(__file__).parent / "media"
@@ -215,3 +216,53 @@ def amortization_entry_moves(book, journal, amortization_entries):
 
     models.AmortizationEntry.objects.bulk_update(amortization_entries, ["move"])
     return items
+
+
+# ---- Reports
+@pytest.fixture
+def report_template(db):
+    return models.ReportTemplate.objects.create(name="report", title="Report")
+
+
+@pytest.fixture
+def report_sections(report_template):
+    """Sections: ``A`` (``1``, ``2``), ``B`` as ``A - @3``."""
+    Section = models.ReportSectionTemplate
+    root = Section.objects.create(template=report_template, order=0, name="A", code="A")
+    return [root] + Section.objects.bulk_create(
+        [
+            Section(template=report_template, parent=root, order=0, name="Revenues", code="1", formula="`~1`"),
+            Section(template=report_template, parent=root, order=1, name="Expenses", code="2", weight=-1),
+            Section(template=report_template, order=1, name="B", code="B", formula="`A` - `@3`"),
+        ]
+    )
+
+
+@pytest.fixture
+def xbrl_schema():
+    return XBRLSchema(
+        schema_ref={"href": "http://example.com/schema.xsd"},
+        namespaces={"ex": "http://example.com/ex"},
+        entity_scheme="http://example.com/entity",
+        units=[XBRLUnit(id="EUR", measure="iso4217:EUR"), XBRLUnit(id="U-Pure", measure="pure")],
+        contexts=[
+            XBRLContext(id="CurrentDuration", period=XBRLPeriod(type="duration")),
+            XBRLContext(id="CurrentInstant", period=XBRLPeriod(type="instant")),
+            XBRLContext(id="PrecedingInstant", period=XBRLPeriod(type="instant", offset=-1)),
+        ],
+    )
+
+
+@pytest.fixture
+def xbrl_sections(report_template, report_sections, xbrl_schema):
+    report_template.xbrl = xbrl_schema
+    report_template.save()
+
+    a, one, two, b = report_sections
+    a.xbrl = XBRLFact(concept="ex:A", context_id="CurrentDuration")
+    one.xbrl = XBRLFact(concept="ex:One", context_id="CurrentDuration", dimensions={"ex:Axis": "ex:One"})
+    two.xbrl = XBRLFact(concept="ex:Two", context_id="CurrentInstant", unit="U-Pure", decimals=2)
+    b.xbrl = XBRLFact(concept="ex:B", context_id="PrecedingInstant")
+    for section in report_sections:
+        section.save()
+    return report_sections
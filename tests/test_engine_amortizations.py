@@ -1,10 +1,11 @@
 from datetime import date
 from decimal import Decimal
 
+from dateutil.relativedelta import relativedelta
 import pytest
 
-from fin.models import ProrataPolicy, AmortizationEntry, AmortizationSchedule
-from fin.engine.amortizations import AmortizationEntryBuilder
+from fin.models import ProrataPolicy, AmortizationEntry, AmortizationSchedule, FixedAsset
+from fin.engine.amortizations import AmortizationBatchBuilder, AmortizationEntryBuilder
 
 
 @pytest.fixture
@@ -284,3 +285,93 @@ class TestAmortizationEntryBuilderConsistency:
         total = sum(e.amount for e in entries)
 
         assert total == Decimal("100")
+
+
+class TestAmortizationBatchBuilder:
+    @staticmethod
+    def as_tuples(entries):
+        return [(e.schedule.pk, e.date, e.amount) for e in entries]
+
+    def test_build(self, builder, amortization_schedule, degressive_schedule):
+        book, period_end = amortization_schedule.asset.book, degressive_schedule.end_date
+        expected = builder.build(amortization_schedule, period_end) + builder.build(degressive_schedule, period_end)
+
+        entries = AmortizationBatchBuilder().build(book, period_end)
+        assert self.as_tuples(entries) == self.as_tuples(expected)
+
+    def test_build_degressive(self, degressive_schedule):
+        entries = AmortizationBatchBuilder().build(degressive_schedule.asset.book, degressive_schedule.end_date)
+        assert [e.amount for e in entries] == [
+            Decimal("5250.00"),
+            Decimal("5162.50"),
+            Decimal("3355.63"),
+            Decimal("3115.94"),
+            Decimal("3115.93"),
+        ]
+
+    def test_build_resume(self, builder, amortization_schedule):
+        amortization_schedule.prorata = ProrataPolicy.DAILY
+        amortization_schedule.frequency = AmortizationSchedule.Frequency.MONTHLY
+        amortization_schedule.save()
+        period_end = amortization_schedule.end_date
+        full = builder.build(amortization_schedule, period_end, clear=True)
+        AmortizationEntry.objects.bulk_create(full[:10])
+
+        entries = AmortizationBatchBuilder().build(amortization_schedule.asset.book, period_end)
+        assert self.as_tuples(entries) == self.as_tuples(full[10:])
+
+    def test_build_clear(self, amortization_schedule, amortization_entries):
+        batch = AmortizationBatchBuilder()
+        entries = batch.build(amortization_schedule.asset.book, amortization_schedule.end_date, clear=True)
+        assert not amortization_schedule.entries.exists()
+        assert sum(e.amount for e in entries) == amortization_schedule.asset.initial_value
+
+    def test_build_clear_linked_moves(self, amortization_schedule, amortization_entries, move):
+        AmortizationEntry.objects.filter(pk=amortization_entries[0].pk).update(move=move)
+        with pytest.raises(RuntimeError):
+            AmortizationBatchBuilder().build(amortization_schedule.asset.book, amortization_schedule.end_date, True)
+
+    def test_build_same_as_entry_builder(self, builder, fixed_asset, amortization_schedule):
+        # assets of odd values, with every method, frequency, prorata policy and a range of rates
+        Schedule, schedules = AmortizationSchedule, [amortization_schedule]
+        values = [("1000.01", "0"), ("12345.67", "100.5"), ("999.99", "0"), ("250000", "1234.56"), ("7.77", "0")]
+        for i, (initial, residual) in enumerate(values):
+            for j, frequency in enumerate(Schedule.Frequency.values):
+                for k, prorata in enumerate(ProrataPolicy.values):
+                    start_date = fixed_asset.date.replace(month=1 + (i + j + k) % 12, day=1 + (i * 7 + k) % 28)
+                    for method, rate in [(Schedule.Method.LINEAR, None), (Schedule.Method.DEGRESSIVE, "0.3333")]:
+                        asset = FixedAsset.objects.create(
+                            book=fixed_asset.book,
+                            move=fixed_asset.move,
+                            account=fixed_asset.account,
+                            type=fixed_asset.type,
+                            date=start_date,
+                            initial_value=Decimal(initial),
+                            residual_value=Decimal(residual),
+                        )
+                        schedules.append(
+                            Schedule.objects.create(
+                                asset=asset,
+                                start_date=start_date,
+                                end_date=start_date + relativedelta(years=3 + i),
+                                method=method,
+                                frequency=frequency,
+                                prorata=prorata,
+                                rate=rate and Decimal(rate) + Decimal(i) / 10,
+                            )
+                        )
+
+        period_end = max(schedule.end_date for schedule in schedules)
+        expected = [entry for schedule in schedules for entry in builder.build(schedule, period_end)]
+        entries = AmortizationBatchBuilder().build(fixed_asset.book, period_end)
+        assert len({entry.schedule.pk for entry in expected}) == len(schedules)
+        assert self.as_tuples(entries) == self.as_tuples(expected)
+
+    def test_build_queries(self, django_assert_max_num_queries, amortization_schedule, degressive_schedule):
+        # clear check, delete (in its own transaction) and schedules
+        with django_assert_max_num_queries(5):
+            AmortizationBatchBuilder().build(amortization_schedule.asset.book, degressive_schedule.end_date)
+
+    def test_build_before_start(self, amortization_schedule):
+        period_end = amortization_schedule.start_date.replace(year=amortization_schedule.start_date.year - 1)
+        assert AmortizationBatchBuilder().build(amortization_schedule.asset.book, period_end) == []
@@ -0,0 +1,55 @@
+from datetime import date
+
+import pytest
+
+from fin.engine.report.batch import ReportBatch, build_book_reports
+from fin.engine.report.builder import ReportBuilder
+from fin.models import Report, ReportSection
+
+
+@pytest.fixture
+def period():
+    today = date.today()
+    return (date(today.year, 1, 1), date(today.year, 12, 31))
+
+
+class TestReportBatch:
+    def test_build_book_reports(self, report_template, report_sections, book, all_lines, period):
+        (result,) = build_book_reports(report_template.pk, book.pk, [period])
+        assert result.success, result.error
+
+        report = Report.objects.get(pk=result.report_id)
+        assert report.built_at and report.duration is not None
+
+        sections = {s.code: s for s in ReportSection.objects.filter(report=report).select_related("parent")}
+        assert set(sections) == {"A", "1", "2", "B"}
+        assert sections["1"].parent == sections["A"]
+        assert sections["A"].value == sections["1"].value - sections["2"].value
+
+    def test_build_book_reports_previous(self, report_template, report_sections, book, all_lines, period):
+        last_year = (period[0].replace(year=period[0].year - 1), period[1].replace(year=period[1].year - 1))
+        first, second = build_book_reports(report_template.pk, book.pk, [period, last_year])
+        assert first.period == last_year
+        assert Report.objects.get(pk=second.report_id).previous_id == first.report_id
+
+    def test_build_book_reports_saves_error(self, report_template, report_sections, book, period, monkeypatch):
+        def build(*args, **kwargs):
+            raise ValueError("failed")
+
+        monkeypatch.setattr(ReportBuilder, "build", build)
+        (result,) = build_book_reports(report_template.pk, book.pk, [period])
+        report = Report.objects.get(pk=result.report_id)
+        assert (report.error, report.duration) == ("ValueError: failed", result.duration)
+        assert not report.built_at and not report.sections.exists()
+
+        # replaced by the next failure, then by a successful build
+        (result,) = build_book_reports(report_template.pk, book.pk, [period])
+        assert list(Report.objects.filter(error__isnull=False).values_list("pk", flat=True)) == [result.report_id]
+        monkeypatch.undo()
+        (result,) = build_book_reports(report_template.pk, book.pk, [period])
+        assert list(Report.objects.values_list("pk", "error")) == [(result.report_id, None)]
+
+    def test_run(self, report_template, report_sections, book, period):
+        results = ReportBatch(report_template, [period], workers=0).run([book.pk, -1])
+        assert [(r.book_id, r.success) for r in results] == [(book.pk, True), (-1, False)]
+        assert results[1].as_dict()["error"].startswith("DoesNotExist")
@@ -0,0 +1,153 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+from fin.engine.report.builder import ReportBuilder
+from fin.engine.report.selector import Selector
+from fin.models import Line, Report, ReportSection, ReportSectionTemplate
+
+
+@pytest.fixture
+def period():
+    today = date.today()
+    return (date(today.year, 1, 1), date(today.year, 12, 31))
+
+
+@pytest.fixture
+def builder(report_template, report_sections, book):
+    return ReportBuilder(report_template, book)
+
+
+@pytest.fixture
+def report(builder, book, all_lines, period):
+    lines = Line.objects.filter(book=book, date__gte=period[0], date__lte=period[1])
+    report, _ = builder.build(lines, period, save=True)
+    return report
+
+
+def get_values(report):
+    return dict(ReportSection.objects.filter(report=report).values_list("code", "value"))
+
+
+class TestReportBuilder:
+    def test_build_save(self, report):
+        assert Report.objects.filter(pk=report.pk).exists()
+        assert report.built_at and report.duration is not None
+        assert set(get_values(report)) == {"A", "1", "2", "B"}
+
+    def test_build_workers(self, report_template, builder, book, all_lines, period):
+        lines = Line.objects.filter(book=book, date__gte=period[0], date__lte=period[1])
+        _, expected = builder.build(lines, period)
+        parallel = ReportBuilder(report_template, book, workers=2)
+        # lines are queried by the workers
+        parallel.use_trie = False
+        _, sections = parallel.build(lines, period)
+        assert {s.code: s.value for s in sections.values()} == {s.code: s.value for s in expected.values()}
+
+    def test_build_periods(self, builder, book, all_lines, period):
+        periods = [(date(period[0].year - 1, 1, 1), date(period[0].year - 1, 12, 31)), period]
+        results = builder.build_periods(reversed(periods), save=True)
+
+        assert [(r.start_date, r.end_date) for r, _ in results] == periods
+        assert results[1][0].previous == results[0][0]
+        for (report, sections), period in zip(results, periods):
+            lines = Line.objects.filter(book=book, date__gte=period[0], date__lte=period[1])
+            _, expected = builder.build(lines, period)
+            assert get_values(report) == {s.code: s.value for s in expected.values()}
+
+    def test_build_periods_overlapping(self, builder, period):
+        with pytest.raises(ValueError):
+            builder.build_periods([period, (period[1], period[1])])
+
+    def test_build_with_lines(self, builder, book, all_lines, period):
+        builder.with_lines = True
+        lines = Line.objects.filter(book=book, date__gte=period[0], date__lte=period[1])
+        report, _ = builder.build(lines, period, save=True)
+
+        sections = {s.code: s for s in ReportSection.objects.filter(report=report)}
+        expected = set(lines.filter(account__code__startswith="2").values_list("id", flat=True))
+        assert expected and set(sections["2"].line_ids) == expected
+        assert set(sections["A"].line_ids) >= expected
+
+        page = sections["2"].get_lines_page(1, per_page=1)
+        assert page.paginator.count == len(expected)
+        assert [line.id for line in page.object_list] == [min(expected)]
+
+    def test_series(self, builder, book, all_lines, period):
+        periods, values = builder.series(["B", "1"], period[0], period[1])
+        assert len(periods) == 12 and periods[0] == (period[0], period[0].replace(day=31))
+        for (start, end), b, one in zip(periods, values["B"], values["1"]):
+            lines = Line.objects.filter(book=book, date__gte=start, date__lte=end)
+            _, expected = builder.build(lines, (start, end))
+            expected = {s.code: s.value for s in expected.values()}
+            assert (b, one) == (expected["B"], expected["1"])
+
+    def test_formula_builtins(self, report_template, report_sections, book, all_lines, period):
+        ReportSectionTemplate.objects.filter(pk=report_sections[-1].pk).update(formula="abs(`2`) + max(`1`, `A`)")
+        builder = ReportBuilder(report_template, book)
+        assert builder.nodes[Selector.from_section("B")].formula.func is None
+
+        lines = Line.objects.filter(book=book, date__gte=period[0], date__lte=period[1])
+        _, sections = builder.build(lines, period)
+        values = {s.code: s.value for s in sections.values()}
+        assert values["B"] == abs(values["2"]) + max(values["1"], values["A"])
+
+        _, series = builder.series(["B"], period[0], period[1], step="year")
+        assert series["B"] == [values["B"]]
+
+    def test_series_queries(self, builder, all_lines, period, django_assert_max_num_queries):
+        with django_assert_max_num_queries(2):
+            builder.series(["B"], period[0], period[1])
+
+    def test_get_series_periods(self, builder):
+        assert builder.get_series_periods(date(2024, 2, 10), date(2024, 8, 15), "quarter") == [
+            (date(2024, 2, 10), date(2024, 3, 31)),
+            (date(2024, 4, 1), date(2024, 6, 30)),
+            (date(2024, 7, 1), date(2024, 8, 15)),
+        ]
+        with pytest.raises(ValueError):
+            builder.get_series_periods(date(2024, 1, 1), date(2024, 2, 1), "week")
+
+    def test_get_dirty_nodes_none(self, builder, report):
+        assert not builder.get_dirty_nodes(report)
+
+    def test_get_dirty_nodes(self, builder, report, accounts, move):
+        Line.objects.create(move=move, account=accounts[4], amount=Decimal("5"), is_debit=True)
+        dirty = {builder.nodes[key].code for key in builder.get_dirty_nodes(report)}
+        # "2" selects account 21, "A" and "B" depend on it
+        assert dirty == {"2", "A", "B"}
+
+    def test_mark_stale(self, report, accounts, move):
+        Line.objects.create(move=move, account=accounts[4], amount=Decimal("5"), is_debit=True)
+        report.refresh_from_db()
+        assert report.stale
+
+    def test_mark_stale_before_start(self, report, accounts, move):
+        move.date = report.end_date + timedelta(days=1)
+        move.save()
+        Report.objects.filter(pk=report.pk).update(stale=False)
+        Line.objects.create(move=move, account=accounts[4], amount=Decimal("5"), is_debit=True)
+        report.refresh_from_db()
+        assert not report.stale
+
+    def test_rebuild_clears_stale(self, builder, report):
+        Report.objects.filter(pk=report.pk).update(stale=True)
+        report.refresh_from_db()
+        assert not builder.is_fresh(report)
+        builder.rebuild(report)
+        report.refresh_from_db()
+        assert not report.stale
+
+    def test_rebuild(self, builder, report, accounts, move, period):
+        Line.objects.create(move=move, account=accounts[4], amount=Decimal("5"), is_debit=True)
+        builder.rebuild(report)
+
+        lines = Line.objects.filter(book=report.book, date__gte=period[0], date__lte=period[1])
+        _, expected = builder.build(lines, period)
+        assert get_values(report) == {s.code: s.value for s in expected.values()}
+
+    def test_rebuild_recreates_sections(self, builder, report):
+        ReportSection.objects.filter(report=report, code="B").delete()
+        builder.rebuild(report)
+        assert set(get_values(report)) == {"A", "1", "2", "B"}
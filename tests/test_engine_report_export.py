@@ -0,0 +1,71 @@
+from datetime import date
+import hashlib
+import json
+import zipfile
+
+import pytest
+
+from fin.engine.report.export import XBRLExport, export_book_xbrl, validate_xbrl
+from fin.models import Report
+
+
+@pytest.fixture
+def period():
+    today = date.today()
+    return (date(today.year, 1, 1), date(today.year, 12, 31))
+
+
+class TestXBRLExport:
+    def test_export_book_xbrl(self, xbrl_sections, book, all_lines, period, tmp_path):
+        template = xbrl_sections[0].template
+        result = export_book_xbrl(template.pk, book.pk, period, str(tmp_path), "0123456789")
+        assert result.success, result.error
+        assert not result.reused and result.valid
+
+        content = (tmp_path / result.filename).read_bytes()
+        assert result.checksum == hashlib.sha256(content).hexdigest()
+        assert result.size == len(content)
+        assert b"0123456789" in content
+
+        again = export_book_xbrl(template.pk, book.pk, period, str(tmp_path), "0123456789")
+        assert again.reused and again.report_id == result.report_id
+        assert again.checksum == result.checksum
+
+    def test_export_book_xbrl_stale(self, xbrl_sections, book, all_lines, period, tmp_path):
+        template = xbrl_sections[0].template
+        result = export_book_xbrl(template.pk, book.pk, period, str(tmp_path))
+        Report.objects.filter(pk=result.report_id).update(stale=True)
+
+        again = export_book_xbrl(template.pk, book.pk, period, str(tmp_path))
+        assert not again.reused and again.report_id == result.report_id
+        assert not Report.objects.get(pk=result.report_id).stale
+
+    def test_validate_xbrl(self, tmp_path):
+        path = tmp_path / "invalid.xbrl"
+        path.write_text("<xbrl>")
+        assert validate_xbrl(path)
+
+    def test_run_directory(self, xbrl_sections, book, period, tmp_path):
+        export = XBRLExport(xbrl_sections[0].template, period, workers=0)
+        results = export.run([book.pk, -1], tmp_path / "out")
+        assert [(r.book_id, r.success) for r in results] == [(book.pk, True), (-1, False)]
+
+        manifest = json.loads((tmp_path / "out" / "manifest.json").read_text())
+        assert [item["book_id"] for item in manifest["files"]] == [book.pk, -1]
+        assert (tmp_path / "out" / results[0].filename).exists()
+
+    def test_run_zip(self, xbrl_sections, book, period, tmp_path):
+        export = XBRLExport(xbrl_sections[0].template, period, workers=0)
+        (result,) = export.run([book.pk], tmp_path / "out.zip")
+        with zipfile.ZipFile(tmp_path / "out.zip") as archive:
+            assert set(archive.namelist()) == {result.filename, "manifest.json"}
+            assert hashlib.sha256(archive.read(result.filename)).hexdigest() == result.checksum
+
+    def test_run_no_schema(self, report_template, report_sections, book, period, tmp_path):
+        with pytest.raises(ValueError):
+            XBRLExport(report_template, period, workers=0).run([book.pk], tmp_path)
+
+    def test_run_missing_package(self, xbrl_sections, book, period, tmp_path):
+        export = XBRLExport(xbrl_sections[0].template, period, packages=[tmp_path / "missing.zip"], workers=0)
+        with pytest.raises(ValueError):
+            export.run([book.pk], tmp_path / "out")
@@ -0,0 +1,60 @@
+import pytest
+
+from fin.engine.report.graph import NodeMethod, ReportGraph
+from fin.engine.report.selector import LineQuery, SelectorParser
+from fin.models import ReportSectionTemplate
+
+
+@pytest.fixture
+def sel_parser():
+    return SelectorParser(single_filters=LineQuery.single_filters, operators=LineQuery.operators)
+
+
+@pytest.fixture
+def graph(report_template, report_sections, sel_parser):
+    ReportGraph.invalidate()
+    return ReportGraph.get(report_template, sel_parser)
+
+
+class TestReportGraph:
+    def test_build(self, graph):
+        methods = {node.code: node.method for node in graph.iter()}
+        assert methods == {
+            "A": NodeMethod.DEPENDENCIES,
+            "1": NodeMethod.FORMULA,
+            "2": NodeMethod.LINES,
+            "B": NodeMethod.FORMULA,
+        }
+
+    def test_iter_topological_order(self, graph):
+        codes = [node.code for node in graph.iter()]
+        assert codes.index("A") > max(codes.index("1"), codes.index("2"))
+        assert codes.index("B") > codes.index("A")
+
+    def test_build_no_children_query(self, report_template, report_sections, sel_parser, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            ReportGraph(sel_parser).build(report_template)
+
+    def test_get_cached(self, report_template, graph, sel_parser):
+        assert ReportGraph.get(report_template, sel_parser) is graph
+
+    def test_get_fingerprint_changed(self, report_template, report_sections, graph, sel_parser):
+        ReportSectionTemplate.objects.filter(pk=report_sections[-1].pk).update(formula="`A`")
+        assert ReportGraph.get(report_template, sel_parser) is not graph
+
+    def test_get_section_renamed(self, report_template, report_sections, graph, sel_parser):
+        ReportSectionTemplate.objects.filter(pk=report_sections[-1].pk).update(name="Renamed")
+        graph = ReportGraph.get(report_template, sel_parser)
+        assert graph.sections[report_sections[-1].pk].name == "Renamed"
+
+    def test_invalidate(self, report_template, graph, sel_parser):
+        ReportGraph.invalidate(report_template.pk)
+        assert ReportGraph.get(report_template, sel_parser) is not graph
+
+    def test_get_account_nodes(self, graph):
+        def codes(accounts):
+            return {graph.items[key].code for key in graph.get_account_nodes(accounts)}
+
+        assert codes(["21"]) == {"2", "A", "B"}
+        assert codes(["30"]) == {"B"}
+        assert codes(["6"]) == set()
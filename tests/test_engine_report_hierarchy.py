@@ -0,0 +1,68 @@
+from decimal import Decimal
+
+import pytest
+
+from fin.models import Account, Line
+from fin.engine.report.hierarchy import AccountHierarchy
+from fin.engine.report.selector import LineQuery, SelectorParser
+
+
+@pytest.fixture
+def sel_parser():
+    return SelectorParser(single_filters=LineQuery.single_filters, operators=LineQuery.operators)
+
+
+@pytest.fixture
+def hierarchy(book_template, accounts):
+    Account.objects.update_hierarchy(book_template)
+    return AccountHierarchy.from_template(book_template.pk)
+
+
+class TestAccountHierarchy:
+    def test_update_hierarchy(self, hierarchy, book_template):
+        items = Account.objects.filter(template=book_template).order_by("position")
+        assert [a.code for a in items] == ["10", "101", "102", "20", "21", "210", "30", "31", "310"]
+        parents = {a.code: a.parent and a.parent.code for a in items}
+        assert parents == {
+            "10": None,
+            "101": "10",
+            "102": "10",
+            "20": None,
+            "21": None,
+            "210": "21",
+            "30": None,
+            "31": None,
+            "310": "31",
+        }
+
+    def test_from_template_not_computed(self, book_template, accounts):
+        assert AccountHierarchy.from_template(book_template.pk) is None
+
+    def test_from_template_unsorted(self, hierarchy, book_template):
+        Account.objects.filter(template=book_template, code="101").update(code="35")
+        assert AccountHierarchy.from_template(book_template.pk) is None
+
+    def test_account_save_updates_hierarchy(self, hierarchy, book_template):
+        account = Account.objects.get(template=book_template, code="101")
+        account.code = "35"
+        account.save()
+        assert account.position == 8
+        codes = AccountHierarchy.from_template(book_template.pk).codes
+        assert codes == ["10", "102", "20", "21", "210", "30", "31", "310", "35"]
+
+    def test_account_delete_updates_hierarchy(self, hierarchy, book_template):
+        Account.objects.get(template=book_template, code="101").delete()
+        assert AccountHierarchy.from_template(book_template.pk).get_range("10") == (0, 1)
+
+    def test_get_ranges(self, hierarchy):
+        assert hierarchy.get_range("10") == (0, 2)
+        assert hierarchy.get_range("4") is None
+        # 20, 21 and 210 are adjacent, 30 is merged too
+        assert hierarchy.get_ranges(["20", "21", "30", "101"]) == [(1, 1), (3, 6)]
+
+    @pytest.mark.parametrize("expr", ["@1", "@10", "@20/21", "~1,10,3", "@4", "@21|counterpart:1", "@2|counterpart!:1"])
+    def test_line_query(self, sel_parser, hierarchy, all_lines, expr):
+        selector = sel_parser.parse(expr)
+        expected = LineQuery(Line.objects.all()).get_queryset(None, selector)["total"] or Decimal("0.00")
+        result = LineQuery(Line.objects.all(), hierarchy).get_queryset(None, selector)["total"] or Decimal("0.00")
+        assert result == expected
@@ -0,0 +1,65 @@
+from decimal import Decimal
+
+import pytest
+
+from fin.models import Line
+from fin.engine.report.selector import FilterToken, LineQuery, SelectorParser
+from fin.engine.report.moves import MoveIndex
+
+
+@pytest.fixture
+def sel_parser():
+    return SelectorParser(single_filters=LineQuery.single_filters, operators=LineQuery.operators)
+
+
+@pytest.fixture
+def lines_qs(all_lines):
+    return Line.objects.all()
+
+
+@pytest.fixture
+def index(lines_qs):
+    return MoveIndex.from_queryset(lines_qs, "norm_amount")
+
+
+class TestMoveIndex:
+    @pytest.mark.parametrize(
+        "expr",
+        [
+            "@2,3|counterpart:1",
+            "@2,3|counterpart!:1",
+            "@1|debit|counterpart:2",
+            "@1/2|credit|counterpart!:21",
+            "@2,3|counterpart!:1,10",
+            "@2,3|counterpart!:1,2",
+            "@10|counterpart:2,3",
+            "@2|counterpart=21",
+            "@2|counterpart!=21",
+            "@1|counterpart:9",
+        ],
+    )
+    def test_resolve(self, sel_parser, lines_qs, index, expr):
+        selector = sel_parser.parse(expr)
+        line_query = LineQuery(lines_qs)
+        expected = line_query.get_queryset(None, selector)["total"] or Decimal("0.00")
+        assert index.resolve(selector) == expected
+
+    def test_can_resolve(self, sel_parser):
+        assert MoveIndex.can_resolve(sel_parser.parse("@1|debit|counterpart:2"))
+        assert MoveIndex.can_resolve(sel_parser.parse("@1"))
+        assert not MoveIndex.can_resolve(sel_parser.parse("max:@1|counterpart:2"))
+        assert not MoveIndex.can_resolve(sel_parser.parse("@1|opening|counterpart:2"))
+
+    def test_resolve_raises(self, sel_parser, index):
+        with pytest.raises(ValueError):
+            index.resolve(sel_parser.parse("@1|fixed_asset"))
+
+    def test_get_moves_exclusion(self, index):
+        included = index.get_moves(FilterToken(tag="counterpart", op=":", value="1"))
+        excluded = index.get_moves(FilterToken(tag="counterpart", op="!:", value="1"))
+        assert not included & excluded
+        assert included | excluded == index.moves
+
+    def test_get_codes_exclusion_all_prefixes(self, index):
+        assert sorted(index.get_codes("!:", "1,10")) == sorted(c for c in index.accounts if c.startswith("10"))
+        assert index.get_codes("!:", "1,2") == []
@@ -0,0 +1,44 @@
+from datetime import date
+
+import pytest
+
+from fin.engine.report.builder import ReportBuilder
+from fin.engine.report.profiler import ReportProfiler
+from fin.models import Line
+
+
+@pytest.fixture
+def period():
+    today = date.today()
+    return (date(today.year, 1, 1), date(today.year, 12, 31))
+
+
+@pytest.fixture
+def profiler(report_template, report_sections, book, all_lines, period):
+    builder = ReportBuilder(report_template, book)
+    builder.use_trie = False
+    builder.profiler = ReportProfiler()
+    lines = Line.objects.filter(book=book, date__gte=period[0], date__lte=period[1])
+    builder.build(lines, period)
+    return builder.profiler
+
+
+class TestReportProfiler:
+    def test_nodes(self, profiler):
+        nodes = {node.code: node for node in profiler.get_nodes()}
+        assert set(nodes) == {"A", "1", "2", "B"}
+        assert nodes["2"].method == "LINES"
+        assert nodes["2"].query_count == 1 and "SELECT" in nodes["2"].queries[0].sql
+        assert nodes["A"].query_count == 0
+        assert profiler.duration > 0
+
+    def test_get_nodes_sort(self, profiler):
+        durations = [node.duration for node in profiler.get_nodes("duration", reverse=True)]
+        assert durations == sorted(durations, reverse=True)
+        with pytest.raises(ValueError):
+            profiler.get_nodes("unknown")
+
+    def test_as_dict(self, profiler):
+        data = profiler.as_dict()
+        assert [node["code"] for node in data["nodes"]] == sorted(node["code"] for node in data["nodes"])
+        assert data["query_count"] == len(data["queries"]) + sum(n["query_count"] for n in data["nodes"])
@@ -0,0 +1,58 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from fin.models import Line
+from fin.engine.report.selector import CodeToken, LineQuery, Selector, SelectorParser
+from fin.engine.report.trie import AccountTrie
+
+
+@pytest.fixture
+def sel_parser():
+    return SelectorParser(single_filters=LineQuery.single_filters, operators=LineQuery.operators)
+
+
+@pytest.fixture
+def lines_qs(all_lines):
+    return Line.objects.all()
+
+
+@pytest.fixture
+def trie(lines_qs):
+    return AccountTrie.from_querysets({Selector.Scope.FLOW: lines_qs, Selector.Scope.STATE: lines_qs})
+
+
+class TestAccountTrie:
+    @pytest.mark.parametrize(
+        "expr", ["@1", "~1", "@10", "@101", "~2", "@2|debit", "~3|credit", "@20/21", "~1,10,3", "@4", "@2|debit|credit"]
+    )
+    def test_resolve(self, sel_parser, lines_qs, trie, expr):
+        selector = sel_parser.parse(expr)
+        line_query = LineQuery(lines_qs)
+        expected = line_query.get_queryset(None, selector)["total"] or Decimal("0.00")
+        assert trie.resolve(selector) == expected
+
+    def test_can_resolve(self, sel_parser, trie):
+        assert trie.can_resolve(sel_parser.parse("@1|debit"))
+        assert not trie.can_resolve(sel_parser.parse("max:@1"))
+        assert not trie.can_resolve(sel_parser.parse("@1|counterpart:2"))
+        assert not trie.can_resolve(sel_parser.parse("#A"))
+
+    def test_resolve_raises(self, sel_parser, trie):
+        with pytest.raises(ValueError):
+            trie.resolve(sel_parser.parse("@1|fixed_asset"))
+
+    def test_get_prefixes(self, trie):
+        assert trie.get_prefixes(CodeToken(kind="list", value=["21", "1", "10", "2"])) == ["1", "2"]
+
+    def test_from_periods(self, sel_parser, lines_qs):
+        year = date.today().year
+        periods = [(date(year - 1, 1, 1), date(year - 1, 12, 31)), (date(year, 1, 1), date(year, 12, 31))]
+        tries = AccountTrie.from_periods(lines_qs, periods)
+        for (start, end), trie in zip(periods, tries):
+            qs = lines_qs.filter(date__gte=start, date__lte=end)
+            expected = AccountTrie.from_querysets({Selector.Scope.FLOW: qs, Selector.Scope.STATE: qs})
+            for expr in ("@1", "~2|debit", "@3"):
+                selector = sel_parser.parse(expr)
+                assert trie.resolve(selector) == expected.resolve(selector)
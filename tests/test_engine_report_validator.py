@@ -0,0 +1,146 @@
+import zipfile
+
+import pytest
+
+from fin.engine.report.validator import XBRLValidator, get_schema_refs, get_validator
+
+
+TAXONOMY_PACKAGE = """<?xml version="1.0" encoding="utf-8"?>
+<tp:taxonomyPackage xmlns:tp="http://xbrl.org/2016/taxonomy-package" xml:lang="en">
+  <tp:identifier>http://example.com/taxonomy</tp:identifier>
+  <tp:name>Test taxonomy</tp:name>
+  <tp:version>1.0</tp:version>
+</tp:taxonomyPackage>
+"""
+
+TAXONOMY_CATALOG = """<?xml version="1.0" encoding="utf-8"?>
+<catalog xmlns="urn:oasis:names:tc:entity:xmlns:xml:catalog">
+  <rewriteURI uriStartString="http://example.com/" rewritePrefix="../example.com/"/>
+</catalog>
+"""
+
+TAXONOMY_SCHEMA = """<?xml version="1.0" encoding="utf-8"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema" xmlns:xbrli="http://www.xbrl.org/2003/instance"
+    xmlns:ex="http://example.com/ex" targetNamespace="http://example.com/ex" elementFormDefault="qualified">
+  <xs:import namespace="http://www.xbrl.org/2003/instance"
+    schemaLocation="http://www.xbrl.org/2003/xbrl-instance-2003-12-31.xsd"/>
+  <xs:element id="ex_A" name="A" type="xbrli:monetaryItemType" substitutionGroup="xbrli:item"
+    xbrli:periodType="duration" nillable="true"/>
+  <xs:element id="ex_B" name="B" type="xbrli:monetaryItemType" substitutionGroup="xbrli:item"
+    xbrli:periodType="instant" nillable="true"/>
+</xs:schema>
+"""
+
+INSTANCE = """<?xml version="1.0" encoding="utf-8"?>
+<xbrl xmlns="http://www.xbrl.org/2003/instance" xmlns:link="http://www.xbrl.org/2003/linkbase"
+    xmlns:xlink="http://www.w3.org/1999/xlink" xmlns:iso4217="http://www.xbrl.org/2003/iso4217"
+    xmlns:ex="http://example.com/ex">
+  <link:schemaRef xlink:type="simple" xlink:href="{schema}"/>
+  <context id="D">
+    <entity><identifier scheme="http://example.com/entity">1</identifier></entity>
+    <period><startDate>2024-01-01</startDate><endDate>2024-12-31</endDate></period>
+  </context>
+  <context id="I">
+    <entity><identifier scheme="http://example.com/entity">1</identifier></entity>
+    <period><instant>2024-12-31</instant></period>
+  </context>
+  <unit id="EUR"><measure>iso4217:EUR</measure></unit>
+  {facts}
+</xbrl>
+"""
+
+FACTS = {
+    "valid": '<ex:A contextRef="D" unitRef="EUR" decimals="0">10</ex:A>'
+    '<ex:B contextRef="I" unitRef="EUR" decimals="0">5</ex:B>',
+    "period_type": '<ex:A contextRef="I" unitRef="EUR" decimals="0">10</ex:A>',
+    "undefined_concept": '<ex:C contextRef="D" unitRef="EUR" decimals="0">10</ex:C>',
+    "missing_context": '<ex:A contextRef="X" unitRef="EUR" decimals="0">10</ex:A>',
+    "invalid_value": '<ex:A contextRef="D" unitRef="EUR" decimals="0">abc</ex:A>',
+}
+
+
+@pytest.fixture
+def package(tmp_path):
+    path = tmp_path / "taxonomy.zip"
+    path.write_bytes(b"")
+    return path
+
+
+@pytest.fixture
+def taxonomy(tmp_path):
+    path = tmp_path / "example.zip"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("example/META-INF/taxonomyPackage.xml", TAXONOMY_PACKAGE)
+        archive.writestr("example/META-INF/catalog.xml", TAXONOMY_CATALOG)
+        archive.writestr("example/example.com/schema.xsd", TAXONOMY_SCHEMA)
+    return path
+
+
+def write_instance(directory, name, schema="http://example.com/schema.xsd"):
+    path = directory / f"{name}.xbrl"
+    path.write_text(INSTANCE.format(schema=schema, facts=FACTS.get(name, FACTS["valid"])))
+    return path
+
+
+@pytest.fixture
+def instances(tmp_path):
+    return {name: write_instance(tmp_path, name) for name in FACTS}
+
+
+@pytest.fixture
+def validator(taxonomy, tmp_path):
+    pytest.importorskip("arelle")
+    return XBRLValidator([taxonomy], tmp_path / "cache")
+
+
+class TestXBRLValidator:
+    def test_init(self, package, tmp_path):
+        validator = XBRLValidator([str(package)], tmp_path / "cache")
+        assert validator.packages == [package]
+        assert validator.cache_dir == tmp_path / "cache"
+
+    def test_init_missing_package(self, tmp_path):
+        with pytest.raises(ValueError):
+            XBRLValidator([tmp_path / "missing.zip"])
+
+    def test_get_validator(self, package):
+        validator = get_validator((str(package),))
+        assert get_validator((str(package),)) is validator
+
+    def test_get_schema_refs(self, tmp_path):
+        path = write_instance(tmp_path, "valid", schema="schema.xsd")
+        assert get_schema_refs(path) == (str(tmp_path / "schema.xsd"),)
+        path = write_instance(tmp_path, "valid")
+        assert get_schema_refs(path) == ("http://example.com/schema.xsd",)
+
+    def test_validate(self, validator, instances):
+        assert validator.validate(instances["valid"]) == []
+        errors = validator.validate(instances["period_type"])
+        assert len(errors) == 1 and errors[0].startswith("xbrl.4.7.2:contextPeriodType")
+
+    def test_validate_shares_dts(self, validator, instances):
+        for name in ("valid", "period_type", "valid"):
+            validator.validate(instances[name])
+        assert list(validator.dts) == [("http://example.com/schema.xsd",)]
+
+        dts = validator.dts[("http://example.com/schema.xsd",)]
+        assert dts.model.urlDocs == dts.url_docs
+        assert not dts.model.facts and not dts.model.contexts
+
+    @pytest.mark.parametrize("name", list(FACTS))
+    def test_validate_same_as_full_load(self, validator, taxonomy, instances, tmp_path, name):
+        # validate another document before, to check shared state is reset
+        validator.validate(instances["invalid_value" if name == "valid" else "valid"])
+        unshared = XBRLValidator([taxonomy], tmp_path / "cache", share_dts=False)
+
+        def codes(errors):
+            # messages may contain model object indexes
+            return sorted(error.split(": ", 1)[0] for error in errors)
+
+        expected = unshared.validate_document(instances[name])
+        assert codes(validator.validate(instances[name])) == codes(expected)
+        assert bool(expected) == (name != "valid")
+
+    def test_validate_missing_schema(self, validator, tmp_path):
+        path = write_instance(tmp_path, "valid", schema="http://example.com/missing.xsd")
+        assert validator.validate(path)
@@ -0,0 +1,100 @@
+from datetime import date
+from decimal import Decimal
+import io
+
+import pytest
+
+from fin import models
+from fin.engine.report.xbrl import XBRLReportBuilder
+
+
+@pytest.fixture
+def xbrl_report(book, xbrl_sections):
+    template = xbrl_sections[0].template
+    report = models.Report.objects.create(
+        template=template, book=book, start_date=date(2025, 1, 1), end_date=date(2025, 12, 31)
+    )
+    values = [Decimal("10.50"), Decimal("3.00"), Decimal("7.50"), Decimal("-2.00")]
+    models.ReportSection.objects.bulk_create(
+        models.ReportSection(
+            report=report, template=section, name=section.name, code=section.code, order=section.order, value=value
+        )
+        for section, value in zip(xbrl_sections, values)
+    )
+    return report
+
+
+@pytest.fixture
+def xbrl_builder():
+    return XBRLReportBuilder("0123456789")
+
+
+class TestXBRLReportBuilder:
+    def test_render(self, xbrl_builder, xbrl_report):
+        result = xbrl_builder.render(xbrl_report)
+        assert result.startswith('<?xml version="1.0" encoding="utf-8"?>')
+        assert 'xmlns:ex="http://example.com/ex"' in result
+        assert '<ex:A contextRef="CurrentDuration" unitRef="EUR" decimals="0">10.50</ex:A>' in result
+        assert '<ex:Two contextRef="CurrentInstant" unitRef="U-Pure" decimals="2">7.50</ex:Two>' in result
+        assert "<startDate>2025-01-01</startDate>" in result
+        assert "<instant>2025-12-31</instant>" in result
+        # no previous report
+        assert "ex:B" not in result
+        assert result.count('<unit id="EUR">') == 1
+
+    def test_render_dimensions(self, xbrl_builder, xbrl_report):
+        result = xbrl_builder.render(xbrl_report)
+        assert result.count("<context ") == 3
+        assert '<xbrldi:explicitMember dimension="ex:Axis">ex:One</xbrldi:explicitMember>' in result
+        assert '<ex:One contextRef="CurrentDuration-' in result
+
+    def test_render_previous(self, xbrl_builder, xbrl_report):
+        report = models.Report.objects.create(
+            template=xbrl_report.template,
+            book=xbrl_report.book,
+            previous=xbrl_report,
+            start_date=date(2026, 1, 1),
+            end_date=date(2026, 12, 31),
+        )
+        section = xbrl_report.sections.get(code="B")
+        section.pk, section.report = None, report
+        section.save()
+
+        result = xbrl_builder.render(report)
+        assert "<instant>2025-12-31</instant>" in result
+        assert '<ex:B contextRef="PrecedingInstant" unitRef="EUR" decimals="0">-2.00</ex:B>' in result
+
+    def test_write_stable(self, xbrl_builder, xbrl_report):
+        out_1, out_2 = io.BytesIO(), io.BytesIO()
+        xbrl_builder.write(xbrl_report, out_1)
+        xbrl_builder.write(models.Report.objects.get(pk=xbrl_report.pk), out_2)
+        assert out_1.getvalue() == out_2.getvalue()
+
+    def test_write_nil(self, xbrl_builder, xbrl_report, xbrl_sections):
+        section = xbrl_report.sections.get(code="A")
+        section.value = None
+        result = xbrl_builder.render(xbrl_report, [section])
+        assert '<ex:A contextRef="CurrentDuration" unitRef="EUR" xsi:nil="true"/>' in result
+
+    def test_write_undeclared_unit(self, xbrl_builder, xbrl_report, xbrl_sections):
+        xbrl_sections[0].xbrl.unit = "USD"
+        xbrl_sections[0].save()
+        with pytest.raises(ValueError):
+            xbrl_builder.render(xbrl_report)
+
+    def test_write_undeclared_context(self, xbrl_builder, xbrl_report, xbrl_sections):
+        xbrl_sections[0].xbrl.context_id = "Unknown"
+        xbrl_sections[0].save()
+        with pytest.raises(ValueError):
+            xbrl_builder.render(xbrl_report)
+
+    def test_write_no_schema(self, xbrl_builder, xbrl_report):
+        xbrl_report.template.xbrl = None
+        with pytest.raises(ValueError):
+            xbrl_builder.render(xbrl_report)
+
+    def test_get_instance(self, xbrl_builder, xbrl_report):
+        instance = xbrl_builder.get_instance(xbrl_report)
+        assert [f.concept for f in instance.facts] == ["ex:A", "ex:One", "ex:Two"]
+        assert len(instance.contexts) == 3
+        assert [u.id for u in instance.units] == ["EUR", "U-Pure"]
@@ -0,0 +1,37 @@
+from datetime import date
+
+import pytest
+
+from fin.engine.rollforward import Rollforward, rollforward_book
+from fin.models import Exercise
+
+
+@pytest.fixture
+def exercise(book, accounts):
+    exercise = book.get_exercise(date.today(), create=True)
+    exercise.open()
+    return exercise
+
+
+class TestRollforward:
+    def test_rollforward_book(self, book, exercise, moves):
+        result = rollforward_book(book.pk, exercise.end_date.year)
+
+        assert result.success, result.error
+        exercise.refresh_from_db()
+        assert exercise.state == Exercise.State.CLOSED
+        assert exercise.moves.closing().get().pk == result.closing_id
+
+        next_exercise = Exercise.objects.get(opening_move_id=result.opening_id)
+        assert next_exercise.start_date > exercise.end_date
+
+    def test_rollforward_book_restart(self, book, exercise, moves):
+        first = rollforward_book(book.pk, exercise.end_date.year)
+        second = rollforward_book(book.pk, exercise.end_date.year)
+        assert (first.closing_id, first.opening_id) == (second.closing_id, second.opening_id)
+
+    def test_run_failure(self, book, exercise):
+        results = Rollforward(exercise.end_date.year - 1, workers=0).run([book.pk, -1])
+        assert [r.book_id for r in results] == [book.pk, -1]
+        assert not any(r.success for r in results)
+        assert "DoesNotExist" in results[1].error
@@ -1,3 +1,4 @@
+from datetime import timedelta
 from decimal import Decimal
 
 from fin import models
@@ -7,6 +8,23 @@ class TestAccount:
     def test_long_code(self):
         assert models.Account(code="12").long_code == "120000"
 
+    def test_get_is_debit(self):
+        Type = models.Account.Type
+        for value in Type.values:
+            expected = True if value in Type.debit_types() else False if value in Type.credit_types() else None
+            assert Type.get_is_debit(value) is expected
+
+    def test_save_type_updates_lines(self, account, line):
+        assert line.norm_amount == -line.amount
+        account.type = models.Account.Type.ASSET
+        account.save()
+
+        assert account.is_debit
+        line.refresh_from_db()
+        assert line.norm_amount == line.amount
+        snapshot = models.AccountBalanceSnapshot.objects.get(account=account)
+        assert snapshot.amount == line.amount
+
 
 class TestMove:
     def test_full_reference(self, journal, move):
@@ -27,6 +45,28 @@ class TestLine:
         line.amount = Decimal("-10")
         assert not line.is_debit
 
+    def test_norm_amount(self, line):
+        # revenue account is on credit side
+        assert line.norm_amount == Decimal("-100")
+        line.refresh_from_db()
+        assert line.norm_amount == Decimal("-100")
+        assert line.signed_amount == Decimal("100")
+
+    def test_norm_amount_bulk_create(self, lines):
+        items = models.Line.objects.filter(pk__in=[line.pk for line in lines]).order_by("pk")
+        assert [line.norm_amount for line in items] == [Decimal("-100"), Decimal("10"), Decimal("80")]
+
+    def test_sync_move(self, line):
+        line.refresh_from_db()
+        assert (line.book_id, line.date, line.move_type) == (line.move.book_id, line.move.date, line.move.type)
+
+    def test_sync_move_on_move_save(self, line):
+        move = line.move
+        move.date = move.date - timedelta(days=40)
+        move.save()
+        line.refresh_from_db()
+        assert line.date == move.date
+
     def test_clean(self, line):
         # TODO
         pass
@@ -1,3 +1,5 @@
+from datetime import date
+
 import pytest
 
 from fin.models import AmortizationEntry
@@ -33,3 +35,13 @@ class TestAmortizationSchedule:
     ):
         with pytest.raises(RuntimeError):
             amortization_schedule.clear_entries()
+
+    def test_get_period(self, amortization_schedule):
+        start = amortization_schedule.start_date
+        assert amortization_schedule.get_period(0) == (start, start.replace(month=12, day=31))
+        assert amortization_schedule.get_period(1) == (date(start.year + 1, 1, 1), date(start.year + 1, 12, 31))
+
+    def test_get_period_index(self, amortization_schedule):
+        start = amortization_schedule.start_date
+        assert amortization_schedule.get_period_index(start) == 0
+        assert amortization_schedule.get_period_index(date(start.year + 2, 6, 1)) == 2
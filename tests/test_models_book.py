@@ -3,8 +3,10 @@ from decimal import Decimal
 
 import pytest
 from django.core.exceptions import ValidationError
+from django.db.models import Sum
 
-from fin.models.book import Exercise, Move, Line
+from fin.engine.ledger import BaseLedgerView, LedgerStateView, ProfitAndLossView
+from fin.models.book import AccountBalanceSnapshot, Book, Exercise, ExerciseQuerySet, Move, Line
 
 
 @pytest.fixture
@@ -55,6 +57,28 @@ class TestBook:
         with pytest.raises(ValueError):
             book.get_exercise(date.today())
 
+    def test_get_exercise_uses_index(self, book, exercise, django_assert_num_queries):
+        book.get_exercise(exercise.start_date)
+        with django_assert_num_queries(0):
+            assert book.get_exercise(exercise.end_date) == exercise
+            assert book.exercise_index.get(exercise.start_date - timedelta(days=1)) is None
+
+    def test_get_exercise_index_cleared_on_save(self, book, exercise):
+        exercise = book.get_exercise(exercise.start_date)
+        exercise.open()
+        assert "exercise_index" not in book.__dict__
+        assert book.get_exercise(exercise.start_date).state == Exercise.State.OPEN
+
+    def test_get_exercise_index_deleted(self, book, exercise):
+        book.get_exercise(exercise.start_date).delete()
+        with pytest.raises(ValueError):
+            book.get_exercise(exercise.start_date)
+
+    def test_get_exercise_index_cleared(self, book, exercise):
+        assert len(book.exercise_index) == 1
+        book.get_exercise(exercise.end_date + timedelta(days=1), create=True)
+        assert len(book.exercise_index) == 2
+
 
 class TestExercise:
     def test_open(self, exercise):
@@ -96,6 +120,49 @@ class TestExercise:
 
         assert retained_earnings.amount == Decimal("40")
 
+    def test_close_queryset(self, exercise, exercise_move, next_exercise):
+        exercises = Exercise.objects.filter(pk__in=[exercise.pk, next_exercise.pk])
+        closings = exercises.exclude(state=Exercise.State.DRAFT).close()
+        assert list(closings) == [exercise.pk]
+
+        move = closings[exercise.pk]
+        retained_earnings = move.lines.get(account_id=exercise.book.template.retained_earnings_account_id)
+        assert retained_earnings.amount == Decimal("40")
+        assert Exercise.objects.get(pk=exercise.pk).state == Exercise.State.CLOSED
+
+    def test_close_queryset_batches(self, exercise, exercise_move, monkeypatch):
+        other = Book.objects.create(title="Other", template=exercise.book.template, path="other")
+        other_exercise = other.get_exercise(exercise.start_date, create=True, open=True)
+        move = Move.objects.create(book=other, exercise=other_exercise, journal=exercise_move.journal)
+        Line.objects.create(move=move, account=exercise_move.lines.first().account, amount=Decimal("10"), is_debit=True)
+
+        monkeypatch.setattr(ExerciseQuerySet, "close_batch_size", 1)
+        closings = Exercise.objects.filter(pk__in=[exercise.pk, other_exercise.pk]).close()
+
+        retained_earnings = exercise.book.template.retained_earnings_account_id
+        assert closings[exercise.pk].lines.get(account_id=retained_earnings).amount == Decimal("40")
+        assert closings[other_exercise.pk].lines.get(account_id=retained_earnings).amount == Decimal("10")
+
+    def test_close_queryset_many_books(self, exercise, exercise_move):
+        books = Book.objects.bulk_create(
+            Book(title=f"Book {i}", template=exercise.book.template, path=f"book_{i}") for i in range(1100)
+        )
+        Exercise.objects.bulk_create(
+            Exercise(book=book, start_date=exercise.start_date, end_date=exercise.end_date, state=Exercise.State.OPEN)
+            for book in books
+        )
+
+        closings = Exercise.objects.filter(start_date=exercise.start_date).close()
+        assert len(closings) == len(books) + 1
+        retained_earnings = exercise.book.template.retained_earnings_account_id
+        assert closings[exercise.pk].lines.get(account_id=retained_earnings).amount == Decimal("40")
+
+    def test_refresh_state(self, book, exercise):
+        exercise = book.get_exercise(exercise.start_date)
+        Exercise.objects.filter(pk=exercise.pk).update(state=Exercise.State.CLOSED)
+        assert exercise.refresh_state() == Exercise.State.CLOSED
+        assert exercise.is_locked
+
     def test_reopen(self, exercise):
         raise NotImplementedError("todo")
 
@@ -112,3 +179,61 @@ class TestExercise:
 
         with pytest.raises(ValidationError):
             exercise.validate_move_type(Move.Type.NORMAL)
+
+
+class TestAccountBalanceSnapshot:
+    def get_totals(self, book):
+        totals = {}
+        for account_id, amount in AccountBalanceSnapshot.objects.book(book).values_list("account_id", "amount"):
+            totals[account_id] = totals.get(account_id, Decimal("0.00")) + amount
+        return totals
+
+    def get_line_totals(self, book):
+        query = Line.objects.filter(book=book)
+        return dict(query.values("account_id").annotate(total=Sum("norm_amount")).values_list("account_id", "total"))
+
+    def test_bulk_create(self, book, exercise_move):
+        assert self.get_totals(book) == self.get_line_totals(book)
+
+    def test_line_save(self, book, exercise_move, accounts):
+        line = exercise_move.lines.get(account=accounts[0])
+        line.amount = Decimal("140.0")
+        line.save()
+        assert self.get_totals(book)[accounts[0].pk] == line.norm_amount
+
+    def test_move_delete(self, book, exercise_move, accounts):
+        exercise_move.delete()
+        # only the (zero) opening remains
+        assert not any(self.get_totals(book).values())
+
+    def test_state_view_balances(self, book, exercise, exercise_move):
+        ledger = LedgerStateView(book, exercise.end_date)
+        assert ledger.get_snapshot_period()
+        expected = LedgerStateView(book, exercise.end_date)
+        expected.use_snapshots = False
+        assert ledger.balances() == expected.balances()
+
+
+class TestLedgerViews:
+    def test_balances_by_period_state(self, book, exercise, exercise_move):
+        ledger = LedgerStateView(book, exercise.end_date)
+        periods, balances = ledger.balances_by_period("month")
+        assert periods[0] == exercise.start_date.replace(day=1)
+        assert {k: v[-1] for k, v in balances.items()} == ledger.balances()
+
+    def test_balances_by_period_flow(self, book, exercise, exercise_move):
+        ledger = ProfitAndLossView(book, exercise.end_date, exercise.start_date)
+        for granularity in ("month", "quarter", "exercise"):
+            periods, balances = ledger.balances_by_period(granularity)
+            assert {k: sum(v) for k, v in balances.items()} == ledger.balances()
+        assert periods == [exercise.start_date]
+
+    def test_base_get_start_date(self, book, exercise, exercise_move):
+        # first line is the opening one
+        assert BaseLedgerView(book, exercise.end_date).get_start_date() == exercise.start_date
+        end_date = exercise.start_date - timedelta(days=1)
+        assert BaseLedgerView(book, end_date).get_start_date() == end_date
+
+    def test_balances_by_period_invalid(self, book, exercise, exercise_move):
+        with pytest.raises(ValueError):
+            LedgerStateView(book, exercise.end_date).balances_by_period("week")
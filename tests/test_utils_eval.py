@@ -0,0 +1,41 @@
+from decimal import Decimal
+
+import pytest
+
+from fin.utils.eval import CompileError, compile_expression, get_interpreter
+
+
+FUNCTIONS = frozenset(["get_value"])
+
+
+@pytest.fixture
+def namespace():
+    values = {1: Decimal("10.5"), 2: Decimal("4")}
+    return {"get_value": lambda parent, key: values[key], "a": Decimal("2")}
+
+
+class TestCompileExpression:
+    @pytest.mark.parametrize(
+        "expr",
+        [
+            "get_value(0, 1) + get_value(0, 2)",
+            "get_value(0, 1) - (get_value(0, 2) + a)",
+            "-get_value(0, 1) * 2 / a",
+            "get_value(0, 1) // a % 3",
+            "a",
+        ],
+    )
+    def test_compile_same_as_interpreter(self, namespace, expr):
+        expected = get_interpreter(namespace).eval(expr)
+        assert compile_expression(expr, FUNCTIONS)(namespace) == expected
+
+    def test_compile_is_cached(self):
+        assert compile_expression("a + 1") is compile_expression("a + 1")
+
+    @pytest.mark.parametrize(
+        "expr",
+        ["a if a else 1", "a.real", "__import__('os')(1)", "[a]", "a ** 2", "True + a", "a +", "f(*a)", "abs(a)"],
+    )
+    def test_compile_raises(self, expr):
+        with pytest.raises(CompileError):
+            compile_expression(expr, FUNCTIONS)
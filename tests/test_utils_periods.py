@@ -0,0 +1,102 @@
+from datetime import date, timedelta
+import random
+
+from dateutil.relativedelta import relativedelta
+import pytest
+
+from fin.models import Period
+from fin.utils import periods
+
+
+def reference_period_end(frequency, value):
+    """Period end as computed by calendar arithmetic."""
+    match frequency:
+        case 12:
+            return value.replace(month=12, day=31)
+        case 3:
+            end_month = ((value.month - 1) // 3 + 1) * 3
+            return value.replace(month=end_month, day=1) + relativedelta(months=1, days=-1)
+        case _:
+            return (value + relativedelta(months=frequency, day=1)) - relativedelta(days=1)
+
+
+def reference_periods(frequency, start_date, end_date):
+    """Periods by iterating from start to end."""
+    items, start = [], start_date
+    while start <= end_date:
+        end = reference_period_end(frequency, start)
+        if end > end_date:
+            break
+        items.append((start, end))
+        start = end + timedelta(days=1)
+    return items
+
+
+@pytest.fixture
+def cases():
+    rnd = random.Random(0)
+    items = []
+    for _ in range(300):
+        start = date(2020, 1, 1) + timedelta(days=rnd.randint(0, 2000))
+        end = start + timedelta(days=rnd.randint(-40, 3000))
+        items.append((rnd.choice([1, 2, 3, 6, 12]), start, end))
+    return items
+
+
+def test_month_index():
+    assert periods.month_index(date(2025, 3, 15)) == 2025 * 12 + 2
+    assert periods.month_start(2025 * 12 + 2) == date(2025, 3, 1)
+    assert periods.month_end(2024 * 12 + 1) == date(2024, 2, 29)
+
+
+@pytest.mark.parametrize(
+    "frequency,value,expected",
+    [
+        (12, date(2025, 6, 15), date(2025, 12, 31)),
+        (3, date(2025, 2, 10), date(2025, 3, 31)),
+        (3, date(2025, 12, 1), date(2025, 12, 31)),
+        (1, date(2025, 2, 10), date(2025, 2, 28)),
+        (6, date(2025, 2, 10), date(2025, 7, 31)),
+    ],
+)
+def test_period_end(frequency, value, expected):
+    assert periods.period_end(frequency, value) == expected
+
+
+def test_iter_periods(cases):
+    for frequency, start, end in cases:
+        expected = reference_periods(frequency, start, end)
+        assert list(periods.iter_periods(frequency, start, end)) == expected
+        assert periods.count_periods(frequency, start, end) == len(expected)
+
+
+def test_nth_period(cases):
+    for frequency, start, end in cases:
+        for n, period in enumerate(reference_periods(frequency, start, end)):
+            assert periods.nth_period(frequency, start, n) == period
+
+
+def test_period_index(cases):
+    for frequency, start, end in cases:
+        for n, (first, last) in enumerate(reference_periods(frequency, start, end)):
+            assert periods.period_index(frequency, start, first) == n
+            assert periods.period_index(frequency, start, last) == n
+
+
+def test_period_index_before_start():
+    with pytest.raises(ValueError):
+        periods.period_index(12, date(2025, 3, 1), date(2025, 2, 1))
+
+
+@pytest.mark.parametrize(
+    "value,anchor,months,expected",
+    [
+        (date(2025, 3, 15), 1, 12, date(2025, 1, 1)),
+        (date(2025, 3, 15), 4, 12, date(2024, 4, 1)),
+        (date(2025, 3, 15), 1, 3, date(2025, 1, 1)),
+        (date(2025, 8, 31), 2, 6, date(2025, 8, 1)),
+        (date(2025, 7, 31), 2, 6, date(2025, 2, 1)),
+    ],
+)
+def test_period_get_start(value, anchor, months, expected):
+    assert Period.get_start(value, anchor, months) == expected
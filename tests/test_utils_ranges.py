@@ -0,0 +1,38 @@
+import pytest
+
+from fin.utils.ranges import IdRanges, decode_ranges, encode_ranges
+
+
+IDS = [1, 2, 3, 7, 9, 10, 15]
+RANGES = [[1, 3], [7, 7], [9, 10], [15, 15]]
+
+
+def test_encode_ranges():
+    assert encode_ranges([10, 3, 2, 1, 7, 9, 15, 2]) == RANGES
+    assert encode_ranges([]) == []
+
+
+def test_decode_ranges():
+    assert decode_ranges(RANGES) == IDS
+
+
+class TestIdRanges:
+    def test_len(self):
+        assert len(IdRanges(RANGES)) == len(IDS)
+        assert len(IdRanges([])) == 0
+
+    def test_getitem(self):
+        ranges = IdRanges(RANGES)
+        assert [ranges[i] for i in range(len(IDS))] == IDS
+        assert ranges[-1] == 15
+
+    def test_getitem_raises(self):
+        with pytest.raises(IndexError):
+            IdRanges(RANGES)[len(IDS)]
+
+    @pytest.mark.parametrize("start,stop", [(0, 2), (2, 5), (3, 4), (1, 100), (0, 0), (6, 7)])
+    def test_slice(self, start, stop):
+        assert IdRanges(RANGES)[start:stop] == IDS[start:stop]
+
+    def test_slice_step(self):
+        assert IdRanges(RANGES)[::2] == IDS[::2]